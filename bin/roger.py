@@ -3,6 +3,7 @@
 from __future__ import print_function
 
 import os
+import pipes
 import sys
 import subprocess
 import re
@@ -54,7 +55,8 @@ def getScriptCall(root, command, command_args):
     script_call = "roger_{}.py".format(command)
 
     for command_arg in command_args:
-        script_call = script_call + " {}".format(command_arg)
+        # Quoted, so that arguments with spaces (roger exec commands) survive the shell
+        script_call = script_call + " {}".format(pipes.quote(command_arg))
     return script_call
 
 
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+
+from __future__ import print_function
+import re
+from fnmatch import fnmatchcase
+
+GLOB_CHARS = re.compile(r'[*?\[]')
+LABEL_SELECTOR = re.compile(r'^\s*([^=!\s]+)\s*(?:(==|!=)\s*(.*?)|\s(in|notin)\s*\((.*)\))?\s*$')
+
+
+class AppSelector(object):
+    """
+    Selects Marathon apps by app id and labels.
+
+    :params:
+    :app_pattern [str]: app id, group id ('/team' selects every app under it)
+                        or glob ('/team/*'). Optional.
+    :labels [list]: Marathon label selectors, for example 'owner==team',
+                    'canary', 'tier in (web,worker)' or 'env!=dev'. Optional.
+
+    The selection is pushed down to Marathon through the id= and label= query
+    parameters, matches() finishes it client side since id= is a substring
+    match.
+    """
+
+    def __init__(self, app_pattern=None, labels=None):
+        self.app_pattern = None
+        if app_pattern:
+            self.app_pattern = app_pattern if app_pattern.startswith('/') else '/' + app_pattern
+        self.labels = []
+        for label in labels or []:
+            matchObj = LABEL_SELECTOR.match(label)
+            if not matchObj:
+                raise ValueError("Invalid label selector: '{}'".format(label))
+            key, op, value, set_op, values = matchObj.groups()
+            if set_op:
+                self.labels.append((key, set_op, [v.strip() for v in values.split(',')]))
+            else:
+                self.labels.append((key, op, value))
+        self._raw_labels = list(labels or [])
+
+    def is_empty(self):
+        return self.app_pattern is None and not self.labels
+
+    def is_glob(self):
+        return self.app_pattern is not None and GLOB_CHARS.search(self.app_pattern) is not None
+
+    def query_params(self):
+        """
+        returns the Marathon /v2/apps query parameters for this selection
+        """
+        params = []
+        if self.app_pattern is not None:
+            literal = GLOB_CHARS.split(self.app_pattern)[0]
+            if literal.strip('/') != '':
+                params.append(('id', literal))
+        if self._raw_labels:
+            params.append(('label', ','.join(self._raw_labels)))
+        return params
+
+    def matches(self, app):
+        """
+        returns True if the app definition (a dict with 'id' and optionally
+        'labels') is selected
+        """
+        app_id = app.get('id', '')
+        if self.app_pattern is not None:
+            if self.is_glob():
+                if not fnmatchcase(app_id, self.app_pattern):
+                    return False
+            elif app_id != self.app_pattern and not app_id.startswith(self.app_pattern.rstrip('/') + '/'):
+                return False
+
+        app_labels = app.get('labels') or {}
+        for key, op, value in self.labels:
+            if op is None:
+                if key not in app_labels:
+                    return False
+            elif op == '==':
+                if app_labels.get(key) != value:
+                    return False
+            elif op == '!=':
+                if app_labels.get(key) == value:
+                    return False
+            elif op == 'in':
+                if app_labels.get(key) not in value:
+                    return False
+            elif op == 'notin':
+                if app_labels.get(key) in value:
+                    return False
+        return True
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+
+from __future__ import print_function
+import hashlib
+import json
+import os
+import re
+import stat
+
+DOCKERIGNORE = '.dockerignore'
+# Never part of what is built, and changes with every fetch
+SKIPPED_DIRS = ['.git']
+READ_SIZE = 64 * 1024
+
+
+def compilePattern(pattern):
+    """
+    returns the regex of a .dockerignore pattern. '*' and '?' do not match
+    '/', '**' matches any number of directories and a pattern that matches a
+    directory also matches everything below it.
+    """
+    regex = ''
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith('**', i):
+            i += 2
+            if pattern.startswith('/', i):
+                i += 1
+                regex += '(?:.*/)?'
+            else:
+                regex += '.*'
+            continue
+        if c == '*':
+            regex += '[^/]*'
+        elif c == '?':
+            regex += '[^/]'
+        elif c == '[' and ']' in pattern[i + 1:]:
+            end = pattern.index(']', i + 1)
+            chars = pattern[i + 1:end]
+            if chars.startswith('!') or chars.startswith('^'):
+                chars = '^' + chars[1:]
+            regex += '[' + chars.replace('\\', '\\\\') + ']'
+            i = end
+        elif c == '\\' and i + 1 < len(pattern):
+            i += 1
+            regex += re.escape(pattern[i])
+        else:
+            regex += re.escape(c)
+        i += 1
+    return re.compile('^' + regex + '(?:/.*)?$')
+
+
+class BuildContext(object):
+    """
+    The files docker build sends for an app: the files of its context
+    directory that are not excluded by the .dockerignore there, except for
+    the .git directories. Its digest
+    changes when one of these files, the Dockerfile or the build args change,
+    so an image built from a context with the same digest can be reused.
+
+    :params:
+    :directory [str]: the build context, e.g. the path of the app in its repo
+    :docker_file [str]: the Dockerfile, relative to directory or absolute
+    :build_args [dict]: the build args
+    """
+
+    def __init__(self, directory, docker_file='Dockerfile', build_args=None):
+        self.directory = directory
+        self.docker_file = os.path.join(directory, docker_file)
+        self.build_args = build_args or {}
+        self.patterns = self.read_dockerignore()
+
+    def read_dockerignore(self):
+        """
+        returns the (regex, excluded) pairs of the .dockerignore of the
+        context, in the order of the file
+        """
+        patterns = []
+        path = os.path.join(self.directory, DOCKERIGNORE)
+        if not os.path.isfile(path):
+            return patterns
+        with open(path) as dockerignore:
+            for line in dockerignore:
+                line = line.strip()
+                if line == '' or line.startswith('#'):
+                    continue
+                excluded = not line.startswith('!')
+                if not excluded:
+                    line = line[1:].strip()
+                line = os.path.normpath(line).lstrip('/')
+                if line.startswith('./'):
+                    line = line[2:]
+                patterns.append((compilePattern(line), excluded))
+        return patterns
+
+    def is_ignored(self, path):
+        """
+        returns whether the path, relative to the context, is excluded. The
+        last pattern that matches decides, like docker build does.
+        """
+        ignored = False
+        for regex, excluded in self.patterns:
+            if regex.match(path):
+                ignored = excluded
+        return ignored
+
+    def iter_files(self):
+        """
+        yields the paths, relative to the context, of the files sent to docker
+        build, sorted
+        """
+        # An ignored directory may still hold files re-included with '!'
+        can_prune = all(excluded for regex, excluded in self.patterns)
+        for root, dirs, files in os.walk(self.directory):
+            relroot = os.path.relpath(root, self.directory)
+            relroot = '' if relroot == '.' else relroot + '/'
+            dirs[:] = [name for name in dirs if name not in SKIPPED_DIRS]
+            if can_prune:
+                dirs[:] = [name for name in dirs if not self.is_ignored(relroot + name)]
+            dirs.sort()
+            # Symlinks to directories are not followed by os.walk, docker sends the link
+            links = [name for name in dirs if os.path.islink(os.path.join(root, name))]
+            for name in sorted(files + links):
+                if not self.is_ignored(relroot + name):
+                    yield relroot + name
+
+    def get_file_digest(self, path):
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for data in iter(lambda: f.read(READ_SIZE), ''):
+                sha.update(data)
+        return sha.hexdigest()
+
+    def digest(self):
+        """
+        returns the sha256 digest of the names, modes and contents of the
+        files of the context, the Dockerfile and the build args
+        """
+        sha = hashlib.sha256()
+        for name in self.iter_files():
+            path = os.path.join(self.directory, name)
+            mode = os.lstat(path).st_mode
+            if stat.S_ISLNK(mode):
+                entry = 'l:' + os.readlink(path)
+            elif stat.S_ISREG(mode):
+                entry = '{}:{}'.format('x' if mode & stat.S_IXUSR else 'f', self.get_file_digest(path))
+            else:
+                continue
+            sha.update('{}\0{}\n'.format(name, entry))
+        sha.update('Dockerfile\0{}\n'.format(self.get_file_digest(self.docker_file)))
+        sha.update('build-args\0{}\n'.format(json.dumps(self.build_args, sort_keys=True)))
+        return 'sha256:' + sha.hexdigest()
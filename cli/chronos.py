@@ -24,9 +24,9 @@ class Chronos(Framework):
 
     def get(self, roger_env, environment):
         self.fetchUserPass(environment)
-        url = roger_env['environments'][environment][
-            'chronos_endpoint'] + "/scheduler/jobs"
-        resp = requests.get(url, auth=(self.user, self.passw))
+        endpoint = roger_env['environments'][environment]['chronos_endpoint']
+        url = endpoint + "/scheduler/jobs"
+        resp = self.getSession(endpoint).get(url, auth=(self.user, self.passw))
         return resp.json()
 
     def put(self, file_path, environmentObj, container, environment, act_as_user):
@@ -41,13 +41,14 @@ class Chronos(Framework):
             file_path, environmentObj['chronos_endpoint'], chronos_resource), "cyan"))
         endpoint = environmentObj['chronos_endpoint']
         deploy_url = "{}/{}".format(endpoint, chronos_resource)
+        session = self.getSession(endpoint)
 
         if not act_as_user:
-            resp = requests.put(deploy_url, data=data, headers={
-                                'Content-type': 'application/json'}, auth=(self.user, self.passw))
+            resp = session.put(deploy_url, data=data, headers={
+                               'Content-type': 'application/json'}, auth=(self.user, self.passw))
         else:
-            resp = requests.put(deploy_url, data=data, headers={
-                                'Content-type': 'application/json', 'act-as-user': act_as_user}, auth=(self.user, self.passw))
+            resp = session.put(deploy_url, data=data, headers={
+                               'Content-type': 'application/json', 'act-as-user': act_as_user}, auth=(self.user, self.passw))
         chronos_message = "{}".format(resp)
         print(colored(chronos_message, "yellow"))
         task_id = []
@@ -94,6 +95,6 @@ class Chronos(Framework):
         url = '{location}/scheduler/jobs/search?name={name}'.format(
             location=location, name=name)
 
-        res = requests.get(url, auth=(username, password))
+        res = self.getSession(location).get(url, auth=(username, password))
         imagename = res.json()[0]['container']['image']
         return imagename
@@ -2,55 +2,264 @@
 
 from __future__ import print_function
 import argparse
-import subprocess
+import errno
 import json
 import os
 import requests
-import subprocess
+import socket
+import struct
 import sys
+import tempfile
+import time
+from multiprocessing.pool import ThreadPool
 from marathon import Marathon
-from cli.utils import printException, printErrorMsg
+from cli.settings import Settings
+from cli.gitutils import lockfile
+from cli.utils import printException, printErrorMsg, getHttpSession
 requests.packages.urllib3.disable_warnings()
 
+settings = Settings()
+
+DOCKER_PORT = 4243
+DOCKER_API_TIMEOUT = 10
+MESOS_TASK_ID = 'MESOS_TASK_ID'
+
 # we probably need to remove (or refactor) this module (ankan, 201603)
 
 
 class ContainerConfig:
 
-    def get_hostname_from_marathon(self, environment, roger_env, appTaskId):
+    def get_hostname_from_marathon(self, environment, roger_env, appTaskId, app_id=None):
         hostname = ''
         marathon = Marathon()
-        tasks = marathon.getTasks(roger_env, environment)
+        if app_id is None:
+            app_id = self.get_app_id_from_task_id(appTaskId)
+        if app_id is not None:
+            # Only the tasks of one app instead of every task of the cluster
+            tasks = marathon.getAppTasks(roger_env, environment, app_id)
+            hostname = self.find_task_host(tasks or [], appTaskId)
+        if hostname == '':
+            tasks = marathon.getTasks(roger_env, environment)
+            hostname = self.find_task_host(tasks, appTaskId)
+
+        return hostname
+
+    def get_task_location(self, environment, roger_env, appTaskId, app_id=None, hostname=None):
+        """
+        returns (hostname, containerId, mesosTaskId) for the task whose id
+        starts with appTaskId. Locations are cached on disk per environment and
+        a cached location is only used while its container is still running on
+        that host, otherwise it is resolved again from Marathon and Docker.
+
+        :params:
+        :app_id [str]: application the task belongs to, optional
+        :hostname [str]: only look on this host, optional
+        """
+        cache = self.read_task_cache(environment)
+        location = cache.get(appTaskId)
+        if location is not None and hostname in (None, location['hostname']):
+            if self.is_container_running(location['hostname'], location['container_id']):
+                return location['hostname'], location['container_id'], location['mesos_task_id']
+            # The task or its container is gone
+            self.update_task_cache(environment, removed_container=location['container_id'])
+
+        if hostname is None:
+            hostname = self.get_hostname_from_marathon(environment, roger_env, appTaskId, app_id)
+        containerId, mesosTaskId = '', ''
+        if hostname != '':  # Hostname maybe empty when the given appTaskId does not match any taskId from Marathon
+            containerId, mesosTaskId = self.get_containerid_mesostaskid(appTaskId, hostname)
+        if containerId != '':
+            self.update_task_cache(environment, {appTaskId: {'hostname': hostname, 'container_id': containerId,
+                                                             'mesos_task_id': mesosTaskId}})
+        return hostname, containerId, mesosTaskId
+
+    def is_container_running(self, hostname, containerId):
+        try:
+            resp = self.get_docker_session(hostname).get(
+                self.get_docker_url(hostname, "/containers/{}/json".format(containerId)),
+                timeout=DOCKER_API_TIMEOUT)
+        except requests.exceptions.RequestException:
+            return False
+        if resp.status_code != 200:
+            return False
+        return bool(resp.json().get('State', {}).get('Running'))
+
+    def remove_cached_container(self, cache, containerId):
+        for taskId in [taskId for taskId, location in cache.items()
+                       if location.get('container_id') == containerId]:
+            del cache[taskId]
+
+    def get_task_cache_path(self, environment):
+        return os.path.join(settings.getCacheDir(), 'tasks', "{}.json".format(environment))
+
+    def read_task_cache(self, environment):
+        try:
+            with open(self.get_task_cache_path(environment)) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return {}
+
+    def update_task_cache(self, environment, locations=None, removed_container=None):
+        """
+        adds the task locations to the cache of the environment and drops the
+        tasks of removed_container. The cache is shared by threads and roger
+        processes, so it is read again under a lock and replaced by renaming a
+        complete file over it.
+        """
+        cache_path = self.get_task_cache_path(environment)
+        try:
+            try:
+                os.makedirs(os.path.dirname(cache_path))
+            except OSError as exception:
+                if exception.errno != errno.EEXIST:
+                    raise
+            with lockfile(cache_path + '.lock'):
+                cache = self.read_task_cache(environment)
+                if removed_container is not None:
+                    self.remove_cached_container(cache, removed_container)
+                cache.update(locations or {})
+                fd, temp_path = tempfile.mkstemp(suffix='.tmp', prefix=os.path.basename(cache_path) + '.',
+                                                 dir=os.path.dirname(cache_path))
+                try:
+                    with os.fdopen(fd, 'w') as f:
+                        json.dump(cache, f)
+                    os.rename(temp_path, cache_path)
+                except (IOError, OSError):
+                    os.remove(temp_path)
+                    raise
+        except (IOError, OSError) as e:
+            print("WARNING - Unable to cache the task location in {}: {}".format(cache_path, e), file=sys.stderr)
+
+    def get_app_id_from_task_id(self, appTaskId):
+        """
+        Marathon task ids are the app id, with '/' replaced by '_', followed by
+        '.' and a unique id. Returns None when appTaskId does not contain the
+        complete app id part.
+        """
+        if '.' not in appTaskId:
+            return None
+        return '/' + appTaskId.split('.')[0].replace('_', '/')
+
+    def find_task_host(self, tasks, appTaskId):
+        hostname = ''
         for task in tasks:
             if task['id'].startswith(appTaskId):
                 hostname = task['host']
-
         return hostname
 
+    def get_docker_session(self, hostname):
+        """
+        returns the pooled, keep-alive session for the Docker Engine API of
+        the given host
+        """
+        return getHttpSession(self.get_docker_url(hostname, ''))
+
+    def get_docker_url(self, hostname, path):
+        return "http://{}:{}{}".format(hostname, DOCKER_PORT, path)
+
+    def get_container_task_id(self, hostname, container):
+        """
+        returns the MESOS_TASK_ID of a container, from its labels when set or
+        else from Config.Env of its inspect data. Returns '' when the container
+        does not have one or is gone.
+        """
+        labels = container.get('Labels') or {}
+        if MESOS_TASK_ID in labels:
+            return labels[MESOS_TASK_ID]
+        resp = self.get_docker_session(hostname).get(
+            self.get_docker_url(hostname, "/containers/{}/json".format(container['Id'])),
+            timeout=DOCKER_API_TIMEOUT)
+        if resp.status_code != 200:
+            return ''
+        for env in resp.json().get('Config', {}).get('Env') or []:
+            if env.startswith(MESOS_TASK_ID + '='):
+                return env[len(MESOS_TASK_ID) + 1:]
+        return ''
+
     def get_containerid_mesostaskid(self, appTaskId, hostname):
+        """
+        returns (containerId, mesosTaskId) of the first running container on
+        hostname whose MESOS_TASK_ID starts with appTaskId, ('', '') if there
+        is none. Uses the Docker Engine API on port 4243: one /containers/json
+        call, then the containers without a MESOS_TASK_ID label are inspected
+        concurrently over the pooled connection.
+        """
         containerId = ''
         mesosTaskId = ''
         try:
-            containers = subprocess.check_output(
-                "docker -H tcp://{}:4243 ps -q".format(hostname), shell=True)
-        except:
-            print("No route to host. Please check hostname '{}'".format(
-                hostname), file=sys.stderr)
-            return
-        for container in containers.split('\n'):
-            if container.strip() != '':
-                try:
-                    mesosTaskId = subprocess.check_output("docker -H tcp://{0}:4243 exec {1} \
-          printenv MESOS_TASK_ID".format(hostname, container), stderr=subprocess.STDOUT, shell=True)
-                except Exception as e:
-                    if ("Cannot connect to the Docker daemon" in str(e.output)):
-                        printException(e)
-                        break
-                    else:
-                        # This is the case when a container does not have a
-                        # MESOS_TASK_ID in its ENV variables
-                        pass
-                if mesosTaskId.startswith(appTaskId):
-                    containerId = container.strip()
+            resp = self.get_docker_session(hostname).get(
+                self.get_docker_url(hostname, "/containers/json"), timeout=DOCKER_API_TIMEOUT)
+            resp.raise_for_status()
+            containers = resp.json()
+        except requests.exceptions.RequestException as e:
+            print("No route to host. Please check hostname '{}' ({})".format(
+                hostname, e), file=sys.stderr)
+            return containerId, mesosTaskId
+
+        pool = ThreadPool(min(settings.getHttpPoolSize(), max(len(containers), 1)))
+        try:
+            # imap keeps the order of the containers, the first match wins
+            task_ids = pool.imap(lambda container: self.get_container_task_id(hostname, container), containers)
+            for index, taskId in enumerate(task_ids):
+                if taskId != '' and taskId.startswith(appTaskId):
+                    containerId = containers[index]['Id']
+                    mesosTaskId = taskId
                     break
+        except requests.exceptions.RequestException as e:
+            printException(e)
+        finally:
+            pool.terminate()
         return containerId, mesosTaskId
+
+    def exec_in_container(self, hostname, containerId, cmd, timeout):
+        """
+        runs cmd (a list) in the container through the Docker exec API and
+        returns (exit code, output) with stdout and stderr interleaved as they
+        were written. The exit code is None when the command did not finish
+        within timeout seconds; it is left running in the container then.
+        """
+        session = self.get_docker_session(hostname)
+        resp = session.post(self.get_docker_url(hostname, "/containers/{}/exec".format(containerId)),
+                            json={'AttachStdout': True, 'AttachStderr': True, 'Tty': False, 'Cmd': cmd},
+                            timeout=DOCKER_API_TIMEOUT)
+        resp.raise_for_status()
+        execId = resp.json()['Id']
+
+        deadline = time.time() + timeout
+        resp = session.post(self.get_docker_url(hostname, "/exec/{}/start".format(execId)),
+                            json={'Detach': False, 'Tty': False}, stream=True,
+                            timeout=(DOCKER_API_TIMEOUT, timeout))
+        output = []
+        try:
+            resp.raise_for_status()
+            for data in self.iter_docker_stream(resp.raw):
+                output.append(data)
+                if time.time() > deadline:
+                    return None, ''.join(output)
+        except (requests.exceptions.Timeout, requests.packages.urllib3.exceptions.ReadTimeoutError,
+                socket.timeout):
+            # The frames are read from resp.raw, where a read past the
+            # timeout raises the urllib3 or socket error
+            return None, ''.join(output)
+        finally:
+            resp.close()
+
+        resp = session.get(self.get_docker_url(hostname, "/exec/{}/json".format(execId)),
+                           timeout=DOCKER_API_TIMEOUT)
+        resp.raise_for_status()
+        return resp.json().get('ExitCode'), ''.join(output)
+
+    def iter_docker_stream(self, raw):
+        """
+        yields the payloads of a multiplexed (non tty) Docker attach stream.
+        Every frame starts with an 8 bytes header: the stream type, 3 zero
+        bytes and the big endian payload size.
+        """
+        while True:
+            header = raw.read(8)
+            if len(header) < 8:
+                return
+            size = struct.unpack('>I', header[4:])[0]
+            payload = raw.read(size)
+            if payload:
+                yield payload
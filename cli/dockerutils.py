@@ -5,12 +5,23 @@ import os
 import subprocess
 import sys
 import contextlib
+import hashlib
 import requests
 import json
-from cli.utils import printException, printErrorMsg
+import urlparse
+from cli.buildcontext import BuildContext
+from cli.utils import printException, printErrorMsg, getHttpSession
 from termcolor import colored
 requests.packages.urllib3.disable_warnings()
 
+CATALOG_PAGE_SIZE = 100
+REGISTRY_API_TIMEOUT = 30
+DOCKERFILE_DIGEST_LABEL = 'roger.dockerfile_digest'
+BUILD_ARGS_DIGEST_LABEL = 'roger.build_args_digest'
+CONTEXT_DIGEST_LABEL = 'roger.context_digest'
+MANIFEST_V2 = 'application/vnd.docker.distribution.manifest.v2+json'
+MANIFEST_V1 = 'application/vnd.docker.distribution.manifest.v1+prettyjws'
+
 
 @contextlib.contextmanager
 def chdir(dirname):
@@ -25,11 +36,36 @@ def chdir(dirname):
 
 class DockerUtils:
 
-    def docker_build(self, image_tag, docker_file, verbose_mode, build_args):
+    def __init__(self):
+        # Full catalog of every registry walked in this run, see docker_search_v2
+        self.catalogs = {}
+
+    def get_build_labels(self, docker_file, build_args, context_dir=None):
+        """
+        returns the labels that identify what an image was built from: the
+        digests of its Dockerfile and of its build args, and with context_dir
+        the digest of its whole build context. Images with the same git sha
+        and the same Dockerfile and build args, or with the same context, are
+        the same build, see RogerBuild.reuseBuild.
+        """
+        with open(docker_file, 'rb') as dockerfile:
+            dockerfile_digest = hashlib.sha256(dockerfile.read()).hexdigest()
+        build_args_digest = hashlib.sha256(json.dumps(build_args or {}, sort_keys=True)).hexdigest()
+        labels = {DOCKERFILE_DIGEST_LABEL: 'sha256:' + dockerfile_digest,
+                  BUILD_ARGS_DIGEST_LABEL: 'sha256:' + build_args_digest}
+        if context_dir is not None:
+            labels[CONTEXT_DIGEST_LABEL] = BuildContext(context_dir, docker_file, build_args).digest()
+        return labels
+
+    def docker_build(self, image_tag, docker_file, verbose_mode, build_args, labels=None):
         build_arg_str = ""
         if build_args:
             for key, value in build_args.iteritems():
                 build_arg_str = build_arg_str + "--build-arg {}={} ".format(key, value)
+        if labels is None:
+            labels = self.get_build_labels(docker_file, build_args)
+        for key, value in sorted(labels.items()):
+            build_arg_str = build_arg_str + "--label {}={} ".format(key, value)
 
         redirect = " >/dev/null 2>&1"
         if verbose_mode:
@@ -54,27 +90,119 @@ class DockerUtils:
             registry, name, application), shell=True)
         return result
 
-    def docker_search_v2(self, registry):
-        url = 'http://{}/v2/_catalog?n=500'.format(registry)
-        response = requests.get(url)
-        data = response.json()
-        tmp_repos_list = data['repositories']
-        result = ""
-        while(tmp_repos_list):
-            for item in tmp_repos_list:
-                result += item + '\n'
-            last_fetched_repo = tmp_repos_list[-1]
-            url = 'http://{}/v2/_catalog?n=100&last={}'.format(registry, last_fetched_repo)
-            response = requests.get(url)
-            data = response.json()
-            tmp_repos_list = data['repositories']
+    def get_registry_session(self, registry):
+        return getHttpSession('http://{}'.format(registry))
+
+    def get_catalog_page(self, registry, last):
+        params = {'n': CATALOG_PAGE_SIZE}
+        if last:
+            params['last'] = last
+        response = self.get_registry_session(registry).get(
+            'http://{}/v2/_catalog'.format(registry), params=params, timeout=REGISTRY_API_TIMEOUT)
+        response.raise_for_status()
+        return response.json()['repositories'] or []
+
+    def get_catalog(self, registry):
+        """
+        returns every repository of the registry. The walk through the whole
+        catalog is done once per registry and run.
+        """
+        if registry not in self.catalogs:
+            repos = []
+            page = self.get_catalog_page(registry, None)
+            while page:
+                repos.extend(page)
+                page = self.get_catalog_page(registry, page[-1])
+            self.catalogs[registry] = repos
+        return self.catalogs[registry]
 
+    def docker_search_v2(self, registry, prefix=''):
+        """
+        returns the repositories of the registry that start with prefix, one
+        per line. The catalog is served in lexical order, so the walk starts
+        right before prefix and stops at the first repository past it instead
+        of paging through the whole catalog. A registry that does not honour
+        'last' falls back to the cached full catalog.
+        """
+        if prefix == '' or registry in self.catalogs:
+            return ''.join(repo + '\n' for repo in self.get_catalog(registry) if repo.startswith(prefix))
+        result = ""
+        last = prefix
+        while True:
+            page = self.get_catalog_page(registry, last)
+            if not page:
+                break
+            if page[0] <= last:
+                return ''.join(repo + '\n' for repo in self.get_catalog(registry) if repo.startswith(prefix))
+            for repo in page:
+                if not repo.startswith(prefix):
+                    return result
+                result += repo + '\n'
+            last = page[-1]
         return result
 
+    def get_manifest(self, registry, repo, tag='latest'):
+        """
+        returns (media type, raw body) of the manifest of repo:tag
+        """
+        response = self.get_registry_session(registry).get(
+            'http://{}/v2/{}/manifests/{}'.format(registry, repo, tag), timeout=REGISTRY_API_TIMEOUT,
+            headers={'Accept': ', '.join([MANIFEST_V2, MANIFEST_V1])})
+        response.raise_for_status()
+        return response.headers.get('Content-Type', MANIFEST_V1).split(';')[0], response.content
+
+    def get_image_labels(self, registry, repo, tag='latest'):
+        """
+        returns the labels of the image repo:tag, read from the registry
+        """
+        media_type, body = self.get_manifest(registry, repo, tag)
+        manifest = json.loads(body)
+        if manifest.get('schemaVersion') == 2:
+            response = self.get_registry_session(registry).get(
+                'http://{}/v2/{}/blobs/{}'.format(registry, repo, manifest['config']['digest']),
+                timeout=REGISTRY_API_TIMEOUT)
+            response.raise_for_status()
+            image_config = response.json()
+        else:
+            image_config = json.loads(manifest['history'][0]['v1Compatibility'])
+        return (image_config.get('config') or {}).get('Labels') or {}
+
+    def retag_image(self, registry, source_repo, target_repo, tag='latest'):
+        """
+        makes the image source_repo:tag also available as target_repo:tag
+        within the registry: its blobs are mounted into target_repo and its
+        manifest is put there, so no layer is pulled or pushed. Returns False
+        if the registry cannot do it (schema 1 manifests are signed with the
+        name of their repository, some registries cannot mount blobs).
+        """
+        session = self.get_registry_session(registry)
+        media_type, body = self.get_manifest(registry, source_repo, tag)
+        if media_type != MANIFEST_V2:
+            return False
+        manifest = json.loads(body)
+        digests = [manifest['config']['digest']] + [layer['digest'] for layer in manifest['layers']]
+        for digest in digests:
+            response = session.post('http://{}/v2/{}/blobs/uploads/'.format(registry, target_repo),
+                                    params={'mount': digest, 'from': source_repo}, timeout=REGISTRY_API_TIMEOUT)
+            if response.status_code != 201:
+                # 202 starts a regular upload instead of mounting the blob,
+                # cancel it so that it does not linger in the registry
+                if response.status_code == 202 and response.headers.get('Location'):
+                    upload_url = urlparse.urljoin('http://{}/'.format(registry), response.headers['Location'])
+                    try:
+                        session.delete(upload_url, timeout=REGISTRY_API_TIMEOUT)
+                    except requests.exceptions.RequestException as e:
+                        print(colored("Could not cancel the upload {}: {}".format(upload_url, e), "yellow"))
+                return False
+        response = session.put('http://{}/v2/{}/manifests/{}'.format(registry, target_repo, tag), data=body,
+                               headers={'Content-Type': media_type}, timeout=REGISTRY_API_TIMEOUT)
+        response.raise_for_status()
+        return True
+
     def docker_search(self, registry, name, application):
         result = ""
         try:
-            result = self.docker_search_v2(registry)
+            result = self.docker_search_v2(registry, "{}-{}-".format(name, application))
         except (Exception) as e:
             error_message = "Error when attempting search using docker v2 catalog: {} ".format(e)
             printException(error_message)
@@ -7,6 +7,7 @@ import yaml
 
 from jinja2 import Environment, FileSystemLoader
 from cli.settings import Settings
+from cli.utils import getHttpSession
 from abc import ABCMeta, abstractmethod
 
 settings = Settings()
@@ -15,6 +16,17 @@ settings = Settings()
 class Framework(object):
     __metaclass__ = ABCMeta
 
+    def getSession(self, endpoint):
+        """
+        returns the pooled, keep-alive session for the given endpoint, shared
+        by every framework instance
+
+        :params:
+        :endpoint [str]: framework endpoint, for example the marathon_endpoint
+        :return: [requests.Session]
+        """
+        return getHttpSession(endpoint)
+
     def fetchUserPass(self, env):
         if self.user is None:
             self.user = settings.getUser()
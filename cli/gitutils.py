@@ -1,12 +1,24 @@
 #!/usr/bin/python
 
 from __future__ import print_function
+import errno
+import fcntl
 import os
+import pipes
+import re
+import shutil
 import subprocess
 import sys
+import time
+from multiprocessing.pool import ThreadPool
 from cli.appconfig import AppConfig
+from cli.settings import Settings
 import contextlib
 
+# Only the branches and tags are kept in the mirrors, not the refs/pull/* and
+# other refs a hosting service may add
+MIRROR_REFSPECS = ['+refs/heads/*:refs/heads/*', '+refs/tags/*:refs/tags/*']
+
 
 @contextlib.contextmanager
 def chdir(dirname):
@@ -19,8 +31,25 @@ def chdir(dirname):
         os.chdir(curdir)
 
 
+@contextlib.contextmanager
+def lockfile(path):
+    '''Withable exclusive lock on path, shared with other roger processes'''
+    with open(path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
 class GitUtils:
 
+    def __init__(self):
+        # Mirrors fetched since this time are not fetched again, see prefetchMirrors
+        self.fresh_since = None
+        self.prefetch_pool = None
+        self.prefetch_errors = {}
+
     def gitPull(self, branch, verbose):
         redirect = " >/dev/null 2>&1"
         if verbose:
@@ -38,10 +67,148 @@ class GitUtils:
         redirect = " >/dev/null 2>&1"
         if verbose:
             redirect = ""
+        repo_name = appObj.getRepoName(repo)
+        exit_code = self.cloneFromMirror(repo_url, branch, repo_name, verbose, depth=1)
+        if exit_code == 0:
+            return exit_code
+        print("Could not clone {} from its mirror, cloning it directly.".format(repo_url), file=sys.stderr)
+        if os.path.isdir(repo_name):
+            shutil.rmtree(repo_name)
         exit_code = os.system(
             "git clone --depth 1 --branch {} {} {}".format(branch, repo_url, redirect))
         return exit_code
 
+    def getMirrorPath(self, repo_url):
+        """
+        returns the path of the bare mirror of repo_url, e.g.
+        git@github.com:seomoz/roger.git -> <git mirror dir>/github.com_seomoz_roger.git
+        """
+        name = re.sub(r'^[a-z+]+://|^[^@/:]+@', '', repo_url)
+        name = re.sub(r'[^A-Za-z0-9._-]+', '_', name).strip('_')
+        if not name.endswith('.git'):
+            name += '.git'
+        return os.path.join(Settings().getGitMirrorDir(), name)
+
+    def updateMirror(self, repo_url, verbose):
+        """
+        fetches the new objects of repo_url into its bare mirror, creating the
+        mirror on first use. Returns the path of the mirror, or None if it
+        could not be updated.
+        """
+        redirect = " >/dev/null 2>&1"
+        if verbose:
+            redirect = ""
+        mirror = self.getMirrorPath(repo_url)
+        try:
+            os.makedirs(os.path.dirname(mirror))
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                print("Could not create git mirror dir. (Error: %s)" % e, file=sys.stderr)
+                return None
+        # Deploys running at the same time update the same mirror. The lock
+        # also makes a clone wait for the prefetch of its own repo only.
+        refspecs = ' '.join(pipes.quote(refspec) for refspec in MIRROR_REFSPECS)
+        with lockfile(mirror + '.lock'):
+            if self.isMirrorFresh(mirror):
+                exit_code = 0
+            elif os.path.isdir(mirror):
+                exit_code = os.system("git --git-dir={} fetch --prune origin {} {}".format(
+                    pipes.quote(mirror), refspecs, redirect))
+            else:
+                # Fetched aside, so an interrupted fetch never leaves a broken mirror behind
+                temp_mirror = mirror + '.tmp'
+                if os.path.isdir(temp_mirror):
+                    shutil.rmtree(temp_mirror)
+                exit_code = os.system("git init --quiet --bare {} {}".format(pipes.quote(temp_mirror), redirect))
+                if exit_code == 0:
+                    exit_code = os.system("git --git-dir={} remote add origin {} {}".format(
+                        pipes.quote(temp_mirror), pipes.quote(repo_url), redirect))
+                # The refspecs are always given, so only branches and tags are fetched
+                if exit_code == 0:
+                    exit_code = os.system("git --git-dir={} fetch origin {} {}".format(
+                        pipes.quote(temp_mirror), refspecs, redirect))
+                if exit_code == 0:
+                    os.rename(temp_mirror, mirror)
+                elif os.path.isdir(temp_mirror):
+                    shutil.rmtree(temp_mirror)
+            if exit_code == 0:
+                open(mirror + '.fetched', 'w').close()
+        if exit_code != 0:
+            return None
+        return mirror
+
+    def isMirrorFresh(self, mirror):
+        if self.fresh_since is None or not os.path.isdir(mirror):
+            return False
+        try:
+            return os.path.getmtime(mirror + '.fetched') >= self.fresh_since
+        except OSError:
+            return False
+
+    def prefetchMirrors(self, repo_urls, jobs, verbose):
+        """
+        starts updating the mirrors of repo_urls in the background, at most
+        jobs at the same time. A later clone of one of the repos, in this
+        process or in a forked one, waits for the prefetch of that repo only
+        and does not fetch it again. Failures are printed and recorded in
+        prefetch_errors per repo; the clone then fetches the repo itself.
+        """
+        self.fresh_since = time.time()
+        if not repo_urls:
+            return
+
+        def prefetch(repo_url):
+            start = time.time()
+            if self.updateMirror(repo_url, verbose) is None:
+                self.prefetch_errors[repo_url] = "fetch into {} failed".format(self.getMirrorPath(repo_url))
+                print("Could not prefetch {}: {}".format(repo_url, self.prefetch_errors[repo_url]),
+                      file=sys.stderr)
+            elif verbose:
+                print("Prefetched {} in {:.1f}s".format(repo_url, time.time() - start))
+
+        self.prefetch_pool = ThreadPool(min(jobs, len(repo_urls)))
+        for repo_url in repo_urls:
+            self.prefetch_pool.apply_async(prefetch, (repo_url,))
+        self.prefetch_pool.close()
+
+    def waitForPrefetch(self):
+        if self.prefetch_pool is not None:
+            self.prefetch_pool.join()
+            self.prefetch_pool = None
+
+    def cloneFromMirror(self, repo_url, branch, directory, verbose, depth=None):
+        """
+        clones repo_url into directory using its up to date mirror, so only
+        the objects that are new since the last fetch of the mirror are
+        downloaded. origin points to repo_url, so the clone can be pulled like
+        a direct clone.
+
+        :Params:
+        :branch [str]: branch to check out, None for the default branch
+        :depth [int]: clone only the last depth commits of branch from the
+                      mirror, optional. A full clone borrows the objects of
+                      the mirror (git clone --reference) instead.
+        """
+        redirect = " >/dev/null 2>&1"
+        if verbose:
+            redirect = ""
+        mirror = self.updateMirror(repo_url, verbose)
+        if mirror is None:
+            return 1
+        branch_option = ""
+        if branch:
+            branch_option = "--branch {}".format(pipes.quote(branch))
+        if depth is None:
+            return os.system("git clone --reference {} {} {} {} {}".format(
+                pipes.quote(mirror), branch_option, pipes.quote(repo_url), pipes.quote(directory), redirect))
+        # A local path would ignore --depth
+        exit_code = os.system("git clone --depth {} {} {} {} {}".format(
+            depth, branch_option, pipes.quote('file://' + os.path.abspath(mirror)), pipes.quote(directory), redirect))
+        if exit_code == 0:
+            exit_code = os.system("git --git-dir={} remote set-url origin {} {}".format(
+                pipes.quote(os.path.join(directory, '.git')), pipes.quote(repo_url), redirect))
+        return exit_code
+
     def gitClone(self, repo, branch):
         appObj = AppConfig()
         try:
@@ -2,22 +2,83 @@
 
 from __future__ import print_function
 import os
+import errno
+import hashlib
+import json
 import requests
 import subprocess
 import sys
 import re
+import tempfile
+import urlparse
 from cli.appconfig import AppConfig
 from cli.settings import Settings
+from cli.prefixtrie import PrefixTrie
+from cli.utils import getHttpSession
 requests.packages.urllib3.disable_warnings()
 
+BACKEND_RULE_PATTERN = re.compile("^( ).*use_backend (.*)-cluster.* if (.*)-aclrule$")
+BACKEND_SERVICE_PATTERN = re.compile("^listen (.*)-cluster-tcp-(.*) :(.*)")
+
+
+class HAProxyRoutes(object):
+    """
+    Routing index built from a parsed HAProxy config. Lookups in both
+    directions (app id to routes and route to app id) are constant time.
+    """
+
+    def __init__(self, path_begin_values=None, backend_tcp_ports=None):
+        self.path_begin_values = {}
+        self.backend_tcp_ports = {}
+        self.app_prefixes = {}
+        self.app_tcp_ports = {}
+        self.prefix_trie = PrefixTrie()
+        for path_begin_value, app_id in (path_begin_values or {}).items():
+            self.add_path_begin_value(path_begin_value, app_id)
+        for tcp_port, app_id in (backend_tcp_ports or {}).items():
+            self.add_tcp_port(tcp_port, app_id)
+
+    def add_path_begin_value(self, path_begin_value, app_id):
+        self._add(self.path_begin_values, self.app_prefixes, path_begin_value, app_id)
+        self.prefix_trie.insert(path_begin_value, app_id)
+
+    def add_tcp_port(self, tcp_port, app_id):
+        self._add(self.backend_tcp_ports, self.app_tcp_ports, tcp_port, app_id)
+
+    def _add(self, route_to_app, app_to_routes, route, app_id):
+        # A route can only belong to one app, the last rule in the config wins
+        previous_app_id = route_to_app.get(route)
+        if previous_app_id == app_id:
+            return
+        if previous_app_id is not None:
+            app_to_routes[previous_app_id].remove(route)
+            if not app_to_routes[previous_app_id]:
+                del app_to_routes[previous_app_id]
+        route_to_app[route] = app_id
+        app_to_routes.setdefault(app_id, []).append(route)
+
+    def get_app_for_path_begin_value(self, path_begin_value):
+        return self.path_begin_values.get(path_begin_value)
+
+    def get_app_for_tcp_port(self, tcp_port):
+        return self.backend_tcp_ports.get(tcp_port)
+
+    def get_app_path_begin_values(self, app_id):
+        return self.app_prefixes.get(app_id, [])
+
+    def get_app_tcp_ports(self, app_id):
+        return self.app_tcp_ports.get(app_id, [])
+
 
 class HAProxyParser:
 
-    path_begin_values = {}
-    backend_services_tcp_ports = {}
+    # Parsed HAProxyRoutes keyed by environment
+    _parsed_configs = {}
 
-    def get_haproxy_config(self, environment):
-        haproxy_config = ""
+    def __init__(self):
+        self.routes = HAProxyRoutes()
+
+    def get_haproxy_config_url(self, environment):
         settingObj = Settings()
         appObj = AppConfig()
         config_dir = settingObj.getConfigDir()
@@ -25,42 +86,179 @@ class HAProxyParser:
         host = roger_env['environments'][environment]['host']
         haproxy_config_path = roger_env['environments'][
             environment]['haproxy_config_path']
-        url = "{}{}".format(host, haproxy_config_path)
-        haproxy_config = requests.get(url, stream=True)
-        return haproxy_config.text
-
-    def parseConfig(self, environment):
-        path_begin_values = {}
-        backend_tcp_ports = {}
-        config = self.get_haproxy_config(environment)
-
-        backend_rules_pattern = re.compile(
-            "^( ).*use_backend (.*)-cluster.* if (.*)-aclrule$", re.MULTILINE)
-        backend_rules = backend_rules_pattern.findall(config)
-        backend_service_pattern = re.compile(
-            "^listen (.*)-cluster-tcp-(.*) :(.*)", flags=re.MULTILINE)
-        backends_service_names = backend_service_pattern.findall(config)
-        for rule in backend_rules:
-            backend_name = rule[1].replace("::", "/")
-            path_begin_value = rule[2].replace("::", "/")
-            path_begin_values[path_begin_value] = backend_name
-
-        for service in backends_service_names:
-            backend_service_name = service[0].replace("::", "/")
-            tcp_port = service[2]
-            backend_tcp_ports[tcp_port] = backend_service_name
-
-        self.set_path_begin_values(path_begin_values)
-        self.set_backend_tcp_ports(backend_tcp_ports)
+        return "{}{}".format(host, haproxy_config_path)
+
+    def get_haproxy_config(self, url, etag=None, last_modified=None):
+        """
+        returns the response for the haproxy config. When validators from a
+        previous download are given, the request is conditional and the server
+        answers with a 304 if the config did not change.
+        """
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        base_url = "{0.scheme}://{0.netloc}".format(urlparse.urlparse(url))
+        return getHttpSession(base_url).get(url, headers=headers, stream=True)
+
+    def parseConfig(self, environment, refresh=False):
+        """
+        loads the routing index of the given environment. The parsed config is
+        cached per environment so that it is only downloaded and parsed once
+        per run; pass refresh=True to fetch it again.
+        """
+        if refresh or environment not in HAProxyParser._parsed_configs:
+            HAProxyParser._parsed_configs[environment] = self.load_routes(environment)
+
+        self.routes = HAProxyParser._parsed_configs[environment]
+
+    def load_routes(self, environment):
+        """
+        returns the HAProxyRoutes of the given environment. The config is
+        parsed line by line while it downloads and the on-disk cache is reused
+        when the load balancer reports it unchanged (304).
+        """
+        url = self.get_haproxy_config_url(environment)
+        cached = self.read_cache(environment)
+        if cached.get('url') != url:
+            cached = {}
+
+        resp = self.get_haproxy_config(url, cached.get('etag'), cached.get('last_modified'))
+        if resp.status_code != 200:
+            # Hands the pooled connection back without reading the body
+            resp.close()
+        if resp.status_code == 304 and cached:
+            return HAProxyRoutes(cached['path_begin_values'], cached['backend_tcp_ports'])
+        if resp.status_code != 200:
+            # An error page must neither be parsed nor cached as an empty routing table
+            raise ValueError("Unable to fetch the haproxy config from {}: HTTP {}".format(url, resp.status_code))
+
+        cache_path = self.get_cache_path(environment)
+        config_file = self.open_cache_file(cache_path, '.cfg.tmp')
+        digest = hashlib.sha256()
+        routes = HAProxyRoutes()
+        try:
+            for line in resp.iter_lines():
+                self.parse_line(routes, line)
+                line = line + b"\n"
+                digest.update(line)
+                if config_file is not None:
+                    config_file.write(line)
+        finally:
+            if config_file is not None:
+                config_file.close()
+
+        sha256 = digest.hexdigest()
+        if config_file is not None:
+            # Without validators from the server the content hash tells
+            # whether the cached copy of the raw config needs replacing
+            try:
+                if cached and cached.get('sha256') == sha256:
+                    os.remove(config_file.name)
+                else:
+                    os.rename(config_file.name, "{}.cfg".format(cache_path))
+            except OSError as e:
+                print("WARNING - Unable to cache the haproxy config in {}: {}".format(cache_path, e), file=sys.stderr)
+                self.remove_cache_file(config_file.name)
+            self.write_cache(environment, {
+                'url': url,
+                'etag': resp.headers.get('ETag'),
+                'last_modified': resp.headers.get('Last-Modified'),
+                'sha256': sha256,
+                'path_begin_values': routes.path_begin_values,
+                'backend_tcp_ports': routes.backend_tcp_ports
+            })
+        return routes
+
+    def get_cache_path(self, environment):
+        cache_dir = os.path.join(Settings().getCacheDir(), 'haproxy')
+        return os.path.join(cache_dir, environment)
+
+    def open_cache_file(self, cache_path, suffix):
+        """
+        returns a new temporary file next to cache_path, to be renamed over
+        the cached file once complete. Every loader writes its own file, so
+        that processes loading the same environment do not clobber each other.
+        """
+        try:
+            try:
+                os.makedirs(os.path.dirname(cache_path))
+            except OSError as exception:
+                if exception.errno != errno.EEXIST:
+                    raise
+            fd, file_path = tempfile.mkstemp(suffix=suffix, prefix=os.path.basename(cache_path) + '.',
+                                             dir=os.path.dirname(cache_path))
+            os.close(fd)
+            return open(file_path, 'wb')
+        except (IOError, OSError) as e:
+            print("WARNING - Unable to cache the haproxy config in {}: {}".format(cache_path, e), file=sys.stderr)
+            return None
+
+    def read_cache(self, environment):
+        try:
+            with open("{}.json".format(self.get_cache_path(environment))) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return {}
+
+    def write_cache(self, environment, index):
+        cache_path = self.get_cache_path(environment)
+        index_file = self.open_cache_file(cache_path, '.json.tmp')
+        if index_file is None:
+            return
+        try:
+            with index_file:
+                json.dump(index, index_file)
+            os.rename(index_file.name, "{}.json".format(cache_path))
+        except (IOError, OSError) as e:
+            print("WARNING - Unable to cache the haproxy config in {}: {}".format(cache_path, e), file=sys.stderr)
+            self.remove_cache_file(index_file.name)
+
+    def remove_cache_file(self, file_path):
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+
+    def parse(self, lines):
+        routes = HAProxyRoutes()
+        for line in lines:
+            self.parse_line(routes, line)
+        return routes
+
+    def parse_line(self, routes, line):
+        if 'use_backend' in line:
+            rule = BACKEND_RULE_PATTERN.match(line)
+            if rule:
+                backend_name = rule.group(2).replace("::", "/")
+                path_begin_value = rule.group(3).replace("::", "/")
+                routes.add_path_begin_value(path_begin_value, backend_name)
+        elif line.startswith('listen '):
+            service = BACKEND_SERVICE_PATTERN.match(line)
+            if service:
+                backend_service_name = service.group(1).replace("::", "/")
+                tcp_port = service.group(3)
+                routes.add_tcp_port(tcp_port, backend_service_name)
+
+    @classmethod
+    def clearCache(cls, environment=None):
+        if environment is None:
+            cls._parsed_configs.clear()
+        else:
+            cls._parsed_configs.pop(environment, None)
+
+    def get_routes(self):
+        return self.routes
 
     def set_path_begin_values(self, path_begin_values_aclnames):
-        self.path_begin_values = path_begin_values_aclnames
+        self.routes = HAProxyRoutes(path_begin_values_aclnames, self.routes.backend_tcp_ports)
 
     def get_path_begin_values(self):
-        return self.path_begin_values
+        return self.routes.path_begin_values
 
     def set_backend_tcp_ports(self, backend_services_tcp_ports):
-        self.backend_services_tcp_ports = backend_services_tcp_ports
+        self.routes = HAProxyRoutes(self.routes.path_begin_values, backend_services_tcp_ports)
 
     def get_backend_tcp_ports(self):
-        return self.backend_services_tcp_ports
+        return self.routes.backend_tcp_ports
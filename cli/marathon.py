@@ -14,6 +14,7 @@ from cli.utils import Utils
 from cli.settings import Settings
 from cli.marathonvalidator import MarathonValidator
 from cli.haproxyparser import HAProxyParser
+from cli.prefixtrie import PrefixTrie
 from cli.appconfig import AppConfig
 requests.packages.urllib3.disable_warnings()
 
@@ -33,10 +34,10 @@ class Marathon(Framework):
         return "Marathon"
 
     def get(self, roger_env, environment):
-        url = roger_env['environments'][environment][
-            'marathon_endpoint'] + "/v2/apps"
+        endpoint = roger_env['environments'][environment]['marathon_endpoint']
+        url = endpoint + "/v2/apps"
         self.fetchUserPass(environment)
-        resp = requests.get(url, auth=(self.user, self.passw))
+        resp = self.getSession(endpoint).get(url, auth=(self.user, self.passw))
         color = "green"
         if re.compile("[45]\d{2}").match(str(resp.status_code)):
             color = "red"
@@ -50,15 +51,16 @@ class Marathon(Framework):
 
         print(colored("TRIGGERING MARATHON FRAMEWORK UPDATE FOR APPLICATION: {}".format(container), "cyan"))
         resp = ""
+        session = self.getSession(environmentObj['marathon_endpoint'])
         if 'groups' in data:
             if not act_as_user:
-                resp = requests.put("{}/v2/groups/{}".format(environmentObj['marathon_endpoint'], appName),
-                                    data=data,
-                                    headers={'Content-type': 'application/json'}, auth=(self.user, self.passw))
+                resp = session.put("{}/v2/groups/{}".format(environmentObj['marathon_endpoint'], appName),
+                                   data=data,
+                                   headers={'Content-type': 'application/json'}, auth=(self.user, self.passw))
             else:
-                resp = requests.put("{}/v2/groups/{}".format(environmentObj['marathon_endpoint'], appName),
-                                    data=data,
-                                    headers={'Content-type': 'application/json', 'act-as-user': act_as_user}, auth=(self.user, self.passw))
+                resp = session.put("{}/v2/groups/{}".format(environmentObj['marathon_endpoint'], appName),
+                                   data=data,
+                                   headers={'Content-type': 'application/json', 'act-as-user': act_as_user}, auth=(self.user, self.passw))
 
             print(colored("curl -X PUT -H 'Content-type: application/json' --data-binary @{} {}/v2/groups/{}".format(
                 file_path, environmentObj['marathon_endpoint'], appName), "cyan"))
@@ -70,11 +72,11 @@ class Marathon(Framework):
             endpoint = environmentObj['marathon_endpoint']
             deploy_url = "{}/v2/apps/{}".format(endpoint, appName)
             if not act_as_user:
-                resp = requests.put(deploy_url, data=data, headers={
-                                    'Content-type': 'application/json'}, auth=(self.user, self.passw))
+                resp = session.put(deploy_url, data=data, headers={
+                                   'Content-type': 'application/json'}, auth=(self.user, self.passw))
             else:
-                resp = requests.put(deploy_url, data=data, headers={
-                                    'Content-type': 'application/json', 'act-as-user': act_as_user}, auth=(self.user, self.passw))
+                resp = session.put(deploy_url, data=data, headers={
+                                   'Content-type': 'application/json', 'act-as-user': act_as_user}, auth=(self.user, self.passw))
             print(colored("curl -X PUT -H 'Content-type: application/json' --data-binary @{} {}/v2/apps/{}".format(
                 file_path, environmentObj['marathon_endpoint'], appName), "yellow"))
             color = "green"
@@ -121,13 +123,15 @@ class Marathon(Framework):
         return group_details
 
     def validateGroupDetails(self, group_details, message_list):
-        http_prefixes = {}
+        http_prefixes = PrefixTrie()
         tcp_ports = {}
         result = True
 
         for app_id, detail in group_details.iteritems():
             http_prefix = detail[0]
             enable_affinity = detail[2]
+            if http_prefix != '':
+                self.marathonvalidator.check_path_begin_overlaps(http_prefixes, http_prefix, app_id, message_list)
             if (http_prefix in http_prefixes):
                 if enable_affinity is False:
                     message_list.append(
@@ -138,7 +142,7 @@ class Marathon(Framework):
                         "WARNING: HTTP_PREFIX conflict in Marathon template file. HTTP_PREFIX '{}' is used in multiple places.".format(http_prefix))
             else:
                 if http_prefix != '':
-                    http_prefixes[http_prefix] = app_id
+                    http_prefixes.insert(http_prefix, app_id)
 
             tcp_port_list = detail[1]
             for tcp_port in tcp_port_list:
@@ -242,14 +246,70 @@ class Marathon(Framework):
 
         return app_envs
 
-    def getApps(self, roger_env, environment):
+    def getClusterSnapshot(self, roger_env, environment, selector=None):
+        """
+        returns (instance_details, app_envs) for the running tasks and apps of
+        the cluster, built from a single /v2/apps?embed=apps.tasks request.
+        Only the fields used are kept from the response.
+
+        :params:
+        :selector [cli.appselector.AppSelector]: only include these apps, optional
+        """
+        apps = self.getApps(roger_env, environment, embed_tasks=True, selector=selector)
+        instance_details = {}
+        app_envs = {}
+        for app in apps:
+            if selector is not None and not selector.matches(app):
+                continue
+            app_id = app['id']
+            app_envs[app_id] = app.get('env', {})
+            for task in app.get('tasks', []):
+                if task.get('state', 'TASK_RUNNING') != 'TASK_RUNNING':
+                    continue
+                instance_details[task['id']] = (
+                    app_id, task['host'], task['ports'], task['startedAt'])
+
+        return instance_details, app_envs
+
+    def getEvents(self, roger_env, environment, event_types=None):
+        """
+        yields the events of the Marathon /v2/events server-sent event stream
+
+        :params:
+        :event_types [list]: only subscribe to these event types, if given
+        """
         self.fetchUserPass(environment)
-        headers = {'Accept': 'application/json',
-                   'Accept-Encoding': 'gzip, deflate', 'Content-Type': 'application/json'}
-        url = roger_env['environments'][environment][
-            'marathon_endpoint'] + '/v2/apps'
-        resp = requests.get("{}".format(url), headers=headers,
-                            auth=(self.user, self.passw))
+        endpoint = roger_env['environments'][environment]['marathon_endpoint']
+        url = endpoint + '/v2/events'
+        params = [('event_type', event_type) for event_type in (event_types or [])]
+        resp = self.getSession(endpoint).get(url, params=params, headers={'Accept': 'text/event-stream'},
+                                             auth=(self.user, self.passw), stream=True)
+        color = "green"
+        if re.compile("[45]\d{2}").match(str(resp.status_code)):
+            color = "red"
+        print(colored("Server response for events: [ {} - {} ]".format(resp.status_code, resp.reason), color))
+        resp.raise_for_status()
+        data = []
+        # Events are small and must not wait for a full read buffer
+        for line in resp.iter_lines(chunk_size=1):
+            if line.startswith('data:'):
+                data.append(line[len('data:'):].strip())
+            elif line == '' and data:
+                yield json.loads('\n'.join(data))
+                data = []
+
+    def getApps(self, roger_env, environment, embed_tasks=False, selector=None):
+        self.fetchUserPass(environment)
+        headers = {'Accept': 'application/json', 'Content-Type': 'application/json'}
+        endpoint = roger_env['environments'][environment]['marathon_endpoint']
+        url = endpoint + '/v2/apps'
+        params = []
+        if embed_tasks:
+            params.append(('embed', 'apps.tasks'))
+        if selector is not None:
+            params.extend(selector.query_params())
+        resp = self.getSession(endpoint).get(url, params=params, headers=headers,
+                                             auth=(self.user, self.passw))
         color = "green"
         if re.compile("[45]\d{2}").match(str(resp.status_code)):
             color = "red"
@@ -258,14 +318,34 @@ class Marathon(Framework):
         apps = resp.json()['apps'] if 'apps' in resp_json else {}
         return apps
 
+    def getAppTasks(self, roger_env, environment, app_id):
+        """
+        returns the running tasks of a single app from /v2/apps/{app_id}/tasks,
+        or None if Marathon does not know the app
+        """
+        self.fetchUserPass(environment)
+        headers = {'Accept': 'application/json', 'Content-Type': 'application/json'}
+        endpoint = roger_env['environments'][environment]['marathon_endpoint']
+        url = "{}/v2/apps/{}/tasks".format(endpoint, app_id.strip('/'))
+        resp = self.getSession(endpoint).get(url, headers=headers,
+                                             auth=(self.user, self.passw))
+        color = "green"
+        if re.compile("[45]\d{2}").match(str(resp.status_code)):
+            color = "red"
+        print(colored("Server response for app tasks: [ {} - {} ]".format(resp.status_code, resp.reason), color))
+        if resp.status_code == 404:
+            return None
+        respjson = resp.json()
+        tasks = respjson['tasks'] if 'tasks' in respjson else []
+        return [task for task in tasks if task.get('state', 'TASK_RUNNING') == 'TASK_RUNNING']
+
     def getTasks(self, roger_env, environment):
         self.fetchUserPass(environment)
-        headers = {'Accept': 'application/json',
-                   'Accept-Encoding': 'gzip, deflate', 'Content-Type': 'application/json'}
-        url = roger_env['environments'][environment][
-            'marathon_endpoint'] + '/v2/tasks?status=running'
-        resp = requests.get("{}".format(url), headers=headers,
-                            auth=(self.user, self.passw))
+        headers = {'Accept': 'application/json', 'Content-Type': 'application/json'}
+        endpoint = roger_env['environments'][environment]['marathon_endpoint']
+        url = endpoint + '/v2/tasks?status=running'
+        resp = self.getSession(endpoint).get(url, headers=headers,
+                                             auth=(self.user, self.passw))
         color = "green"
         if re.compile("[45]\d{2}").match(str(resp.status_code)):
             color = "red"
@@ -301,6 +381,6 @@ class Marathon(Framework):
         location = config['environments'][env]['marathon_endpoint']
         url = '{location}/v2/apps/{app_id}'.format(
             location=location, app_id=app_id)
-        res = requests.get(url, auth=(username, password))
+        res = self.getSession(location).get(url, auth=(username, password))
         image = res.json()['app']['container']['docker']['image']
         return image
@@ -18,26 +18,44 @@ class MarathonValidator:
         return (path_begin_check and tcp_port_check)
 
     def check_path_begin_value(self, haproxy_parser_obj, path_begin_value, affinity, acl_name, message_list):
-        path_begin_values = haproxy_parser_obj.get_path_begin_values()
-        if path_begin_value in path_begin_values.keys():
-            if path_begin_values[path_begin_value] != acl_name:
+        routes = haproxy_parser_obj.get_routes()
+        if path_begin_value == "":
+            return True
+
+        self.check_path_begin_overlaps(routes.prefix_trie, path_begin_value, acl_name, message_list)
+        app_id = routes.get_app_for_path_begin_value(path_begin_value)
+        if app_id is not None:
+            if app_id != acl_name:
                 if affinity is False:
                     message_list.append("HTTP PREFIX validation check failed. The HTTP PREFIX '{}' you are trying "
-                                        "to use is already in use by app id: '{}'".format(path_begin_value, path_begin_values[path_begin_value]))
+                                        "to use is already in use by app id: '{}'".format(path_begin_value, app_id))
                     return False
                 else:
                     message_list.append("WARNING: The HTTP PREFIX '{}' you are trying "
-                                        "to use is already in use by app id: '{}'".format(path_begin_value, path_begin_values[path_begin_value]))
+                                        "to use is already in use by app id: '{}'".format(path_begin_value, app_id))
                     return True
             else:
                 return True
 
         return True
 
+    def check_path_begin_overlaps(self, prefix_trie, path_begin_value, acl_name, message_list):
+        """
+        HAProxy routes on path_beg, so a prefix that begins another one shadows
+        it. Overlaps with other apps are reported as warnings.
+        """
+        # Every prefix below is checked, one owned by the same app does not
+        # hide those of other apps
+        overlaps = prefix_trie.shorter_prefixes(path_begin_value) + prefix_trie.longer_prefixes(path_begin_value)
+        for prefix, app_id in overlaps:
+            if prefix != "" and app_id != acl_name:
+                message_list.append("WARNING: The HTTP PREFIX '{}' you are trying to use overlaps with the HTTP "
+                                    "PREFIX '{}' in use by app id: '{}'".format(path_begin_value, prefix, app_id))
+
     def check_tcp_port(self, haproxy_parser_obj, tcp_port_list, acl_name, message_list):
         backend_services_tcp_ports = haproxy_parser_obj.get_backend_tcp_ports()
         for tcp_port in tcp_port_list:
-            if tcp_port in backend_services_tcp_ports.keys():
+            if tcp_port in backend_services_tcp_ports:
                 if backend_services_tcp_ports[tcp_port] != acl_name:
                     message_list.append("TCP PORT validation check failed. The TCP PORT '{}' you are trying "
                                         "to use is already in use by app id: '{}'".format(tcp_port, backend_services_tcp_ports[tcp_port]))
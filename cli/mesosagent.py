@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+
+from __future__ import print_function
+import json
+import requests
+import time
+from cli.utils import getHttpSession
+requests.packages.urllib3.disable_warnings()
+
+MESOS_AGENT_PORT = 5051
+MESOS_AGENT_TIMEOUT = 10
+DEFAULT_CHUNK_SIZE = 64 * 1024
+SANDBOX_FILES = ('stdout', 'stderr')
+
+
+class MesosAgent(object):
+    """
+    Reads task sandboxes through the HTTP API of a Mesos agent, so logs can be
+    read on hosts where the Docker port is not reachable.
+
+    :params:
+    :hostname [str]: agent host
+    :port [int]: agent port, defaults to 5051
+    """
+
+    def __init__(self, hostname, port=MESOS_AGENT_PORT):
+        self.hostname = hostname
+        self.port = port
+        self.endpoint = "http://{}:{}".format(hostname, port)
+
+    def getSession(self):
+        return getHttpSession(self.endpoint)
+
+    def get_response(self, path, params=None):
+        resp = self.getSession().get(self.endpoint + path, params=params, timeout=MESOS_AGENT_TIMEOUT)
+        resp.raise_for_status()
+        return resp
+
+    def get(self, path, params=None):
+        return self.get_response(path, params).json()
+
+    def get_state(self):
+        try:
+            return self.get('/state')
+        except requests.exceptions.HTTPError as e:
+            # Agents before Mesos 1.1 only serve /state.json
+            if e.response is None or e.response.status_code != 404:
+                raise
+            return self.get('/state.json')
+
+    def find_task(self, task_id):
+        """
+        returns (task id, sandbox directory) of the first task on the agent
+        whose id starts with task_id, or None
+        """
+        state = self.get_state()
+        for framework in state.get('frameworks', []) + state.get('completed_frameworks', []):
+            for executor in framework.get('executors', []) + framework.get('completed_executors', []):
+                tasks = executor.get('tasks', []) + executor.get('completed_tasks', [])
+                task_ids = [task['id'] for task in tasks] or [executor.get('id', '')]
+                for id in task_ids:
+                    if id.startswith(task_id):
+                        return id, executor['directory']
+        return None
+
+    def read_file(self, path, offset, length):
+        """
+        returns up to length bytes of the sandbox file at path, from offset
+        """
+        resp = self.get_response('/files/read', params={'path': path, 'offset': offset, 'length': length})
+        # The agent passes the file bytes through as a JSON string. Read as
+        # latin-1 every byte is one character, so the data matches the offsets
+        # of the file even when a chunk ends within a multibyte character.
+        return json.loads(resp.content.decode('latin-1'))['data'].encode('latin-1')
+
+    def get_file_size(self, path):
+        # An offset of -1 only returns the size of the file
+        return self.get('/files/read', params={'path': path, 'offset': -1})['offset']
+
+    def get_tail_offset(self, path, size, lines, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        returns the offset of the last lines of the file, reading it backwards
+        chunk by chunk
+        """
+        if lines == 0:
+            return size
+        newlines = 0
+        position = size
+        while position > 0:
+            start = max(0, position - chunk_size)
+            data = self.read_file(path, start, position - start)
+            for index in range(len(data) - 1, -1, -1):
+                # A trailing newline does not start another line
+                if data[index] == '\n' and start + index != size - 1:
+                    newlines += 1
+                    if newlines == lines:
+                        return start + index + 1
+            position = start
+        return 0
+
+    def iter_sandbox_lines(self, directory, follow=False, tail=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                           poll_interval=1, files=SANDBOX_FILES):
+        """
+        yields the lines of the stdout and stderr files of a sandbox. Every
+        file is read from an offset, so with follow only the new bytes are
+        transferred on each poll.
+
+        :params:
+        :tail [int]: start with the last tail lines of every file, optional
+        """
+        offsets = {}
+        partial = {}
+        for name in files:
+            path = "{}/{}".format(directory, name)
+            offsets[name] = 0
+            if tail is not None and tail >= 0:
+                offsets[name] = self.get_tail_offset(path, self.get_file_size(path), tail, chunk_size)
+            partial[name] = ''
+
+        while True:
+            read = False
+            for name in files:
+                path = "{}/{}".format(directory, name)
+                while True:
+                    data = self.read_file(path, offsets[name], chunk_size)
+                    if data == '':
+                        break
+                    read = True
+                    offsets[name] += len(data)
+                    lines = (partial[name] + data).split('\n')
+                    partial[name] = lines.pop()
+                    for line in lines:
+                        yield line
+                    if len(data) < chunk_size:
+                        break
+            if not follow:
+                break
+            if not read:
+                time.sleep(poll_interval)
+
+        for name in files:
+            if partial[name] != '':
+                yield partial[name]
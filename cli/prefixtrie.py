@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+
+from __future__ import print_function
+
+
+class _Node(object):
+
+    __slots__ = ('children', 'has_value', 'value')
+
+    def __init__(self):
+        self.children = {}
+        self.has_value = False
+        self.value = None
+
+
+class PrefixTrie(object):
+    """
+    Character trie over HTTP path prefixes. HAProxy routes on path_beg, so a
+    prefix does not only conflict with an identical prefix, it also shadows
+    (or is shadowed by) every prefix it is the beginning of. Lookups are
+    O(length of the prefix) plus the number of prefixes they return,
+    independent of the number of other stored prefixes.
+    """
+
+    def __init__(self, items=None):
+        self.root = _Node()
+        for key, value in (items or {}).items():
+            self.insert(key, value)
+
+    def insert(self, key, value):
+        node = self.root
+        for char in key:
+            node = node.children.setdefault(char, _Node())
+        node.has_value = True
+        node.value = value
+
+    def get(self, key, default=None):
+        node = self._find_node(key)
+        if node is None or not node.has_value:
+            return default
+        return node.value
+
+    def __contains__(self, key):
+        node = self._find_node(key)
+        return node is not None and node.has_value
+
+    def shorter_prefixes(self, key):
+        """
+        returns the (prefix, value) pairs of stored prefixes that key starts
+        with, shortest first; key itself is not included
+        """
+        found = []
+        node = self.root
+        for index, char in enumerate(key):
+            if node.has_value:
+                found.append((key[:index], node.value))
+            node = node.children.get(char)
+            if node is None:
+                break
+        return found
+
+    def longer_prefixes(self, key):
+        """
+        returns the (prefix, value) pairs of all stored prefixes that start
+        with key, sorted by prefix; key itself is not included
+        """
+        node = self._find_node(key)
+        if node is None:
+            return []
+        found = []
+        stack = [(key + char, child) for char, child in node.children.items()]
+        while stack:
+            prefix, node = stack.pop()
+            if node.has_value:
+                found.append((prefix, node.value))
+            stack.extend((prefix + char, child) for char, child in node.children.items())
+        return sorted(found)
+
+    def _find_node(self, key):
+        node = self.root
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
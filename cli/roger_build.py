@@ -4,14 +4,17 @@ from __future__ import print_function
 import argparse
 import json
 import os
+import requests
+import sqlite3
 import sys
 from cli.settings import Settings
 from cli.appconfig import AppConfig
 from cli.hooks import Hooks
 from cli.utils import Utils
 from cli.utils import printException, printErrorMsg
-from cli.dockerutils import DockerUtils
+from cli.dockerutils import DockerUtils, CONTEXT_DIGEST_LABEL, DOCKERFILE_DIGEST_LABEL, BUILD_ARGS_DIGEST_LABEL
 from cli.docker_build import Docker
+from cli.versionindex import VersionIndex
 from termcolor import colored
 from datetime import datetime
 
@@ -31,6 +34,11 @@ def chdir(dirname):
         os.chdir(curdir)
 
 
+# Number of the latest versions whose build context is read from the registry
+# when the index does not know it yet
+REUSE_LOOKBACK = 5
+
+
 def describe():
     return 'runs the docker build and optionally pushes it into the registry.'
 
@@ -43,6 +51,7 @@ class RogerBuild(object):
         self.outcome = 1
         self.registry = ""
         self.tag_name = ""
+        self.versionIndex = VersionIndex()
 
     def parse_args(self):
         self.parser = argparse.ArgumentParser(
@@ -58,8 +67,67 @@ class RogerBuild(object):
         self.parser.add_argument('-v', '--verbose', help="verbose mode for debugging. Defaults to false.", action="store_true")
         self.parser.add_argument(
             '--push', '-p', help="Also push to registry. Defaults to false.", action="store_true")
+        self.parser.add_argument(
+            '--reuse-build', '-R', action="store_true",
+            help="instead of building, retag an image in the registry built from the same build context (the files "
+            "not in .dockerignore, the Dockerfile and the build args), or from the same git sha, Dockerfile and build "
+            "args. Applies to tags of the form <config name>-<app>-<sha>/v<version>, with --push only. Defaults to false.")
         return self.parser
 
+    def reuseBuild(self, dockerUtilsObj, registry, config_name, app, tag_name, envs, labels):
+        """
+        looks for an image in the registry that is the same build as
+        tag_name, and retags it as tag_name within the registry. An image is
+        the same build when it has the same build context digest, whatever
+        commit it was built from, or when it was built from the same git sha
+        with the same Dockerfile and build args. Returns the name of the
+        reused image, or None if the image has to be built.
+
+        :params:
+        :labels [dict]: the labels of tag_name, see DockerUtils.get_build_labels
+        """
+        parsed = self.versionIndex.parse_image(config_name, app, tag_name, envs)
+        if parsed is None or parsed[0] == '':
+            return None
+        sha = parsed[0]
+        context_digest = labels.get(CONTEXT_DIGEST_LABEL)
+        try:
+            self.versionIndex.refresh(registry, config_name, app, envs, dockerUtilsObj)
+            versions = [row for row in self.versionIndex.get_versions(registry, config_name, app, '')
+                        if row['image'] != tag_name]
+        except (requests.exceptions.RequestException, sqlite3.Error, OSError) as e:
+            print(colored("Could not read the versions of {}: {}".format(app, e), "yellow"))
+            return None
+        # The latest version first: those known to have the same context, then
+        # those of the same sha and the latest ones whose context is not known yet
+        candidates = [row for row in reversed(versions)
+                      if context_digest is not None and row['context_digest'] == context_digest]
+        unknown = [row for row in reversed(versions) if row['context_digest'] is None]
+        candidates += [row for row in reversed(versions) if row['sha'] == sha and row not in candidates]
+        candidates += [row for row in unknown[:REUSE_LOOKBACK] if row not in candidates]
+        for candidate in candidates:
+            try:
+                if candidate['context_digest'] is None or candidate['sha'] == sha:
+                    image_labels = dockerUtilsObj.get_image_labels(registry, candidate['image'])
+                    self.versionIndex.set_context_digest(registry, candidate['image'],
+                                                         image_labels.get(CONTEXT_DIGEST_LABEL, ''))
+                    same_context = context_digest is not None and \
+                        image_labels.get(CONTEXT_DIGEST_LABEL) == context_digest
+                    same_build = candidate['sha'] == sha and all(
+                        image_labels.get(key) == labels.get(key)
+                        for key in [DOCKERFILE_DIGEST_LABEL, BUILD_ARGS_DIGEST_LABEL])
+                    if not (same_context or same_build):
+                        continue
+                if dockerUtilsObj.retag_image(registry, candidate['image'], tag_name):
+                    self.versionIndex.record_push(registry, config_name, app, tag_name, envs, context_digest)
+                    return candidate['image']
+                print(colored("Registry [{}] cannot retag {}, building the image.".format(
+                    registry, candidate['image']), "yellow"))
+                return None
+            except (requests.exceptions.RequestException, sqlite3.Error, ValueError, KeyError) as e:
+                print(colored("Could not reuse {}: {}".format(candidate['image'], e), "yellow"))
+        return None
+
     def main(self, settingObj, appObj, hooksObj, dockerUtilsObj, dockerObj, args):
         print(colored("******Building the Docker image now******", "grey"))
         try:
@@ -151,32 +219,55 @@ class RogerBuild(object):
                     self.registry = roger_env['registry']
                 self.tag_name = args.tag_name
                 image = "{0}/{1}".format(roger_env['registry'], args.tag_name)
+                # Computed before the build, which may change files of the context
+                docker_file = build_filename if 'build_filename' in data else "{0}/Dockerfile".format(file_path)
+                # A build without push must not write to the registry, and needs
+                # the image locally, so it is always built
+                reuse_build = getattr(args, 'reuse_build', False) and \
+                    (args.push or getattr(args, 'push_later', False))
+                # The context digest is only needed to reuse an image. The private
+                # projects are downloaded into the context after it would be taken.
+                context_dir = file_path if reuse_build and not projects else None
+                labels = dockerUtilsObj.get_build_labels(docker_file, build_args, context_dir)
+                reused_image = None
+                if reuse_build:
+                    reused_image = self.reuseBuild(dockerUtilsObj, roger_env['registry'], config_name, args.app_name,
+                                                   args.tag_name, roger_env.get('environments', {}).keys(), labels)
+                # Tell roger deploy that the image is already in the registry, and what it was built from
+                args.reused_build = reused_image is not None
+                args.context_digest = labels.get(CONTEXT_DIGEST_LABEL)
                 try:
-                    if abs_path == args.directory:
-                        try:
-                            dockerObj.docker_build(
-                                dockerUtilsObj, appObj, args.directory, repo, projects, docker_path, image, build_args, args.verbose, build_filename)
-                        except ValueError:
-                            raise ValueError("Docker build failed")
+                    if reused_image is not None:
+                        print(colored("******Reusing image {} built from the same sha, Dockerfile and build args. Retagged it as {}******".format(reused_image, args.tag_name), "green"))
                     else:
-                        directory = '{0}/{1}'.format(cur_dir, args.directory)
-                        try:
-                            dockerObj.docker_build(
-                                dockerUtilsObj, appObj, directory, repo, projects, docker_path, image, build_args, args.verbose, build_filename)
-                        except ValueError:
-                            print('Docker build failed.')
-                            raise
-                    print(colored("******Successfully built Docker image******", "green"))
-                    build_message = "Image [{}]".format(image)
-                    if(args.push):
-                        print(colored("******Pushing Docker image to registry******", "grey"))
-                        exit_code = dockerUtilsObj.docker_push(image, args.verbose)
-                        if exit_code != 0:
-                            raise ValueError(
-                                'Docker push failed.')
-                        build_message += " successfully pushed to registry [{}]*******".format(roger_env[
-                                                                             'registry'])
-                    print(colored(build_message, "green"))
+                        if abs_path == args.directory:
+                            try:
+                                dockerObj.docker_build(
+                                    dockerUtilsObj, appObj, args.directory, repo, projects, docker_path, image, build_args, args.verbose, build_filename, labels)
+                            except ValueError:
+                                raise ValueError("Docker build failed")
+                        else:
+                            directory = '{0}/{1}'.format(cur_dir, args.directory)
+                            try:
+                                dockerObj.docker_build(
+                                    dockerUtilsObj, appObj, directory, repo, projects, docker_path, image, build_args, args.verbose, build_filename, labels)
+                            except ValueError:
+                                print('Docker build failed.')
+                                raise
+                        print(colored("******Successfully built Docker image******", "green"))
+                        build_message = "Image [{}]".format(image)
+                        if(args.push):
+                            print(colored("******Pushing Docker image to registry******", "grey"))
+                            exit_code = dockerUtilsObj.docker_push(image, args.verbose)
+                            if exit_code != 0:
+                                raise ValueError(
+                                    'Docker push failed.')
+                            self.versionIndex.record_push(roger_env['registry'], config_name, args.app_name,
+                                                          args.tag_name, roger_env.get('environments', {}).keys(),
+                                                          args.context_digest)
+                            build_message += " successfully pushed to registry [{}]*******".format(roger_env[
+                                                                                 'registry'])
+                        print(colored(build_message, "green"))
                 except (IOError) as e:
                     printException(e)
                     raise
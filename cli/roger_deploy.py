@@ -7,11 +7,19 @@ from decimal import *
 from jinja2 import Environment, FileSystemLoader
 from datetime import datetime
 from termcolor import colored
+from tabulate import tabulate
+import copy
+import multiprocessing
 import subprocess
 import json
 import os
+import Queue
 import requests
+import sqlite3
 import sys
+import tempfile
+import threading
+import time
 from cli.roger_build import RogerBuild
 from cli.roger_gitpull import RogerGitPull
 import re
@@ -28,6 +36,7 @@ from cli.frameworkUtils import FrameworkUtils
 from cli.gitutils import GitUtils
 from cli.dockerutils import DockerUtils
 from cli.docker_build import Docker
+from cli.versionindex import VersionIndex, splitVersion
 requests.packages.urllib3.disable_warnings()
 
 import contextlib
@@ -54,13 +63,6 @@ def getGitSha(work_dir, repo, branch, gitObj):
     return gitObj.getGitSha(repo, branch, work_dir)
 
 
-def verify(value):
-    for item in value.split("."):
-        if not item.isdigit():
-            return False
-    return True
-
-
 class Slack:
 
     def __init__(self, config, token_file):
@@ -107,6 +109,12 @@ class RogerDeploy(object):
         self.statsd_message_list = []
         self.registry = ""
         self.image_name = ""
+        # git sha of (work dir, repo, branch), shared by the apps of a repo
+        self.git_shas = {}
+        self.prefetching = False
+        self.versionIndex = VersionIndex()
+        self.config_name = ""
+        self.environments = []
 
         # To remove a temporary directory created by roger-deploy if this
         # script exits
@@ -116,27 +124,28 @@ class RogerDeploy(object):
             shutil.rmtree(work_dir)
             print("Deleted temporary dir:{0}".format(work_dir))
 
+    def getGitSha(self, work_dir, repo, branch, gitObj):
+        key = (os.path.abspath(work_dir), repo, branch)
+        if key not in self.git_shas:
+            self.git_shas[key] = getGitSha(work_dir, repo, branch, gitObj)
+        return self.git_shas[key]
+
     def getNextVersion(self, config, roger_env, application, branch, work_dir, repo, args, gitObj):
-        sha = getGitSha(work_dir, repo, branch, gitObj)
-        docker_search = self.dockerUtilsObject.docker_search(roger_env['registry'], config['name'], application)
-        image_version_list = []
+        sha = self.getGitSha(work_dir, repo, branch, gitObj)
         version = ''
-        envs = []
-        for each_key in roger_env["environments"].keys():
-            envs.append(each_key)
-        for line in docker_search.split('\n'):
-            image = line.split(' ')[0]
-            matchObj = re.match(
-                "^{0}-{1}-.*/v.*".format(config['name'], application), image)
-            if matchObj and matchObj.group().startswith(config['name'] + '-' + application):
-                skip_image = False
-                for env in envs:
-                    if matchObj.group().startswith("{0}-{1}-{2}".format(config['name'], application, env)):
-                        skip_image = True
-                        break
-                if skip_image is False:
-                    if verify(str(matchObj.group().split('v')[-1])):
-                        image_version_list.append(matchObj.group().split('v')[-1])
+        envs = roger_env["environments"].keys()
+        try:
+            # Versions pushed by others since the last deploy are added to the index first
+            self.versionIndex.refresh(roger_env['registry'], config['name'], application, envs,
+                                      self.dockerUtilsObject)
+            image_version_list = [row['version'] for row in self.versionIndex.get_versions(
+                roger_env['registry'], config['name'], application, env='')]
+        except (sqlite3.Error, OSError) as e:
+            # The index is only a cache of the registry
+            print("Could not use the version index at {}, searching the registry. (Error: {})".format(
+                self.versionIndex.path, e), file=sys.stderr)
+            image_version_list = self.versionIndex.search_versions(
+                roger_env['registry'], config['name'], application, envs, self.dockerUtilsObject)
 
         if len(image_version_list) == 0:  # Create initial version
             version = "{0}/v0.1.0".format(sha)
@@ -147,8 +156,8 @@ class RogerDeploy(object):
         return version
 
     def incrementVersion(self, sha, image_version_list, args):
-        latest = max(image_version_list, key=self.splitVersion)
-        ver_tuple = self.splitVersion(latest)
+        latest = max(image_version_list, key=splitVersion)
+        ver_tuple = splitVersion(latest)
         latest_version = ''
         if args.incr_major:
             latest_version = "{0}/v{1}.0.0".format(sha,
@@ -163,12 +172,6 @@ class RogerDeploy(object):
             sha, int(ver_tuple[0]), (int(ver_tuple[1]) + 1))
         return latest_version
 
-    def splitVersion(self, version):
-        major, _, rest = version.partition('.')
-        minor, _, rest = rest.partition('.')
-        patch, _, rest = rest.partition('.')
-        return int(major), int(minor) if minor else 0, int(patch) if patch else 0
-
     def parseArgs(self):
         self.parser = argparse.ArgumentParser(
             prog='roger deploy', description=describe())
@@ -193,6 +196,20 @@ class RogerDeploy(object):
                                  help="specifies an optional secrets file for deployment runtime variables.")
         self.parser.add_argument('-d', '--directory',
                                  help="working directory. Uses a temporary directory if not specified.")
+        self.parser.add_argument('-j', '--jobs', metavar='N', type=int, default=1,
+                                 help="number of apps deployed at the same time. Apps built from the same repo are "
+                                 "deployed one after the other. Defaults to 1.")
+        self.parser.add_argument('-P', '--pipeline', action="store_true",
+                                 help="deploy the apps through a pipeline of gitpull, build, registry push and "
+                                 "framework put stages, each with --jobs workers, so that the stages of different "
+                                 "apps overlap. Defaults to false.")
+        self.parser.add_argument('-R', '--reuse-build', action="store_true",
+                                 help="instead of building an app, retag an image in the registry built from the "
+                                 "same git sha, Dockerfile and build args, e.g. when deploying a commit to another "
+                                 "environment. Defaults to false.")
+        self.parser.add_argument('-F', '--fetch-jobs', metavar='N', type=int, default=4,
+                                 help="number of repos fetched at the same time when the deploy starts, ahead of "
+                                 "the gitpull step of their apps. Defaults to 4.")
         self.parser.add_argument('application', metavar='application', help="application to deploy. \
                                  Can also push specific containers(comma seperated). Example: 'all' \
                                  or 'app1:app2' or 'kairos' or 'app_name[container1,container2]' \
@@ -217,6 +234,8 @@ class RogerDeploy(object):
             config_name = ""
             if 'name' in config:
                 config_name = config['name']
+            self.config_name = config_name
+            self.environments = roger_env.get('environments', {}).keys()
             if 'registry' not in roger_env:
                 raise ValueError('Registry not found in roger-mesos-tools.config file.')
             else:
@@ -285,16 +304,65 @@ class RogerDeploy(object):
                 for app in apps:
                     if app not in config['apps']:
                         raise ValueError('Application {} specified not found.'.format(app))
+
+                # Every distinct (repo, branch) is fetched once, by the first
+                # of its apps, the others reuse the checkout and its git sha
+                app_repos = dict((app, self.getAppRepo(appObject.getAppData(config_dir, args.config_file, app),
+                                                       app, common_repo)) for app in apps)
+                if args.verbose and len(apps) > 1:
+                    print("Deploying {} apps from {} repos on branch {}".format(
+                        len(apps), len(set(app_repos.values())), branch))
+                if not args.skip_gitpull:
+                    self.prefetchRepos(appObject, gitObj, set(app_repos.values()), work_dir, args)
+
+                def deploy(app, app_args):
+                    self.deployApp(settingObject, appObject, frameworkUtilsObject, gitObj, hooksObj,
+                                   root, app_args, config, roger_env, work_dir, config_dir, environment, app, branch, self.slack, args.config_file, common_repo, temp_dir_created, apps_container_dict)
+
+                def gitpull(app, state):
+                    self.gitPullApp(settingObject, appObject, gitObj, hooksObj, state['args'], work_dir, app)
+
+                def build(app, state):
+                    state['image_name'] = self.buildApp(
+                        settingObject, appObject, frameworkUtilsObject, gitObj, hooksObj, state['args'], config,
+                        roger_env, work_dir, config_dir, environment, app, branch, args.config_file, common_repo, False,
+                        push_later=True)
+
+                def push(app, state):
+                    self.pushImage(state['args'], state['image_name'])
+
+                def put(app, state):
+                    self.pushApp(settingObject, appObject, frameworkUtilsObject, hooksObj, state['args'], environment,
+                                 app, state['image_name'], args.config_file, apps_container_dict)
+                    self.announceDeploy(settingObject, self.slack, app, environment, branch, state['start'])
+
+                jobs = getattr(args, 'jobs', 1) or 1
+                if jobs < 1:
+                    raise ValueError('--jobs must be a positive integer.')
+                pipeline = getattr(args, 'pipeline', False)
+                if (jobs > 1 or pipeline) and len(apps) > 1:
+                    # Apps sharing a repo share its checkout in work_dir
+                    groups = {}
+                    for app in apps:
+                        groups.setdefault(app_repos[app], []).append(app)
+                    groups = sorted(groups.values(), key=lambda group: apps.index(group[0]))
+                    if pipeline:
+                        stages = [('gitpull', gitpull), ('build', build), ('registry push', push),
+                                  ('framework put', put)]
+                        results = self.deployAppsPipelined(groups, args, stages, jobs)
                     else:
-                        try:
-                            if args.verbose:
-                                print("Deploying {} ...".format(app))
-                            self.deployApp(settingObject, appObject, frameworkUtilsObject, gitObj, hooksObj,
-                                           root, args, config, roger_env, work_dir, config_dir, environment, app, branch, self.slack, args.config_file, common_repo, temp_dir_created, apps_container_dict)
-                        except (IOError, ValueError) as e:
-                            error_msg = "Error when deploying {}: {}".format(app, repr(e))
-                            printErrorMsg(error_msg)
-                            pass    # try deploying the next app
+                        results = self.deployAppsInParallel(groups, args, deploy, jobs)
+                else:
+                    results = []
+                    for app in apps:
+                        if args.verbose:
+                            print("Deploying {} ...".format(app))
+                        result = self.deployAppSafely(app, args, deploy)
+                        if result['error'] is not None:
+                            printErrorMsg("Error when deploying {}: {}".format(app, result['error']))
+                        results.append(result)    # try deploying the next app
+                if len(apps) > 1:
+                    self.printDeploySummary(results)
             except (Exception) as e:
                 printException(e)
                 raise
@@ -326,6 +394,9 @@ class RogerDeploy(object):
                 work_dir = ''
                 temp_dir_created = False
 
+            if self.prefetching:
+                gitObj.waitForPrefetch()
+
             if not (self.rogerGitPullObject.outcome is 1 and self.rogerBuildObject.outcome is 1 and self.rogerPushObject.outcome is 1):
                 execution_result = 'FAILURE'
 
@@ -345,27 +416,336 @@ class RogerDeploy(object):
                 printErrorMsg(error_msg)
                 raise
 
-    def deployApp(self, settingObject, appObject, frameworkUtilsObject, gitObj, hooksObj, root, args, config,
-                  roger_env, work_dir, config_dir, environment, app, branch, slack, config_file, common_repo, temp_dir_created, apps_container_dict):
-
-        startTime = datetime.now()
-        settingObj = settingObject
-        appObj = appObject
-        frameworkUtils = frameworkUtilsObject
-        environmentObj = roger_env['environments'][environment]
-        data = appObj.getAppData(config_dir, config_file, app)
-        frameworkObj = frameworkUtils.getFramework(data)
-        framework = frameworkObj.getName()
-
-        repo = ''
+    def prefetchRepos(self, appObj, gitObj, repos, work_dir, args):
+        """
+        starts fetching the repos that are not checked out in work_dir yet
+        into their git mirrors, so that the network I/O of all of them
+        overlaps instead of waiting behind the builds of earlier apps. The
+        gitpull step of an app then only waits for its own repo.
+        """
+        fetch_jobs = getattr(args, 'fetch_jobs', 4) or 4
+        if fetch_jobs < 1:
+            raise ValueError('--fetch-jobs must be a positive integer.')
+        repo_urls = []
+        for repo in sorted(repos):
+            if os.path.isdir(os.path.join(work_dir, appObj.getRepoName(repo) or '')):
+                continue    # updated by git pull in its checkout
+            try:
+                repo_url = appObj.getRepoUrl(repo)
+            except ValueError as e:
+                printErrorMsg("Not prefetching {}: {}".format(repo, e))
+                continue
+            if repo_url:
+                repo_urls.append(repo_url)
+        if args.verbose and repo_urls:
+            print("Prefetching {} repos, {} at a time".format(len(repo_urls), fetch_jobs))
+        gitObj.prefetchMirrors(repo_urls, fetch_jobs, args.verbose)
+        self.prefetching = True
+
+    def getAppRepo(self, data, app, common_repo):
         if common_repo != '':
-            repo = data.get('repo', common_repo)
+            return data.get('repo', common_repo)
+        return data.get('repo', app)
+
+    def deployAppSafely(self, app, args, deploy):
+        """
+        deploys app with its own copy of args, since the deploy steps modify
+        them. Returns a result dict; IOError and ValueError are recorded in it
+        so that the next app can still be deployed.
+        """
+        result = {'app': app, 'error': None, 'image_name': '', 'duration': 0.0}
+        start = datetime.now()
+        try:
+            deploy(app, copy.copy(args))
+            result['image_name'] = self.image_name
+        except (IOError, ValueError) as e:
+            result['error'] = repr(e)
+        finally:
+            result['duration'] = (datetime.now() - start).total_seconds()
+        return result
+
+    def deployAppsInParallel(self, groups, args, deploy, jobs):
+        """
+        deploys the groups of apps in at most jobs processes at the same time,
+        the apps of a group one after the other. The deploy steps change the
+        working directory, so each group runs in its own process. The output
+        of a group is printed once it finished. Returns the results of all the
+        apps.
+        """
+        results = {}
+        queue = multiprocessing.Queue()
+        pending = list(enumerate(groups))
+        running = {}
+        while pending or running:
+            while pending and len(running) < jobs:
+                index, group = pending.pop(0)
+                fd, log_path = tempfile.mkstemp(prefix='roger-deploy-', suffix='.log')
+                os.close(fd)
+                print(colored("Deploying {} ...".format(", ".join(group)), "cyan"))
+                sys.stdout.flush()
+                process = multiprocessing.Process(
+                    target=self.runDeployJob, args=(index, group, args, deploy, log_path, queue))
+                process.start()
+                running[index] = (process, group, log_path)
+            try:
+                index, group_results, state = queue.get(True, 1)
+            except Queue.Empty:
+                for index, (process, group, log_path) in list(running.items()):
+                    if not process.is_alive() and process.exitcode != 0:
+                        group_results = [{'app': app, 'error': "deploy process exited with {}".format(process.exitcode),
+                                          'image_name': '', 'duration': 0.0} for app in group]
+                        self.finishDeployJob(running.pop(index), group_results, results)
+                continue
+            self.mergeDeployState(state)
+            self.finishDeployJob(running.pop(index), group_results, results)
+        return [results[app] for group in groups for app in group]
+
+    def runDeployJob(self, index, group, args, deploy, log_path, queue):
+        # Runs in the child process
+        group_results = []
+        marks = self.markDeployState()
+        try:
+            self.redirectOutput(log_path)
+            for app in group:
+                try:
+                    group_results.append(self.deployAppSafely(app, args, deploy))
+                except Exception as e:
+                    printException(e)
+                    group_results.append({'app': app, 'error': repr(e), 'image_name': '', 'duration': 0.0})
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            queue.put((index, group_results, self.getDeployState(marks)))
+
+    def redirectOutput(self, log_path):
+        sys.stdout.flush()
+        sys.stderr.flush()
+        with open(log_path, 'w') as log:
+            # Also captures the output of git and docker
+            os.dup2(log.fileno(), 1)
+            os.dup2(log.fileno(), 2)
+
+    def markDeployState(self):
+        return (len(self.statsd_message_list), len(self.rogerPushObject.task_id),
+                len(self.rogerPushObject.statsd_push_list))
+
+    def getDeployState(self, marks):
+        """
+        returns what a deploy in a child process added to the state that is
+        reported at the end, for mergeDeployState in the parent
+        """
+        statsd_count, task_id_count, statsd_push_count = marks
+        return {'statsd_message_list': self.statsd_message_list[statsd_count:],
+                'task_id': self.rogerPushObject.task_id[task_id_count:],
+                'statsd_push_list': self.rogerPushObject.statsd_push_list[statsd_push_count:],
+                'outcomes': [self.rogerGitPullObject.outcome, self.rogerBuildObject.outcome,
+                             self.rogerPushObject.outcome],
+                'image_name': self.image_name,
+                'fetched': list(self.rogerGitPullObject.fetched),
+                'git_shas': self.git_shas.items()}
+
+    def mergeDeployState(self, state):
+        self.statsd_message_list.extend(state['statsd_message_list'])
+        self.rogerPushObject.task_id.extend(state['task_id'])
+        self.rogerPushObject.statsd_push_list.extend(state['statsd_push_list'])
+        for obj, outcome in zip([self.rogerGitPullObject, self.rogerBuildObject, self.rogerPushObject],
+                                state['outcomes']):
+            if outcome is not 1:
+                obj.outcome = outcome
+        if state['image_name']:
+            self.image_name = state['image_name']
+        self.rogerGitPullObject.fetched.update(state['fetched'])
+        self.git_shas.update(state['git_shas'])
+
+    def deployAppsPipelined(self, groups, args, stages, jobs):
+        """
+        deploys the groups of apps through a pipeline of stages, so that the
+        stages of different groups overlap. Every stage has jobs workers and a
+        queue of at most jobs groups in front of it; a full queue blocks the
+        stage before it. The apps of a group go through a stage one after the
+        other, the stage of an app runs in its own process. Returns the results
+        of all the apps and prints the timing of every stage.
+
+        :params:
+        :stages [list]: (name, step) pairs, step(app, state) runs the stage for
+                        app; state holds its 'args', 'image_name' and 'start'
+        """
+        queues = [Queue.Queue(jobs) for stage in stages]
+        metrics = [{'stage': name, 'apps': 0, 'busy': 0.0, 'waited': 0.0, 'blocked': 0.0, 'max_depth': 0}
+                   for name, step in stages]
+        finished = [0] * len(stages)
+        lock = threading.Lock()
+        items = []
+        for group in groups:
+            items.append({'group': group, 'errors': {}, 'states': dict(
+                (app, {'args': copy.copy(args), 'image_name': '', 'start': None}) for app in group)})
+
+        def put(index, item):
+            start = time.time()
+            if item is not None:
+                item['queued_at'] = start
+            queues[index].put(item)
+            with lock:
+                metrics[index]['blocked'] += time.time() - start
+                metrics[index]['max_depth'] = max(metrics[index]['max_depth'], queues[index].qsize())
+
+        def worker(index):
+            name, step = stages[index]
+            while True:
+                item = queues[index].get()
+                if item is None:
+                    break
+                start = time.time()
+                with lock:
+                    metrics[index]['waited'] += start - item['queued_at']
+                processed = 0
+                for app in item['group']:
+                    if app in item['errors']:
+                        continue
+                    processed += 1
+                    state = item['states'][app]
+                    if state['start'] is None:
+                        state['start'] = datetime.now()
+                    try:
+                        value, error = self.runStep(
+                            lambda: (step(app, state), state)[1], "{} of {}".format(name, app), lock)
+                    except Exception as e:
+                        value, error = None, repr(e)
+                    if error is not None:
+                        item['errors'][app] = "{} failed: {}".format(name, error)
+                    else:
+                        item['states'][app] = value
+                with lock:
+                    metrics[index]['apps'] += processed
+                    metrics[index]['busy'] += time.time() - start
+                if index + 1 < len(stages):
+                    put(index + 1, item)
+            with lock:
+                finished[index] += 1
+                last = finished[index] == jobs
+            if last and index + 1 < len(stages):
+                for i in range(jobs):
+                    put(index + 1, None)
+
+        threads = [threading.Thread(target=worker, args=(index,))
+                   for index in range(len(stages)) for i in range(jobs)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for item in items:
+            put(0, item)
+        for i in range(jobs):
+            put(0, None)
+        # join() with a timeout, so that KeyboardInterrupt is delivered
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(1)
+
+        self.printStageMetrics(metrics)
+        results = []
+        for item in items:
+            for app in item['group']:
+                state = item['states'][app]
+                duration = (datetime.now() - state['start']).total_seconds() if state['start'] else 0.0
+                results.append({'app': app, 'error': item['errors'].get(app),
+                                'image_name': state['image_name'] if app not in item['errors'] else '',
+                                'duration': duration})
+        return results
+
+    def runStep(self, step, title, lock):
+        """
+        runs step() in a child process and returns (its return value, None),
+        or (None, error) if it raised. The output of the step is printed once
+        it finished.
+        """
+        fd, log_path = tempfile.mkstemp(prefix='roger-deploy-', suffix='.log')
+        os.close(fd)
+        receiver, sender = multiprocessing.Pipe(False)
+        with lock:
+            # Forking while another thread prints could copy a held lock
+            process = multiprocessing.Process(target=self.runStepInChild, args=(step, log_path, sender))
+            process.start()
+        sender.close()
+        try:
+            value, error, state = receiver.recv()
+        except EOFError:
+            value, error, state = None, "process exited with {}".format(process.exitcode), None
+        process.join()
+        with lock:
+            if state is not None:
+                self.mergeDeployState(state)
+            print(colored("****** Output of the {} ******".format(title), "cyan"))
+            try:
+                with open(log_path) as log:
+                    for line in log:
+                        sys.stdout.write(line)
+            finally:
+                os.remove(log_path)
+            sys.stdout.flush()
+        return value, error
+
+    def runStepInChild(self, step, log_path, sender):
+        # Runs in the child process
+        value = error = None
+        marks = self.markDeployState()
+        try:
+            self.redirectOutput(log_path)
+            value = step()
+        except Exception as e:
+            printException(e)
+            error = repr(e)
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            sender.send((value, error, self.getDeployState(marks)))
+            sender.close()
+
+    def printStageMetrics(self, metrics):
+        rows = [[metric['stage'], metric['apps'], "{:.1f}s".format(metric['busy']),
+                 "{:.1f}s".format(metric['waited']), "{:.1f}s".format(metric['blocked']), metric['max_depth']]
+                for metric in metrics]
+        print(tabulate(rows, headers=['Stage', 'Apps', 'Busy', 'Queued', 'Blocked on full queue',
+                                      'Max queue depth']))
+
+    def finishDeployJob(self, job, group_results, results):
+        process, group, log_path = job
+        process.join()
+        print(colored("****** Output of the deploy of {} ******".format(", ".join(group)), "cyan"))
+        try:
+            with open(log_path) as log:
+                for line in log:
+                    sys.stdout.write(line)
+        finally:
+            os.remove(log_path)
+        for result in group_results:
+            if result['error'] is not None:
+                printErrorMsg("Error when deploying {}: {}".format(result['app'], result['error']))
+            results[result['app']] = result
+        sys.stdout.flush()
+
+    def printDeploySummary(self, results):
+        rows = [[result['app'], 'FAILURE' if result['error'] else 'SUCCESS', result['image_name'] or '',
+                 "{:.1f}s".format(result['duration'])] for result in results]
+        print(tabulate(rows, headers=['Application', 'Result', 'Image', 'Duration']))
+        failed = [result['app'] for result in results if result['error']]
+        if failed:
+            print(colored("Failed to deploy {} of {} apps: {}".format(len(failed), len(results), ", ".join(failed)), "red"))
         else:
-            repo = data.get('repo', app)
+            print(colored("Deployed all {} apps.".format(len(results)), "green"))
 
-        image_name = ''
-        image = ''
+    def deployApp(self, settingObject, appObject, frameworkUtilsObject, gitObj, hooksObj, root, args, config,
+                  roger_env, work_dir, config_dir, environment, app, branch, slack, config_file, common_repo, temp_dir_created, apps_container_dict):
 
+        startTime = datetime.now()
+        self.gitPullApp(settingObject, appObject, gitObj, hooksObj, args, work_dir, app)
+        image_name = self.buildApp(settingObject, appObject, frameworkUtilsObject, gitObj, hooksObj, args, config,
+                                   roger_env, work_dir, config_dir, environment, app, branch, config_file,
+                                   common_repo, True)
+        self.pushApp(settingObject, appObject, frameworkUtilsObject, hooksObj, args, environment, app,
+                     image_name, config_file, apps_container_dict)
+        self.announceDeploy(settingObject, slack, app, environment, branch, startTime)
+
+    def gitPullApp(self, settingObj, appObj, gitObj, hooksObj, args, work_dir, app):
         skip_gitpull = True if args.skip_gitpull else False
 
         # get/update target source(s)
@@ -376,13 +756,27 @@ class RogerDeploy(object):
             self.rogerGitPullObject.identifier = self.identifier
             self.rogerGitPullObject.main(settingObj, appObj, gitObj, hooksObj, args)
 
+    def buildApp(self, settingObj, appObj, frameworkUtils, gitObj, hooksObj, args, config, roger_env, work_dir,
+                 config_dir, environment, app, branch, config_file, common_repo, push, push_later=False):
+        """
+        finds the version to deploy and unless args.skip_build, builds the
+        image for it and pushes it to the registry when push is set. Returns
+        the image name.
+
+        :params:
+        :push_later [bool]: the image is pushed by pushImage afterwards, so it
+                            may be reused from the registry like with push
+        """
+        data = appObj.getAppData(config_dir, config_file, app)
+        frameworkObj = frameworkUtils.getFramework(data)
+        framework = frameworkObj.getName()
+        repo = self.getAppRepo(data, app, common_repo)
+
         skip_build = True if args.skip_build else False
-        skip_push = True if args.skip_push else False
-        secrets_file = args.secrets_file if args.secrets_file else None
 
         # Set initial version
         # todo (vmahedia) #image_name naming should not be magic, make it explicit
-        image_git_sha = getGitSha(work_dir, repo, branch, gitObj)
+        image_git_sha = self.getGitSha(work_dir, repo, branch, gitObj)
         image_name = "{0}-{1}-{2}/v0.1.0".format(config['name'], app, image_git_sha)
         print(colored("******Fetching current version deployed or latest version from registry.\
                        This is used to bump to next version.******", "grey"))
@@ -415,18 +809,34 @@ class RogerDeploy(object):
             build_args.tag_name = image_name
             build_args.config_file = config_file
             build_args.env = environment
-            build_args.push = True
+            build_args.push = push
+            build_args.push_later = push_later
             build_args.verbose = args.verbose
             try:
                 self.rogerBuildObject.identifier = self.identifier
                 self.rogerBuildObject.statsd_message_list = self.statsd_message_list
-                self.rogerBuildObject.main(settingObj, appObject, hooksObj,
+                self.rogerBuildObject.main(settingObj, appObj, hooksObj,
                                            self.dockerUtilsObject, self.dockerObject, build_args)
             except ValueError:
                 raise
 
         print("Image Version is: {}".format(colored(image_name, "cyan")))
+        return image_name
 
+    def pushImage(self, args, image_name):
+        # The registry push of buildApp(..., push=False)
+        if args.skip_build or getattr(args, 'reused_build', False):
+            return
+        print(colored("******Pushing Docker image to registry******", "grey"))
+        image = "{0}/{1}".format(self.registry, image_name)
+        if self.dockerUtilsObject.docker_push(image, args.verbose) != 0:
+            raise ValueError('Docker push failed.')
+        self.versionIndex.record_push(self.registry, self.config_name, args.app_name, image_name,
+                                      self.environments, getattr(args, 'context_digest', None))
+        print(colored("Image [{}] successfully pushed to registry [{}]".format(image, self.registry), "green"))
+
+    def pushApp(self, settingObj, appObj, frameworkUtils, hooksObj, args, environment, app, image_name,
+                config_file, apps_container_dict):
         # Deploying the app to framework
         args.image_name = image_name
         args.config_file = config_file
@@ -440,6 +850,7 @@ class RogerDeploy(object):
         self.rogerPushObject.main(settingObj, appObj, frameworkUtils,
                                   hooksObj, args)
 
+    def announceDeploy(self, settingObj, slack, app, environment, branch, startTime):
         deployTime = datetime.now() - startTime
 
         username = settingObj.getUser()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+
+from __future__ import print_function
+import argparse
+import os
+import requests
+import sys
+import time
+from multiprocessing.pool import ThreadPool
+from tabulate import tabulate
+from termcolor import colored
+from cli.settings import Settings
+from cli.appconfig import AppConfig
+from cli.containerconfig import ContainerConfig
+from cli.marathon import Marathon
+requests.packages.urllib3.disable_warnings()
+
+
+def describe():
+    return 'runs a command in every task of an application.'
+
+
+class RogerExec(object):
+
+    def parse_args(self):
+        self.parser = argparse.ArgumentParser(
+            prog='roger exec', description=describe(), usage="%(prog)s [options] app -- command [arg...]",
+            epilog="the command and its arguments follow '--'. Example: roger exec /team/content -- rm -rf /tmp/cache")
+        self.parser.add_argument('app', metavar='app',
+                                 help="id of the application to run the command in. Example: '/team/content'")
+        self.parser.add_argument('-v', '--verbose', help="verbose mode for debugging", action="store_true")
+        self.parser.add_argument('-e', '--env', metavar='env',
+                                 help="environment to search. Example: 'dev' or 'stage'")
+        self.parser.add_argument('-H', '--hostname', metavar='hostname',
+                                 help="only run the command in the tasks on this host. Example: 'daldevmesos01'")
+        self.parser.add_argument('-p', '--parallel', metavar='N', type=int, default=10,
+                                 help="number of tasks the command runs in at the same time. Defaults to 10.")
+        self.parser.add_argument('-t', '--timeout', metavar='seconds', type=float, default=60,
+                                 help="time after which the command is no longer waited for in a task. "
+                                 "Defaults to 60 seconds.")
+        return self.parser
+
+    def main(self):
+        self.parser = self.parse_args()
+        argv, command = self.split_command(sys.argv[1:])
+        args = self.parser.parse_args(argv)
+        config_dir = settingObj.getConfigDir()
+        roger_env = appObj.getRogerEnv(config_dir)
+        environment = roger_env.get('default_environment', '')
+
+        if args.env is None:
+            if "ROGER_ENV" in os.environ:
+                env_var = os.environ.get('ROGER_ENV')
+                if env_var.strip() == '':
+                    print(
+                        "Environment variable $ROGER_ENV is not set. Using the default set from roger-mesos-tools.config file")
+                else:
+                    if args.verbose:
+                        print(colored("Using value {} from environment variable $ROGER_ENV".format(env_var), "yellow"))
+                    environment = env_var
+        else:
+            environment = args.env
+
+        if environment not in roger_env['environments']:
+            raise ValueError(colored("Environment not found in roger-mesos-tools.config file.", "red"))
+
+        if not command:
+            raise ValueError(colored("No command given. Example: roger exec /team/content -- ls /tmp", "red"))
+        if args.parallel < 1:
+            raise ValueError(colored("--parallel must be a positive integer.", "red"))
+
+        tasks = framework.getAppTasks(roger_env, environment, args.app)
+        if tasks is None:
+            raise ValueError(colored("Application {} not found in {}.".format(args.app, environment), "red"))
+        if args.hostname is not None:
+            tasks = [task for task in tasks if task['host'] == args.hostname]
+        if not tasks:
+            print(colored("No running tasks found for application {}".format(args.app), "red"))
+            return
+
+        results = self.run_in_tasks(tasks, command, environment, roger_env, args)
+        self.print_summary(results)
+        if any(result['exit_code'] != 0 for result in results):
+            sys.exit(1)
+
+    def split_command(self, argv):
+        """
+        returns (roger exec arguments, command) split on the first '--'
+        """
+        if '--' not in argv:
+            return argv, []
+        index = argv.index('--')
+        return argv[:index], argv[index + 1:]
+
+    def run_in_tasks(self, tasks, command, environment, roger_env, args, out=sys.stdout):
+        """
+        runs the command in all the tasks, at most args.parallel at the same
+        time, printing the output of every task as it finishes. Returns the
+        results in the order of the tasks.
+        """
+        pool = ThreadPool(min(args.parallel, len(tasks)))
+        try:
+            results = []
+            for result in pool.imap_unordered(
+                    lambda task: self.run_in_task(task, command, environment, roger_env, args), tasks):
+                self.print_result(result, out)
+                results.append(result)
+        finally:
+            pool.terminate()
+        order = dict((task['id'], index) for index, task in enumerate(tasks))
+        return sorted(results, key=lambda result: order[result['task_id']])
+
+    def run_in_task(self, task, command, environment, roger_env, args):
+        result = {'task_id': task['id'], 'host': task['host'], 'exit_code': None, 'output': '',
+                  'error': None, 'duration': 0.0}
+        start = time.time()
+        try:
+            hostname, containerId, mesosTaskId = containerconfig.get_task_location(
+                environment, roger_env, task['id'], args.app, task['host'])
+            if containerId == '':
+                result['error'] = "no container found"
+            else:
+                result['exit_code'], result['output'] = containerconfig.exec_in_container(
+                    hostname, containerId, command, args.timeout)
+                if result['exit_code'] is None:
+                    result['error'] = "timed out after {:g}s".format(args.timeout)
+        except Exception as e:
+            result['error'] = str(e)
+        result['duration'] = time.time() - start
+        return result
+
+    def print_result(self, result, out):
+        color = "green" if result['exit_code'] == 0 else "red"
+        status = result['error'] or "exit {}".format(result['exit_code'])
+        out.write(colored("==> {} on {} ({}, {:.1f}s)\n".format(
+            result['task_id'], result['host'], status, result['duration']), color))
+        if result['output']:
+            out.write(result['output'])
+            if not result['output'].endswith('\n'):
+                out.write('\n')
+        out.flush()
+
+    def print_summary(self, results):
+        rows = [[result['task_id'], result['host'],
+                 result['exit_code'] if result['exit_code'] is not None else '-',
+                 result['error'] or '', "{:.1f}s".format(result['duration'])] for result in results]
+        print(tabulate(rows, headers=['Task Id', 'Host', 'Exit Code', 'Error', 'Duration']))
+        failed = len([result for result in results if result['exit_code'] != 0])
+        if failed:
+            print(colored("Failed in {} of {} tasks.".format(failed, len(results)), "red"))
+        else:
+            print(colored("Succeeded in all {} tasks.".format(len(results)), "green"))
+
+if __name__ == '__main__':
+    settingObj = Settings()
+    appObj = AppConfig()
+    containerconfig = ContainerConfig()
+    framework = Marathon()
+    roger_exec = RogerExec()
+    try:
+        roger_exec.main()
+    except KeyboardInterrupt:
+        print("Exited.")
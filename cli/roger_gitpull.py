@@ -39,6 +39,9 @@ class RogerGitPull(object):
         self.utils = Utils()
         self.statsd_message_list = []
         self.outcome = 1
+        # (repo path, branch) already fetched, apps sharing a repo in one
+        # deploy only fetch it once
+        self.fetched = set()
 
     def parse_args(self):
         self.parser = argparse.ArgumentParser(
@@ -111,7 +114,11 @@ class RogerGitPull(object):
             # get/update target source(s)
             repo_name = appObj.getRepoName(repo)
             path = "{0}/{1}".format(args.directory, repo_name)
-            if os.path.isdir(path):
+            fetch_key = (os.path.abspath(path), branch)
+            if fetch_key in self.fetched:
+                print("Repo {} is already up to date on branch {}".format(repo_name, branch))
+                exit_code = 0
+            elif os.path.isdir(path):
                 with chdir(path):
                     exit_code = gitObj.gitPull(branch, args.verbose)
             else:
@@ -120,6 +127,7 @@ class RogerGitPull(object):
 
             if exit_code != 0:
                 raise ValueError("Gitpull failed.")
+            self.fetched.add(fetch_key)
 
             hooksObj.statsd_message_list = self.statsd_message_list
             hookname = "post_gitpull"
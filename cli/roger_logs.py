@@ -5,15 +5,29 @@ import argparse
 import subprocess
 import json
 import os
+import Queue
+import re
 import requests
 import subprocess
 import sys
+import time
+from multiprocessing.pool import ThreadPool
 from cli.settings import Settings
 from cli.appconfig import AppConfig
 from cli.containerconfig import ContainerConfig
+from cli.marathon import Marathon
+from cli.mesosagent import MesosAgent, MESOS_AGENT_PORT, DEFAULT_CHUNK_SIZE
 from cli.utils import printException, printErrorMsg
 requests.packages.urllib3.disable_warnings()
 
+# Lines buffered per task before its `docker logs` is blocked, so that a
+# chatty task cannot run ahead of the others
+LOG_QUEUE_SIZE = 1000
+# Lines printed from one task before moving on to the next one
+LOG_BATCH_LINES = 100
+LOG_POLL_INTERVAL = 0.05
+TIMESTAMP_PATTERN = re.compile(r'^(\S+?)(?:\.(\d+))?Z\s')
+
 
 def describe():
     return "streams the new output from the tasks's STDOUT and STDERR logs."
@@ -24,12 +38,16 @@ class RogerLogs(object):
     def parse_args(self):
         self.parser = argparse.ArgumentParser(
             prog='roger logs', description=describe())
-        self.parser.add_argument('appTaskId', metavar='appTaskId',
-                                 help="first few letters of application task id. Example: 'content.5684")
+        self.parser.add_argument('appTaskId', metavar='appTaskId', nargs='?',
+                                 help="first few letters of application task id. Optional with --app, "
+                                 "the logs of every task of the app are streamed then. Example: 'content.5684")
         self.parser.add_argument('-e', '--env', metavar='env',
                                  help="environment to search. Example: 'dev' or 'stage'")
         self.parser.add_argument('-H', '--hostname', metavar='hostname',
                                  help="hostname to search. Example: 'daldevmesos01' or 'daldevmesos04'")
+        self.parser.add_argument('-a', '--app', metavar='app',
+                                 help="id of the application the task belongs to, only its tasks are searched. "
+                                 "Example: '/team/content'")
         self.parser.add_argument(
             '-f', '--follow', help="follow log output. Defaults to false.", action="store_true")
         self.parser.add_argument(
@@ -37,7 +55,23 @@ class RogerLogs(object):
         self.parser.add_argument(
             '-s', '--since', help="show logs since timestamp.")
         self.parser.add_argument(
-            '-T', '--tail', help="number of lines to show from the end of the logs. If a negative number is given, it shows all.")
+            '-T', '--tail', type=int, help="number of lines to show from the end of the logs. If a negative number is given, it shows all.")
+        self.parser.add_argument('-p', '--parallel', metavar='N', type=int, default=10,
+                                 help="number of tasks streamed at the same time when no appTaskId is given. "
+                                 "Defaults to 10.")
+        self.parser.add_argument('-P', '--prefix', choices=['task', 'host'], default='task',
+                                 help="prefix the lines of every task with its task id or host. Defaults to task.")
+        self.parser.add_argument('-m', '--merge', action="store_true",
+                                 help="merge the lines of all the tasks in timestamp order. Defaults to false.")
+        self.parser.add_argument('-w', '--reorder-window', metavar='seconds', type=float, default=1.0,
+                                 help="with --merge, how long a quiet task holds back the lines of the others. "
+                                 "Defaults to 1 second.")
+        self.parser.add_argument('-b', '--backend', choices=['docker', 'sandbox'], default='docker',
+                                 help="read the logs with docker logs on port 4243, or from the stdout and stderr "
+                                 "files of the task sandbox through the Mesos agent. Defaults to docker.")
+        self.parser.add_argument('--chunk-size', metavar='bytes', type=int, default=DEFAULT_CHUNK_SIZE,
+                                 help="with the sandbox backend, the most bytes read per request. "
+                                 "Defaults to {}.".format(DEFAULT_CHUNK_SIZE))
         return self.parser
 
     def main(self):
@@ -63,18 +97,25 @@ class RogerLogs(object):
         if environment not in roger_env['environments']:
             raise ValueError('Environment not found in roger-mesos-tools.config file.')
 
-        hostname = ''
-        containerId = ''
-        if args.hostname is None:
-            hostname = containerconfig.get_hostname_from_marathon(
-                environment, roger_env, args.appTaskId)
-        else:
-            hostname = args.hostname
+        if args.backend == 'sandbox':
+            if args.since or args.timestamps or args.merge:
+                raise ValueError('--since, --timestamps and --merge need the docker backend.')
+            if args.chunk_size < 1:
+                raise ValueError('--chunk-size must be a positive integer.')
 
-        if hostname != '':  # Hostname maybe empty when the given appTaskId does not match any taskId from Marathon
-            (containerId, mesosTaskId) = containerconfig.get_containerid_mesostaskid(
-                args.appTaskId, hostname)
-        else:
+        if args.appTaskId is None:
+            if args.app is None:
+                raise ValueError('Either an appTaskId or --app is required.')
+            self.stream_app_logs(environment, roger_env, args)
+            return
+
+        if args.backend == 'sandbox':
+            self.print_sandbox_logs(environment, roger_env, args)
+            return
+
+        (hostname, containerId, mesosTaskId) = containerconfig.get_task_location(
+            environment, roger_env, args.appTaskId, args.app, args.hostname)
+        if hostname == '':  # Hostname maybe empty when the given appTaskId does not match any taskId from Marathon
             print("Most likely hostname could not be retrieved with appTaskId {0}. Hostname is also \
     an optional argument. See -h for usage.".format(args.appTaskId))
 
@@ -83,19 +124,7 @@ class RogerLogs(object):
     then will log into the first one")
             print("Displaying logs in docker container - {0} on host - {1} for mesosTask Id {2}".format(
                 containerId, hostname, mesosTaskId))
-            command = "docker -H tcp://{0}:4243 logs ".format(hostname)
-            if args.follow:
-                command = "{} -f=true".format(command)
-            else:
-                command = "{} -f=false".format(command)
-            if args.since:
-                command = "{} --since=\"{}\"".format(command, args.since)
-            if args.timestamps:
-                command = "{} -t".format(command, args.since)
-            if args.tail:
-                command = "{} --tail=\"{}\"".format(command, args.tail)
-
-            command = "{} {}".format(command, containerId)
+            command = self.get_logs_command(hostname, containerId, args, args.timestamps)
             try:
                 subprocess.check_call("{}".format(command), shell=True)
             except (KeyboardInterrupt, SystemExit):
@@ -105,9 +134,238 @@ class RogerLogs(object):
         else:
             print("No Container found on host {0} with application Task Id {1}".format(hostname, args.appTaskId))
 
+    def print_sandbox_logs(self, environment, roger_env, args):
+        hostname = args.hostname
+        if hostname is None:
+            hostname = containerconfig.get_hostname_from_marathon(
+                environment, roger_env, args.appTaskId, args.app)
+        if hostname == '':
+            print("Most likely hostname could not be retrieved with appTaskId {0}. Hostname is also \
+    an optional argument. See -h for usage.".format(args.appTaskId))
+            return
+        agent = self.get_mesos_agent(roger_env, environment, hostname)
+        task = agent.find_task(args.appTaskId)
+        if task is None:
+            print("No sandbox found on host {0} with application Task Id {1}".format(hostname, args.appTaskId))
+            return
+        print("Displaying logs from the sandbox of mesos task Id {0} on host - {1}".format(task[0], hostname))
+        try:
+            for line in self.iter_sandbox_lines(agent, task[1], args):
+                print(line)
+        except (KeyboardInterrupt, SystemExit):
+            print("Exited.")
+        except requests.exceptions.RequestException as e:
+            printException(e)
+
+    def get_mesos_agent(self, roger_env, environment, hostname):
+        port = roger_env['environments'][environment].get('mesos_agent_port', MESOS_AGENT_PORT)
+        return MesosAgent(hostname, port)
+
+    def iter_sandbox_lines(self, agent, directory, args):
+        return agent.iter_sandbox_lines(directory, args.follow, args.tail, args.chunk_size)
+
+    def get_logs_command(self, hostname, containerId, args, timestamps):
+        command = "docker -H tcp://{0}:4243 logs ".format(hostname)
+        if args.follow:
+            command = "{} -f=true".format(command)
+        else:
+            command = "{} -f=false".format(command)
+        if args.since:
+            command = "{} --since=\"{}\"".format(command, args.since)
+        if timestamps:
+            command = "{} -t".format(command)
+        if args.tail is not None:
+            command = "{} --tail=\"{}\"".format(command, args.tail)
+        return "{} {}".format(command, containerId)
+
+    def stream_app_logs(self, environment, roger_env, args, out=sys.stdout):
+        """
+        streams the logs of every task of args.app, at most args.parallel at
+        the same time, each line prefixed with its task id or host
+        """
+        if args.parallel < 1:
+            raise ValueError('--parallel must be a positive integer.')
+        tasks = framework.getAppTasks(roger_env, environment, args.app)
+        if args.hostname is not None:
+            tasks = [task for task in tasks if task['host'] == args.hostname]
+        if not tasks:
+            if args.hostname is not None:
+                print("No running tasks found for application {0} on host {1}".format(args.app, args.hostname))
+            else:
+                print("No running tasks found for application {0}".format(args.app))
+            return
+        if args.follow and len(tasks) > args.parallel:
+            print("Following the first {0} of {1} tasks, see --parallel.".format(args.parallel, len(tasks)),
+                  file=sys.stderr)
+            tasks = tasks[:args.parallel]
+
+        streams = [LogStream(task['id'], task['host'], task['id'] if args.prefix == 'task' else task['host'])
+                   for task in tasks]
+        width = max(len(stream.prefix) for stream in streams)
+        for stream in streams:
+            stream.prefix = stream.prefix.ljust(width)
+        # docker logs -t is needed to merge, the timestamps are dropped again on output
+        timestamps = args.timestamps or args.merge
+        pool = ThreadPool(args.parallel)
+        try:
+            for stream in streams:
+                pool.apply_async(self.read_task_logs, (stream, environment, roger_env, args, timestamps))
+            pool.close()
+            if args.merge:
+                self.print_merged(streams, out, args.reorder_window, args.timestamps)
+            else:
+                self.print_interleaved(streams, out)
+        except (KeyboardInterrupt, SystemExit):
+            print("Exited.")
+        finally:
+            for stream in streams:
+                stream.stop()
+            pool.terminate()
+
+    def read_task_logs(self, stream, environment, roger_env, args, timestamps):
+        try:
+            if args.backend == 'sandbox':
+                self.read_task_sandbox(stream, environment, roger_env, args)
+                return
+            hostname, containerId, mesosTaskId = containerconfig.get_task_location(
+                environment, roger_env, stream.task_id, args.app, stream.hostname)
+            if containerId == '':
+                stream.put("No Container found on host {0} with application Task Id {1}".format(
+                    stream.hostname, stream.task_id))
+                return
+            stream.process = subprocess.Popen(self.get_logs_command(hostname, containerId, args, timestamps),
+                                              shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            for line in iter(stream.process.stdout.readline, ''):
+                # Blocks while the queue is full
+                stream.put(line.rstrip('\n'))
+            stream.process.wait()
+        except Exception as e:
+            stream.put("Unable to stream the logs: {}".format(e))
+        finally:
+            stream.put(None)
+
+    def read_task_sandbox(self, stream, environment, roger_env, args):
+        agent = self.get_mesos_agent(roger_env, environment, stream.hostname)
+        task = agent.find_task(stream.task_id)
+        if task is None:
+            stream.put("No sandbox found on host {0} with application Task Id {1}".format(
+                stream.hostname, stream.task_id))
+            return
+        for line in self.iter_sandbox_lines(agent, task[1], args):
+            if stream.stopped:
+                break
+            stream.put(line)
+
+    def print_interleaved(self, streams, out):
+        """
+        prints the lines of the streams as they arrive, taking at most
+        LOG_BATCH_LINES from each stream in turn
+        """
+        active = list(streams)
+        while active:
+            printed = False
+            for stream in list(active):
+                for i in range(LOG_BATCH_LINES):
+                    try:
+                        line = stream.queue.get_nowait()
+                    except Queue.Empty:
+                        break
+                    if line is None:
+                        active.remove(stream)
+                        break
+                    out.write("{} | {}\n".format(stream.prefix, line))
+                    printed = True
+            out.flush()
+            if not printed:
+                time.sleep(LOG_POLL_INTERVAL)
+
+    def print_merged(self, streams, out, reorder_window, timestamps):
+        """
+        prints the lines of the streams in timestamp order. Every stream is
+        already in order, so the oldest pending line is printed once every
+        stream has a pending line; a stream without one holds the others back
+        for at most reorder_window seconds.
+        """
+        active = list(streams)
+        while active:
+            now = time.time()
+            for stream in active:
+                if stream.head is None and not stream.done:
+                    try:
+                        line = stream.queue.get_nowait()
+                    except Queue.Empty:
+                        if stream.waiting_since is None:
+                            stream.waiting_since = now
+                        continue
+                    if line is None:
+                        stream.done = True
+                    else:
+                        stream.head = (self.timestamp_key(line, stream), line)
+                        stream.waiting_since = None
+            active = [stream for stream in active if stream.head is not None or not stream.done]
+            pending = [stream for stream in active if stream.head is not None]
+            waiting = [stream for stream in active if stream.head is None and
+                       now - stream.waiting_since < reorder_window]
+            if not pending or waiting:
+                out.flush()
+                time.sleep(LOG_POLL_INTERVAL)
+                continue
+            stream = min(pending, key=lambda stream: stream.head[0])
+            line = stream.head[1]
+            stream.head = None
+            if not timestamps and TIMESTAMP_PATTERN.match(line):
+                line = line.split(' ', 1)[1] if ' ' in line else ''
+            out.write("{} | {}\n".format(stream.prefix, line))
+        out.flush()
+
+    def timestamp_key(self, line, stream):
+        """
+        returns a sortable key for the RFC3339Nano timestamp of a docker logs
+        -t line. Lines without one (for example errors) sort with the
+        previous line of the same stream.
+        """
+        matchObj = TIMESTAMP_PATTERN.match(line)
+        if matchObj:
+            # Docker drops the trailing zeros of the fraction
+            stream.last_key = "{}.{}".format(matchObj.group(1), (matchObj.group(2) or '').ljust(9, '0'))
+        return stream.last_key
+
+
+class LogStream(object):
+    """
+    lines of one task, passed from its reader thread to the printer through a
+    bounded queue
+    """
+
+    def __init__(self, task_id, hostname, prefix):
+        self.task_id = task_id
+        self.hostname = hostname
+        self.prefix = prefix
+        self.queue = Queue.Queue(LOG_QUEUE_SIZE)
+        self.process = None
+        self.stopped = False
+        self.done = False
+        self.head = None
+        self.waiting_since = None
+        self.last_key = ''
+
+    def put(self, line):
+        while not self.stopped:
+            try:
+                self.queue.put(line, True, LOG_POLL_INTERVAL)
+                return
+            except Queue.Full:
+                pass
+
+    def stop(self):
+        self.stopped = True
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+
 if __name__ == '__main__':
     settingObj = Settings()
     appObj = AppConfig()
     containerconfig = ContainerConfig()
+    framework = Marathon()
     roger_logs = RogerLogs()
     roger_logs.main()
@@ -33,6 +33,7 @@ import subprocess
 # core
 from cli.settings import Settings
 from cli.appconfig import AppConfig
+from cli.gitutils import GitUtils
 from cli.frameworkUtils import FrameworkUtils
 from cli.marathon import Marathon
 from cli.chronos import Chronos
@@ -60,12 +61,14 @@ class RogerPromote(object):
         app_config=AppConfig(),
         settings=Settings(),
         framework_utils=FrameworkUtils(),
-        framework=Marathon()
+        framework=Marathon(),
+        git_utils=GitUtils()
     ):
         self._app_config = app_config
         self._settings = settings
         self._framework_utils = framework_utils
         self._framework = framework
+        self._git_utils = git_utils
         self._config_dir = None
         self._roger_env = None
         self._temp_dir = None
@@ -280,7 +283,7 @@ class RogerPromote(object):
 
     def _clone_repo(self, repo):
         """
-        Clone the repo
+        Clone the repo, from its local mirror when it can be updated
 
         :Params:
         :repo [str] The name of the repo
@@ -292,6 +295,15 @@ class RogerPromote(object):
         """
         repo_url = self._app_config.getRepoUrl(repo)
         self._temp_dir = tempfile.mkdtemp()
+        # Same directory name as a plain `git clone repo_url`
+        repo_dir = os.path.basename(repo_url)
+        if repo_dir.endswith('.git'):
+            repo_dir = repo_dir[:-len('.git')]
+        clone_dir = os.path.join(self._temp_dir, repo_dir)
+        if self._git_utils.cloneFromMirror(repo_url, None, clone_dir, False) == 0:
+            return
+        if os.path.isdir(clone_dir):
+            shutil.rmtree(clone_dir)
         subprocess.check_call(['git', 'clone', repo_url], cwd=self._temp_dir)
 
     def _roger_push_script(self):
@@ -2,21 +2,48 @@
 
 from __future__ import print_function
 import argparse
+import contextlib
 import subprocess
 import json
 import os
 import requests
 import subprocess
 import sys
+import time
+from multiprocessing.pool import ThreadPool
 from tabulate import tabulate
 from termcolor import colored
 from cli.settings import Settings
 from cli.appconfig import AppConfig
 from cli.marathon import Marathon
 from cli.haproxyparser import HAProxyParser
+from cli.appselector import AppSelector
 requests.packages.urllib3.disable_warnings()
 
 
+WATCH_EVENT_TYPES = ['status_update_event', 'api_post_event', 'deployment_info', 'deployment_success',
+                     'deployment_failed', 'deployment_step_success', 'deployment_step_failure']
+# Deployment state shown per app while a deployment runs, by event type
+DEPLOYMENT_STATES = {'deployment_info': 'in progress', 'deployment_step_success': 'step done',
+                     'deployment_step_failure': 'step failed'}
+WATCH_RECONNECT_DELAY = 5
+TERMINAL_TASK_STATES = ['TASK_FINISHED', 'TASK_FAILED', 'TASK_KILLED', 'TASK_LOST', 'TASK_ERROR',
+                        'TASK_DROPPED', 'TASK_GONE', 'TASK_GONE_BY_OPERATOR', 'TASK_UNREACHABLE', 'TASK_UNKNOWN']
+CLEAR_SCREEN = "\033[2J\033[H"
+OUTPUT_FORMATS = ['table', 'json', 'ndjson']
+
+
+@contextlib.contextmanager
+def stdout_to_stderr():
+    '''Withable redirect of stdout to stderr that restores stdout'''
+    stdout = sys.stdout
+    try:
+        sys.stdout = sys.stderr
+        yield
+    finally:
+        sys.stdout = stdout
+
+
 def describe():
     return "displays information about the currently active applications and tasks."
 
@@ -30,46 +57,68 @@ class RogerPS(object):
                             help="environment to search. Example: 'dev' or 'stage'")
         parser.add_argument(
             '-v', '--verbose', help="show extended information for each task", action="store_true")
+        parser.add_argument(
+            '-w', '--watch', help="keep the table up to date from the Marathon event stream, with the state of running and failed deployments", action="store_true")
+        parser.add_argument('-o', '--output', choices=OUTPUT_FORMATS, default='table',
+                            help="output format. 'ndjson' streams one record per app (and task when verbose). "
+                            "Defaults to table.")
+        parser.add_argument('-a', '--app', metavar='app',
+                            help="only list this app, every app under this group, or apps matching this glob. "
+                            "Example: '/team/*'")
+        parser.add_argument('-l', '--label', action='append',
+                            help="only list apps matching this Marathon label selector. Can be repeated. "
+                            "Example: 'owner==team', 'canary', 'tier in (web,worker)'")
         return parser
 
-    def get_app_details(self, framework, haproxyparser, environment, args, roger_env):
+    def get_app_details(self, framework, haproxyparser, environment, args, roger_env, selector=None):
+        instance_details, app_envs = self.fetch_cluster_state(
+            framework, haproxyparser, environment, roger_env, selector)
+        return self.build_app_details(
+            instance_details, app_envs, haproxyparser.get_routes(), environment, args, roger_env)
+
+    def fetch_cluster_state(self, framework, haproxyparser, environment, roger_env, selector=None):
+        # Prompt for credentials up front, the fetches below run in threads
+        framework.fetchUserPass(environment)
+        pool = ThreadPool(2)
+        try:
+            snapshot = pool.apply_async(
+                self.get_cluster_snapshot, (framework, roger_env, environment, selector))
+            haproxy_config = pool.apply_async(
+                haproxyparser.parseConfig, (environment,))
+            instance_details, app_envs = snapshot.get()
+            haproxy_config.get()
+        finally:
+            pool.close()
+        return instance_details, app_envs
+
+    def build_app_details(self, instance_details, app_envs, routes, environment, args, roger_env):
         app_details = {}
+        app_details["apps"] = dict(self.iter_app_details(
+            instance_details, app_envs, routes, environment, args, roger_env))
+        return app_details
+
+    def iter_app_details(self, instance_details, app_envs, routes, environment, args, roger_env):
+        """
+        yields (app_id, app_details) for every app with running tasks, one
+        app at a time as soon as its details are computed
+        """
         instances = {}
-        instance_details = self.get_instance_details(
-            framework, roger_env, environment)
-        app_envs = self.get_app_envs(framework, roger_env, environment)
         for task_id in instance_details:
             app_id = instance_details[task_id][0]
-            if app_id in instances.keys():
-                tasks_list = instances[app_id]
-                tasks_list.append(task_id)
-                instances[app_id] = tasks_list
+            if app_id in instances:
+                instances[app_id].append(task_id)
             else:
-                tasks_list = []
-                tasks_list.append(task_id)
-                instances[app_id] = tasks_list
+                instances[app_id] = [task_id]
 
-        haproxyparser.parseConfig(environment)
-        http_prefixes = haproxyparser.get_path_begin_values()
-        tcp_ports = haproxyparser.get_backend_tcp_ports()
-
-        app_ids = {}
         for app_id in instances.keys():
-            http_prefix = ""
             http_url = "-"
-            tcp_port_list = []
             num_instances = len(instances[app_id])
-            for k, v in http_prefixes.iteritems():
-                if app_id == v:
-                    http_prefix = k
-                    if app_id in app_envs.keys():
-                        if 'HTTP_PORT' in app_envs[app_id]:
-                            http_url = "{}{}".format(roger_env['environments'][
-                                                     environment]['host'], http_prefix)
-                            break
-            for k, v in tcp_ports.iteritems():
-                if app_id == v:
-                    tcp_port_list.append(k)
+            http_prefixes = routes.get_app_path_begin_values(app_id)
+            if http_prefixes and app_id in app_envs:
+                if 'HTTP_PORT' in app_envs[app_id]:
+                    http_url = "{}{}".format(roger_env['environments'][
+                                             environment]['host'], http_prefixes[0])
+            tcp_port_list = routes.get_app_tcp_ports(app_id)
             app_details = {}
             app_details["instances"] = num_instances
             app_details["http_url"] = http_url
@@ -86,10 +135,194 @@ class RogerPS(object):
                     task_details["started_at"] = instance_details[task_id][3]
                     task_ids[task_id] = task_details
                 app_details["tasks"] = task_ids
-            app_ids[app_id] = app_details
+            yield app_id, app_details
 
-        app_details["apps"] = app_ids
-        return app_details
+    def app_record(self, app_id, app_data):
+        record = {}
+        record["type"] = "app"
+        record["app_id"] = app_id
+        record["instances"] = app_data["instances"]
+        record["http_url"] = app_data["http_url"] if app_data["http_url"] != "-" else None
+        record["tcp_ports"] = app_data["tcp_port_list"].split(", ") if app_data["tcp_port_list"] != "-" else []
+        return record
+
+    def task_record(self, app_id, task_id, task_data):
+        record = {}
+        record["type"] = "task"
+        record["app_id"] = app_id
+        record["task_id"] = task_id
+        record["hostname"] = task_data["hostname"]
+        record["ports"] = task_data["ports"]
+        record["started_at"] = task_data["started_at"]
+        return record
+
+    def print_app_records_ndjson(self, app_details_iter, args, out):
+        """
+        writes one JSON record per line for every app (and, when verbose,
+        every task) as soon as it is computed
+        """
+        for app_id, app_data in app_details_iter:
+            out.write(json.dumps(self.app_record(app_id, app_data)) + "\n")
+            if args.verbose:
+                for task_id, task_data in app_data["tasks"].items():
+                    out.write(json.dumps(self.task_record(app_id, task_id, task_data)) + "\n")
+            out.flush()
+
+    def print_app_records_json(self, app_details_iter, args, out):
+        apps = []
+        for app_id, app_data in app_details_iter:
+            record = self.app_record(app_id, app_data)
+            if args.verbose:
+                record["tasks"] = [self.task_record(app_id, task_id, task_data)
+                                   for task_id, task_data in app_data["tasks"].items()]
+            apps.append(record)
+        out.write(json.dumps({"apps": apps}, indent=2) + "\n")
+        out.flush()
+
+    def apply_event(self, event, instance_details, app_envs, selector=None, deployments=None):
+        """
+        applies a Marathon event to the in-memory instance_details and
+        app_envs. Returns (changed, routes_changed). With a selector, app_envs
+        only holds the selected apps and events for other apps are ignored.
+
+        :params:
+        :deployments [dict]: the state of the running or failed deployment of
+                             every app, kept up to date if given
+        """
+        filtered = selector is not None and not selector.is_empty()
+        event_type = event.get('eventType', '')
+        if event_type == 'status_update_event':
+            task_id = event['taskId']
+            if filtered and event['appId'] not in app_envs:
+                return False, False
+            if event['taskStatus'] == 'TASK_RUNNING':
+                instance_details[task_id] = (
+                    event['appId'], event['host'], event.get('ports', []), event.get('timestamp'))
+                return True, False
+            if event['taskStatus'] in TERMINAL_TASK_STATES and task_id in instance_details:
+                del instance_details[task_id]
+                return True, False
+        elif event_type == 'api_post_event':
+            app = event.get('appDefinition', {})
+            if filtered:
+                if 'id' not in app or not selector.matches(app):
+                    return False, False
+                if app_envs.get(app['id']) != app.get('env', {}):
+                    app_envs[app['id']] = app.get('env', {})
+                    return True, False
+            elif 'id' in app and app_envs.get(app['id']) != app.get('env'):
+                if 'env' in app:
+                    app_envs[app['id']] = app['env']
+                else:
+                    app_envs.pop(app['id'], None)
+                return True, False
+        elif event_type.startswith('deployment_'):
+            plan = event.get('plan', {})
+            target = plan.get('target')
+            if event_type != 'deployment_success':
+                return self.apply_deployment_event(event, selector, deployments), False
+            finished = False
+            if deployments is not None:
+                for app_id in self.get_plan_apps(plan):
+                    finished = deployments.pop(app_id, None) is not None or finished
+            if target is not None:
+                # The target of a deployment plan is the whole root group
+                apps = {}
+                self.collect_apps(target, apps)
+                if filtered:
+                    apps = dict((app_id, app) for app_id, app in apps.items() if selector.matches(app))
+                for task_id in list(instance_details.keys()):
+                    if instance_details[task_id][0] not in apps:
+                        del instance_details[task_id]
+                app_envs.clear()
+                for app_id, app in apps.items():
+                    if filtered:
+                        app_envs[app_id] = app.get('env', {})
+                    elif 'env' in app:
+                        app_envs[app_id] = app['env']
+                return True, True
+            return finished, False
+        return False, False
+
+    def apply_deployment_event(self, event, selector, deployments):
+        """
+        records the state of a deployment that is running or failed for its
+        apps. Returns whether deployments changed.
+        """
+        if deployments is None:
+            return False
+        event_type = event['eventType']
+        plan = event.get('plan', {})
+        if event_type == 'deployment_failed':
+            states = dict((app_id, 'failed') for app_id in self.get_plan_apps(plan))
+        elif event_type in DEPLOYMENT_STATES:
+            states = dict((action['app'], "{}: {}".format(DEPLOYMENT_STATES[event_type], action.get('action', '')))
+                          for action in self.get_step_actions(event.get('currentStep', {})) if 'app' in action)
+        else:
+            return False
+        apps = {}
+        if plan.get('target') is not None:
+            self.collect_apps(plan['target'], apps)
+        changed = False
+        for app_id, state in states.items():
+            if selector is not None and not selector.is_empty() and \
+                    not selector.matches(apps.get(app_id, {'id': app_id})):
+                continue
+            if deployments.get(app_id) != state:
+                deployments[app_id] = state
+                changed = True
+        return changed
+
+    def get_step_actions(self, step):
+        # Marathon before 1.0 sends a step as the list of its actions
+        return step.get('actions', []) if isinstance(step, dict) else step
+
+    def get_plan_apps(self, plan):
+        return set(action['app'] for step in plan.get('steps', [])
+                   for action in self.get_step_actions(step) if 'app' in action)
+
+    def collect_apps(self, group, apps):
+        for app in group.get('apps', []):
+            apps[app['id']] = app
+        for sub_group in group.get('groups', []):
+            self.collect_apps(sub_group, apps)
+
+    def watch(self, framework, haproxyparser, environment, args, roger_env, selector=None):
+        """
+        takes one snapshot of the cluster and then keeps it up to date from
+        the Marathon event stream, redrawing the table whenever it changes
+        """
+        deployments = {}
+        while True:
+            instance_details, app_envs = self.fetch_cluster_state(
+                framework, haproxyparser, environment, roger_env, selector)
+            self.redraw(instance_details, app_envs, haproxyparser, environment, args, roger_env, deployments)
+            try:
+                for event in framework.getEvents(roger_env, environment, WATCH_EVENT_TYPES):
+                    changed, routes_changed = self.apply_event(event, instance_details, app_envs, selector,
+                                                               deployments)
+                    if routes_changed:
+                        # A conditional fetch, a 304 when the routes did not change
+                        haproxyparser.parseConfig(environment, True)
+                    if changed:
+                        self.redraw(instance_details, app_envs, haproxyparser, environment, args, roger_env,
+                                    deployments)
+            except requests.exceptions.HTTPError:
+                raise
+            except requests.exceptions.RequestException as e:
+                print(colored("Lost the Marathon event stream ({}), reconnecting...".format(e), "yellow"))
+                time.sleep(WATCH_RECONNECT_DELAY)
+
+    def redraw(self, instance_details, app_envs, haproxyparser, environment, args, roger_env, deployments=None):
+        app_details = self.build_app_details(
+            instance_details, app_envs, haproxyparser.get_routes(), environment, args, roger_env)
+        sys.stdout.write(CLEAR_SCREEN)
+        print("Watching {} - {}".format(environment, time.strftime("%Y-%m-%d %H:%M:%S")))
+        self.print_app_details(app_details, args)
+        if deployments:
+            print("\n{}".format(tabulate(sorted(deployments.items()), headers=["App Id", "Deployment"],
+                                          tablefmt="simple")))
+        sys.stdout.flush()
 
     def print_app_details(self, app_details, args):
         apps = []
@@ -121,13 +354,8 @@ class RogerPS(object):
             headers = ["App Id", "Instances", "Http Url", "TCP Ports"]
         print("{}".format(tabulate(apps, headers=headers, tablefmt="simple")))
 
-    def get_app_envs(self, framework, roger_env, environment):
-        app_envs = framework.getAppEnvDetails(roger_env, environment)
-        return app_envs
-
-    def get_instance_details(self, framework, roger_env, environment):
-        instance_details = framework.getInstanceDetails(roger_env, environment)
-        return instance_details
+    def get_cluster_snapshot(self, framework, roger_env, environment, selector=None):
+        return framework.getClusterSnapshot(roger_env, environment, selector)
 
     def main(self, settings, appconfig, framework, haproxyparser, args):
         config_dir = settings.getConfigDir()
@@ -149,9 +377,37 @@ class RogerPS(object):
         if environment not in roger_env['environments']:
             raise ValueError(colored("Environment not found in roger-mesos-tools.config file.", "red"))
 
-        app_details = self.get_app_details(
-            framework, haproxyparser, environment, args, roger_env)
-        self.print_app_details(app_details, args)
+        selector = AppSelector(getattr(args, 'app', None), getattr(args, 'label', None))
+        if selector.is_empty():
+            selector = None
+
+        output = getattr(args, 'output', 'table')
+        if getattr(args, 'watch', False):
+            if output != 'table':
+                raise ValueError(colored("--watch only supports the table output.", "red"))
+            try:
+                self.watch(framework, haproxyparser, environment, args, roger_env, selector)
+            except KeyboardInterrupt:
+                print("Exited.")
+            return
+
+        if output == 'table':
+            app_details = self.get_app_details(
+                framework, haproxyparser, environment, args, roger_env, selector)
+            self.print_app_details(app_details, args)
+            return
+
+        # Keep stdout clean for the records, status messages go to stderr
+        out = sys.stdout
+        with stdout_to_stderr():
+            instance_details, app_envs = self.fetch_cluster_state(
+                framework, haproxyparser, environment, roger_env, selector)
+        app_details_iter = self.iter_app_details(
+            instance_details, app_envs, haproxyparser.get_routes(), environment, args, roger_env)
+        if output == 'ndjson':
+            self.print_app_records_ndjson(app_details_iter, args, out)
+        else:
+            self.print_app_records_json(app_details_iter, args, out)
 
 
 if __name__ == '__main__':
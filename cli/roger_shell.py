@@ -31,6 +31,9 @@ class RogerShell(object):
                                  help="environment to search. Example: 'dev' or 'stage'")
         self.parser.add_argument('-H', '--hostname', metavar='hostname',
                                  help="hostname to search. Example: 'daldevmesos01' or 'daldevmesos04'")
+        self.parser.add_argument('-a', '--app', metavar='app',
+                                 help="id of the application the task belongs to, only its tasks are searched. "
+                                 "Example: '/team/content'")
         return self.parser
 
     def main(self):
@@ -56,18 +59,9 @@ class RogerShell(object):
         if environment not in roger_env['environments']:
             raise ValueError(colored("Environment not found in roger-mesos-tools.config file.", "red"))
 
-        hostname = ''
-        containerId = ''
-        if args.hostname is None:
-            hostname = containerconfig.get_hostname_from_marathon(
-                environment, roger_env, args.appTaskId)
-        else:
-            hostname = args.hostname
-
-        if hostname != '':  # Hostname maybe empty when the given appTaskId does not match any taskId from Marathon
-            (containerId, mesosTaskId) = containerconfig.get_containerid_mesostaskid(
-                args.appTaskId, hostname)
-        else:
+        (hostname, containerId, mesosTaskId) = containerconfig.get_task_location(
+            environment, roger_env, args.appTaskId, args.app, args.hostname)
+        if hostname == '':  # Hostname maybe empty when the given appTaskId does not match any taskId from Marathon
             if args.verbose:
                 print(colored("Most likely hostname could not be retrieved with appTaskId {0}. Hostname is also \
     an optional argument. See -h for usage.".format(args.appTaskId), "cyan"))
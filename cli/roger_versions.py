@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+from __future__ import print_function
+import argparse
+import sys
+from datetime import datetime
+from tabulate import tabulate
+from termcolor import colored
+from cli.settings import Settings
+from cli.appconfig import AppConfig
+from cli.dockerutils import DockerUtils
+from cli.utils import printException
+from cli.versionindex import VersionIndex
+
+
+def describe():
+    return 'lists the image versions of an application from the local version index.'
+
+
+class RogerVersions(object):
+
+    def parse_args(self):
+        self.parser = argparse.ArgumentParser(prog='roger versions', description=describe())
+        self.parser.add_argument('app', metavar='app',
+                                 help="application to list the versions of. Example: 'agora'.")
+        self.parser.add_argument('config_file', metavar='config_file',
+                                 help="configuration file of the application. Example: 'content.json'.")
+        self.parser.add_argument('-r', '--refresh', action="store_true",
+                                 help="add the versions pushed to the registry by others to the index first. "
+                                 "Done automatically the first time an application is listed.")
+        self.parser.add_argument('-a', '--all', action="store_true",
+                                 help="also list the images tagged for an environment.")
+        self.parser.add_argument('-n', '--limit', metavar='N', type=int,
+                                 help="only list the N latest versions.")
+        return self.parser
+
+    def main(self, settingObj, appObj, versionIndex, dockerUtilsObj, args):
+        config_dir = settingObj.getConfigDir()
+        roger_env = appObj.getRogerEnv(config_dir)
+        config = appObj.getConfig(config_dir, args.config_file)
+        if 'registry' not in roger_env:
+            raise ValueError("Registry not found in roger-mesos-tools.config file.")
+        if args.app not in config['apps']:
+            raise ValueError("Application {} specified not found.".format(args.app))
+        registry = roger_env['registry']
+        config_name = config['name']
+
+        if args.refresh or versionIndex.get_refreshed_at(registry, config_name, args.app) is None:
+            versionIndex.refresh(registry, config_name, args.app, roger_env['environments'].keys(),
+                                 dockerUtilsObj)
+        versions = versionIndex.get_versions(registry, config_name, args.app, None if args.all else '')
+        if args.limit is not None:
+            versions = versions[-args.limit:] if args.limit > 0 else []
+        if not versions:
+            print(colored("No versions of {} found in the index.".format(args.app), "yellow"))
+            return
+        self.print_versions(versions, versionIndex.get_refreshed_at(registry, config_name, args.app))
+
+    def print_versions(self, versions, refreshed_at):
+        rows = [['v' + row['version'], row['sha'] or '-', row['env'] or '-', self.format_time(row['pushed_at']),
+                 row['image']] for row in reversed(versions)]
+        print(tabulate(rows, headers=['Version', 'Sha', 'Env', 'Pushed At', 'Image']))
+        print("Index last refreshed from the registry at {}".format(self.format_time(refreshed_at)))
+
+    def format_time(self, timestamp):
+        if timestamp is None:
+            return '-'
+        return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+
+if __name__ == '__main__':
+    settingObj = Settings()
+    appObj = AppConfig()
+    roger_versions = RogerVersions()
+    args = roger_versions.parse_args().parse_args()
+    try:
+        roger_versions.main(settingObj, appObj, VersionIndex(), DockerUtils(), args)
+    except (Exception) as e:
+        printException(e)
+        sys.exit(1)
@@ -47,12 +47,43 @@ class Settings:
         secrets_dir = os.path.abspath(secrets_dir)
         return secrets_dir
 
+    def getCacheDir(self):
+        # ROGER_CACHE_DIR > ~/.roger_cli.conf.d/cache
+        cache_dir = ''
+        if "ROGER_CACHE_DIR" in os.environ:
+            cache_dir = os.environ.get('ROGER_CACHE_DIR')
+        if cache_dir.strip() == '':
+            cache_dir = os.path.join(os.path.expanduser('~'), '.roger_cli.conf.d', 'cache')
+        cache_dir = os.path.abspath(cache_dir)
+        return cache_dir
+
+    def getGitMirrorDir(self):
+        # ROGER_GIT_MIRROR_DIR > <cache dir>/git
+        mirror_dir = ''
+        if "ROGER_GIT_MIRROR_DIR" in os.environ:
+            mirror_dir = os.environ.get('ROGER_GIT_MIRROR_DIR')
+        if mirror_dir.strip() == '':
+            mirror_dir = os.path.join(self.getCacheDir(), 'git')
+        mirror_dir = os.path.abspath(mirror_dir)
+        return mirror_dir
+
     def getCliDir(self):
         cli_dir = ''
         own_dir = os.path.dirname(os.path.realpath(__file__))
         cli_dir = os.path.abspath(os.path.join(own_dir, os.pardir))
         return cli_dir
 
+    def getHttpPoolSize(self):
+        # ROGER_HTTP_POOL_SIZE > 10
+        pool_size = 10
+        envvar = "ROGER_HTTP_POOL_SIZE"
+        if envvar in os.environ and os.environ.get(envvar).strip() != '':
+            pool_size = int(os.environ.get(envvar))
+        if pool_size < 1:
+            raise ValueError(
+                "Environment variable ${} must be a positive integer.".format(envvar))
+        return pool_size
+
     def getUser(self):
         user = None
         # ROGER_USER_ID env var > getpass.getuser()
@@ -5,6 +5,9 @@ import argparse
 import os
 import sys
 import statsd
+import requests
+import threading
+from requests.adapters import HTTPAdapter
 from cli.settings import Settings
 from cli.appconfig import AppConfig
 import hashlib
@@ -37,6 +40,29 @@ def printException(e):
 def printErrorMsg(error_msg, stack_depth = 2):
     print(colored("{} - {}".format(getDebugInfo(stack_depth), error_msg), "red"))
 
+# Sessions are shared by every client so that all calls made against the same
+# base url reuse one keep-alive connection pool.
+_http_sessions = {}
+_http_sessions_lock = threading.Lock()
+
+def getHttpSession(base_url):
+    """
+    returns the requests session of base_url, e.g. 'http://host:5051', with a
+    connection pool of ROGER_HTTP_POOL_SIZE connections, see Settings
+    """
+    with _http_sessions_lock:
+        session = _http_sessions.get(base_url)
+        if session is None:
+            pool_size = Settings().getHttpPoolSize()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update({'Accept-Encoding': 'gzip, deflate',
+                                    'Connection': 'keep-alive'})
+            _http_sessions[base_url] = session
+    return session
+
 class Utils:
 
     def __init__(self):
@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+
+from __future__ import print_function
+import os
+import sqlite3
+import sys
+import time
+from cli.settings import Settings
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS images (
+        registry TEXT NOT NULL,
+        image TEXT NOT NULL,
+        config_name TEXT NOT NULL,
+        app TEXT NOT NULL,
+        sha TEXT NOT NULL,
+        version TEXT NOT NULL,
+        env TEXT NOT NULL,
+        pushed_at REAL,
+        context_digest TEXT,
+        PRIMARY KEY (registry, image))""",
+    """CREATE INDEX IF NOT EXISTS images_app ON images (registry, config_name, app)""",
+    """CREATE TABLE IF NOT EXISTS refreshes (
+        registry TEXT NOT NULL,
+        config_name TEXT NOT NULL,
+        app TEXT NOT NULL,
+        refreshed_at REAL NOT NULL,
+        PRIMARY KEY (registry, config_name, app))"""
+]
+
+
+def splitVersion(version):
+    major, _, rest = version.partition('.')
+    minor, _, rest = rest.partition('.')
+    patch, _, rest = rest.partition('.')
+    return int(major), int(minor) if minor else 0, int(patch) if patch else 0
+
+
+class VersionIndex(object):
+    """
+    Local SQLite index of the image versions in the registry. An image is
+    named <config name>-<app>-<sha>/v<version>, or <config name>-<app>-<env>...
+    for the images tagged for an environment. The index of an app is refreshed
+    from the registry catalog and updated on every successful push, so the
+    versions of an app can be listed without asking the registry.
+
+    :params:
+    :path [str]: database file, defaults to <cache dir>/versions.db
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            path = os.path.join(Settings().getCacheDir(), 'versions.db')
+        self.path = path
+
+    def connect(self):
+        # A connection per call, so that forked deploy processes never share one
+        cache_dir = os.path.dirname(self.path)
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        conn = sqlite3.connect(self.path, timeout=30)
+        for statement in SCHEMA:
+            conn.execute(statement)
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(images)")]
+        if 'context_digest' not in columns:
+            # Indexes created before the build context digest was kept
+            conn.execute("ALTER TABLE images ADD COLUMN context_digest TEXT")
+        return conn
+
+    def parse_image(self, config_name, app, image, envs):
+        """
+        returns (sha, version, env) of an image of the app, or None if image
+        is not one of its versioned images
+        """
+        prefix = "{0}-{1}-".format(config_name, app)
+        if not image.startswith(prefix) or '/v' not in image:
+            return None
+        name, _, version = image[len(prefix):].rpartition('/v')
+        if not all(item.isdigit() for item in version.split('.')):
+            return None
+        for env in envs:
+            if name.startswith(env):
+                return '', version, env
+        return name, version, ''
+
+    def add(self, conn, registry, config_name, app, image, envs, pushed_at=None, context_digest=None):
+        parsed = self.parse_image(config_name, app, image, envs)
+        if parsed is None:
+            return False
+        sha, version, env = parsed
+        conn.execute("INSERT OR IGNORE INTO images (registry, image, config_name, app, sha, version, env) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?)", (registry, image, config_name, app, sha, version, env))
+        if pushed_at is not None:
+            conn.execute("UPDATE images SET pushed_at = ? WHERE registry = ? AND image = ?",
+                         (pushed_at, registry, image))
+        if context_digest is not None:
+            conn.execute("UPDATE images SET context_digest = ? WHERE registry = ? AND image = ?",
+                         (context_digest, registry, image))
+        return True
+
+    def set_context_digest(self, registry, image, context_digest):
+        """
+        keeps the build context digest of an image read from the registry,
+        '' for an image without one, so that it is not read again
+        """
+        conn = self.connect()
+        try:
+            with conn:
+                conn.execute("UPDATE images SET context_digest = ? WHERE registry = ? AND image = ?",
+                             (context_digest, registry, image))
+        finally:
+            conn.close()
+
+    def record_push(self, registry, config_name, app, image, envs, context_digest=None):
+        """
+        adds an image that was just pushed to the registry. A failure to write
+        the index is printed and never fails the push.
+        """
+        try:
+            conn = self.connect()
+            try:
+                with conn:
+                    self.add(conn, registry, config_name, app, image, envs, time.time(), context_digest)
+            finally:
+                conn.close()
+        except (sqlite3.Error, OSError) as e:
+            print("Could not add {} to the version index at {}. (Error: {})".format(image, self.path, e),
+                  file=sys.stderr)
+
+    def refresh(self, registry, config_name, app, envs, dockerUtilsObj):
+        """
+        adds the images of the app that are in the registry but not in the
+        index yet. Only the catalog range of the app is read, see
+        DockerUtils.docker_search.
+        """
+        result = dockerUtilsObj.docker_search(registry, config_name, app)
+        conn = self.connect()
+        try:
+            with conn:
+                for line in result.split('\n'):
+                    image = line.split(' ')[0]
+                    if image:
+                        self.add(conn, registry, config_name, app, image, envs)
+                conn.execute("INSERT OR REPLACE INTO refreshes VALUES (?, ?, ?, ?)",
+                             (registry, config_name, app, time.time()))
+        finally:
+            conn.close()
+
+    def search_versions(self, registry, config_name, app, envs, dockerUtilsObj):
+        """
+        returns the versions of the untagged images of the app, read from the
+        registry without the index, oldest first. Used when the index cannot
+        be read or written.
+        """
+        result = dockerUtilsObj.docker_search(registry, config_name, app)
+        versions = []
+        for line in result.split('\n'):
+            parsed = self.parse_image(config_name, app, line.split(' ')[0], envs)
+            if parsed is not None and parsed[2] == '':
+                versions.append(parsed[1])
+        return sorted(versions, key=splitVersion)
+
+    def get_refreshed_at(self, registry, config_name, app):
+        conn = self.connect()
+        try:
+            row = conn.execute("SELECT refreshed_at FROM refreshes WHERE registry = ? AND config_name = ? AND app = ?",
+                               (registry, config_name, app)).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else None
+
+    def get_versions(self, registry, config_name, app, env=None):
+        """
+        returns the images of the app as dicts, oldest version first
+
+        :params:
+        :env [str]: only the images tagged for env, '' for the untagged ones,
+                    None for all of them
+        """
+        query = "SELECT image, sha, version, env, pushed_at, context_digest FROM images " \
+                "WHERE registry = ? AND config_name = ? AND app = ?"
+        params = [registry, config_name, app]
+        if env is not None:
+            query += " AND env = ?"
+            params.append(env)
+        conn = self.connect()
+        try:
+            rows = conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+        versions = [dict(zip(['image', 'sha', 'version', 'env', 'pushed_at', 'context_digest'], row))
+                    for row in rows]
+        return sorted(versions, key=lambda row: (splitVersion(row['version']), row['image']))
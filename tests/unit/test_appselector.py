@@ -0,0 +1,57 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import unittest
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
+from cli.appselector import AppSelector
+
+# Test basic functionalities of AppSelector class
+
+
+class TestAppSelector(unittest.TestCase):
+
+    def test_empty(self):
+        selector = AppSelector()
+        assert selector.is_empty()
+        assert selector.query_params() == []
+        assert selector.matches({'id': '/anything'})
+
+    def test_app_id_and_group(self):
+        selector = AppSelector('team/app1')
+        assert selector.query_params() == [('id', '/team/app1')]
+        assert selector.matches({'id': '/team/app1'})
+        assert selector.matches({'id': '/team/app1/worker'})
+        assert not selector.matches({'id': '/team/app10'})
+        assert not selector.matches({'id': '/other/team/app1'})
+
+    def test_glob(self):
+        selector = AppSelector('/team/web-*')
+        assert selector.is_glob()
+        assert selector.query_params() == [('id', '/team/web-')]
+        assert selector.matches({'id': '/team/web-frontend'})
+        assert not selector.matches({'id': '/team/worker'})
+        assert AppSelector('/*').query_params() == []
+
+    def test_labels(self):
+        selector = AppSelector(labels=['owner==team', 'canary', 'tier in (web, worker)', 'env!=dev'])
+        assert selector.query_params() == [('label', 'owner==team,canary,tier in (web, worker),env!=dev')]
+        labels = {'owner': 'team', 'canary': 'true', 'tier': 'worker', 'env': 'prod'}
+        assert selector.matches({'id': '/app1', 'labels': labels})
+        assert not selector.matches({'id': '/app1', 'labels': dict(labels, owner='other')})
+        assert not selector.matches({'id': '/app1', 'labels': dict(labels, tier='db')})
+        assert not selector.matches({'id': '/app1', 'labels': dict(labels, env='dev')})
+        assert not selector.matches({'id': '/app1'})
+        assert AppSelector(labels=['tier notin (db)']).matches({'id': '/app1', 'labels': labels})
+
+    def test_invalid_label(self):
+        with self.assertRaises(ValueError):
+            AppSelector(labels=['tier in web'])
+
+    def tearDown(self):
+        pass
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
+from cli.buildcontext import BuildContext
+
+# Test basic functionalities of BuildContext class
+
+
+class TestBuildContext(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.write('Dockerfile', 'FROM alpine\nCOPY . /app\n')
+        self.write('.dockerignore', '# comment\nnode_modules\n**/*.pyc\ndocs\n!docs/README.md\n/build\n')
+        self.write('app.py', 'print 1\n')
+        self.write('lib/util.py', 'pass\n')
+        self.write('lib/util.pyc', 'compiled')
+        self.write('node_modules/dep/index.js', 'module.exports = 1\n')
+        self.write('docs/guide.md', 'guide\n')
+        self.write('docs/README.md', 'readme\n')
+        self.write('build/out.bin', 'out')
+
+    def write(self, name, data):
+        path = os.path.join(self.directory, name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write(data)
+
+    def test_iter_files(self):
+        context = BuildContext(self.directory)
+        assert list(context.iter_files()) == [
+            '.dockerignore', 'Dockerfile', 'app.py', 'docs/README.md', 'lib/util.py']
+
+    def test_digest(self):
+        digest = BuildContext(self.directory).digest()
+        assert digest.startswith('sha256:')
+
+        # Ignored files do not change the digest
+        self.write('lib/other.pyc', 'compiled')
+        self.write('node_modules/dep/other.js', '')
+        assert BuildContext(self.directory).digest() == digest
+
+        # Nor does the git metadata of the repo
+        self.write('.git/HEAD', 'ref: refs/heads/master\n')
+        self.write('.git/FETCH_HEAD', 'abc\n')
+        assert BuildContext(self.directory).digest() == digest
+
+        assert BuildContext(self.directory, build_args={'A': '1'}).digest() != digest
+        self.write('app.py', 'print 2\n')
+        assert BuildContext(self.directory).digest() != digest
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -32,11 +32,13 @@ class TestChronos(unittest.TestCase):
         config_file = 'test.yml'
 
         app_config_object = mock(AppConfig)
+        session = mock(requests.Session)
+        c = Chronos()
         when(app_config_object).getRogerEnv(config_dir).thenReturn(data)
-        when(requests).get(url, auth=(username, password)).thenReturn(res)
+        when(c).getSession('https://example.com').thenReturn(session)
+        when(session).get(url, auth=(username, password)).thenReturn(res)
         when(res).json().thenReturn(image_data)
 
-        c = Chronos()
         img = c.get_image_name(
             username,
             password,
@@ -0,0 +1,130 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import unittest
+import os
+import sys
+import shutil
+import socket
+import struct
+import tempfile
+import requests
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
+from StringIO import StringIO
+from cli.containerconfig import ContainerConfig
+from mockito import mock, when, any
+
+# Test basic functionalities of ContainerConfig class
+
+
+class TestContainerConfig(unittest.TestCase):
+
+    def setUp(self):
+        self.containerconfig = ContainerConfig()
+        self.session = mock(requests.Session)
+        when(self.containerconfig).get_docker_session('host1').thenReturn(self.session)
+        self.cache_dir = tempfile.mkdtemp()
+        self.set_cache_dir = os.environ.get('ROGER_CACHE_DIR')
+        os.environ['ROGER_CACHE_DIR'] = self.cache_dir
+
+    def stub_get(self, path, status_code, data):
+        res = mock(requests.Response)
+        res.status_code = status_code
+        when(res).json().thenReturn(data)
+        when(res).raise_for_status().thenReturn(None)
+        when(self.session).get('http://host1:4243' + path, timeout=any()).thenReturn(res)
+
+    def test_get_app_id_from_task_id(self):
+        assert self.containerconfig.get_app_id_from_task_id(
+            'team_content.5684d8a4-0a43-11e6-8b5d-0242ac110003') == '/team/content'
+        assert self.containerconfig.get_app_id_from_task_id('team_cont') is None
+
+    def test_get_containerid_mesostaskid_from_labels(self):
+        self.stub_get('/containers/json', 200, [
+            {'Id': 'c1', 'Labels': {'MESOS_TASK_ID': 'other.1'}},
+            {'Id': 'c2', 'Labels': {'MESOS_TASK_ID': 'content.5684'}}])
+        assert self.containerconfig.get_containerid_mesostaskid(
+            'content', 'host1') == ('c2', 'content.5684')
+
+    def test_get_containerid_mesostaskid_from_env(self):
+        self.stub_get('/containers/json', 200, [
+            {'Id': 'c1', 'Labels': {}}, {'Id': 'c2', 'Labels': None}, {'Id': 'c3', 'Labels': {}}])
+        self.stub_get('/containers/c1/json', 200, {'Config': {'Env': ['PATH=/bin']}})
+        self.stub_get('/containers/c2/json', 404, {'message': 'No such container'})
+        self.stub_get('/containers/c3/json', 200, {'Config': {'Env': ['MESOS_TASK_ID=content.5684']}})
+        assert self.containerconfig.get_containerid_mesostaskid(
+            'content.56', 'host1') == ('c3', 'content.5684')
+        assert self.containerconfig.get_containerid_mesostaskid('missing', 'host1') == ('', '')
+
+    def test_get_task_location_cached(self):
+        cc = self.containerconfig
+        roger_env = {}
+        when(cc).get_hostname_from_marathon('dev', roger_env, 'content', None).thenReturn('host1')
+        when(cc).get_containerid_mesostaskid('content', 'host1').thenReturn(('c1', 'content.5684'))
+        assert cc.get_task_location('dev', roger_env, 'content') == ('host1', 'c1', 'content.5684')
+        assert cc.read_task_cache('dev') == {'content': {
+            'hostname': 'host1', 'container_id': 'c1', 'mesos_task_id': 'content.5684'}}
+
+        # Served from the cache while the container runs
+        when(cc).get_hostname_from_marathon('dev', roger_env, 'content', None).thenReturn('')
+        self.stub_get('/containers/c1/json', 200, {'State': {'Running': True}})
+        assert cc.get_task_location('dev', roger_env, 'content') == ('host1', 'c1', 'content.5684')
+
+        # Invalidated once the container is gone and the task left Marathon
+        self.stub_get('/containers/c1/json', 404, {'message': 'No such container'})
+        assert cc.get_task_location('dev', roger_env, 'content') == ('', '', '')
+        assert cc.read_task_cache('dev') == {}
+
+    def test_update_task_cache(self):
+        cc = self.containerconfig
+        # A partial file is a cache miss
+        os.makedirs(os.path.join(self.cache_dir, 'tasks'))
+        with open(cc.get_task_cache_path('dev'), 'w') as f:
+            f.write('{"content": {"hostname"')
+        assert cc.read_task_cache('dev') == {}
+
+        # Updates made by other callers in between are kept
+        cc.update_task_cache('dev', {'content.1': {'hostname': 'host1', 'container_id': 'c1'}})
+        ContainerConfig().update_task_cache('dev', {'content.2': {'hostname': 'host2', 'container_id': 'c2'}})
+        assert sorted(cc.read_task_cache('dev').keys()) == ['content.1', 'content.2']
+        cc.update_task_cache('dev', removed_container='c1')
+        assert cc.read_task_cache('dev').keys() == ['content.2']
+        assert sorted(os.listdir(os.path.join(self.cache_dir, 'tasks'))) == ['dev.json', 'dev.json.lock']
+
+    def test_iter_docker_stream(self):
+        frames = [(1, 'out\n'), (2, 'err\n'), (1, '')]
+        raw = StringIO(''.join(struct.pack('>BxxxI', stream, len(payload)) + payload
+                               for stream, payload in frames))
+        assert list(self.containerconfig.iter_docker_stream(raw)) == ['out\n', 'err\n']
+
+    def test_exec_in_container_timeout(self):
+        class SilentRaw(StringIO):
+            # The command writes one line, then goes silent past the timeout
+            def read(self, size=-1):
+                if self.tell() == self.len:
+                    raise socket.timeout('timed out')
+                return StringIO.read(self, size)
+
+        created = mock(requests.Response)
+        when(created).raise_for_status().thenReturn(None)
+        when(created).json().thenReturn({'Id': 'e1'})
+        when(self.session).post('http://host1:4243/containers/c1/exec', json=any(), timeout=any()) \
+            .thenReturn(created)
+        started = mock(requests.Response)
+        started.raw = SilentRaw(struct.pack('>BxxxI', 1, 4) + 'out\n')
+        when(started).raise_for_status().thenReturn(None)
+        when(started).close().thenReturn(None)
+        when(self.session).post('http://host1:4243/exec/e1/start', json=any(), stream=True, timeout=any()) \
+            .thenReturn(started)
+        assert self.containerconfig.exec_in_container('host1', 'c1', ['ls'], 1) == (None, 'out\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+        if self.set_cache_dir is None:
+            del os.environ['ROGER_CACHE_DIR']
+        else:
+            os.environ['ROGER_CACHE_DIR'] = self.set_cache_dir
+
+if __name__ == '__main__':
+    unittest.main()
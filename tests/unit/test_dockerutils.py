@@ -0,0 +1,107 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import unittest
+import os
+import sys
+import json
+import shutil
+import tempfile
+import requests
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
+from cli.dockerutils import DockerUtils, MANIFEST_V2
+from mockito import mock, when, verify, any
+
+# Test basic functionalities of DockerUtils class
+
+
+class TestDockerUtils(unittest.TestCase):
+
+    def setUp(self):
+        self.dockerutils = DockerUtils()
+        self.catalog = ['alpha', 'moz-content-abc/v0.1.0', 'moz-content-def/v0.2.0', 'moz-content-dev/v0.3.0',
+                        'moz-kwe-abc/v1.0.0', 'zeta']
+        self.pages = []
+        self.dockerutils.get_catalog_page = self.get_catalog_page
+
+    def get_catalog_page(self, registry, last, size=2):
+        # A registry honouring 'last', serving pages of 2 repositories
+        self.pages.append(last)
+        repos = [repo for repo in self.catalog if last is None or repo > last]
+        return repos[:size]
+
+    def test_docker_search_v2_prefix(self):
+        assert self.dockerutils.docker_search_v2('registry', 'moz-content-') == \
+            'moz-content-abc/v0.1.0\nmoz-content-def/v0.2.0\nmoz-content-dev/v0.3.0\n'
+        # Starts right before the prefix and stops past it
+        assert self.pages == ['moz-content-', 'moz-content-def/v0.2.0']
+        assert self.dockerutils.catalogs == {}
+
+    def test_docker_search_v2_without_last(self):
+        # A registry ignoring a 'last' that is not one of its repositories
+        self.dockerutils.get_catalog_page = lambda registry, last: \
+            self.get_catalog_page(registry, last if last is None or last in self.catalog else None)
+        assert self.dockerutils.docker_search_v2('registry', 'moz-kwe-') == 'moz-kwe-abc/v1.0.0\n'
+        assert self.dockerutils.catalogs == {'registry': self.catalog}
+
+        # The full catalog is walked once per run
+        del self.pages[:]
+        assert self.dockerutils.docker_search_v2('registry', 'moz-content-').count('\n') == 3
+        assert self.pages == []
+
+    def test_get_build_labels(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            docker_file = os.path.join(temp_dir, 'Dockerfile')
+            with open(docker_file, 'w') as dockerfile:
+                dockerfile.write('FROM alpine\n')
+            labels = self.dockerutils.get_build_labels(docker_file, {'A': '1', 'B': '2'})
+            assert sorted(labels.keys()) == ['roger.build_args_digest', 'roger.dockerfile_digest']
+            assert labels == self.dockerutils.get_build_labels(docker_file, {'B': '2', 'A': '1'})
+            assert labels != self.dockerutils.get_build_labels(docker_file, {'A': '1'})
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_retag_image(self):
+        session = mock(requests.Session)
+        when(self.dockerutils).get_registry_session('registry').thenReturn(session)
+        body = json.dumps({'schemaVersion': 2, 'config': {'digest': 'sha256:c'},
+                           'layers': [{'digest': 'sha256:l1'}, {'digest': 'sha256:l2'}]})
+        when(self.dockerutils).get_manifest('registry', 'moz-content-abc/v0.1.0', 'latest').thenReturn(
+            (MANIFEST_V2, body))
+        mounted = mock(requests.Response)
+        mounted.status_code = 201
+        when(session).post('http://registry/v2/moz-content-abc/v0.2.0/blobs/uploads/', params=any(),
+                           timeout=any()).thenReturn(mounted)
+        put = mock(requests.Response)
+        when(put).raise_for_status().thenReturn(None)
+        when(session).put('http://registry/v2/moz-content-abc/v0.2.0/manifests/latest', data=body,
+                          headers={'Content-Type': MANIFEST_V2}, timeout=any()).thenReturn(put)
+        assert self.dockerutils.retag_image('registry', 'moz-content-abc/v0.1.0', 'moz-content-abc/v0.2.0')
+        for digest in ['sha256:c', 'sha256:l1', 'sha256:l2']:
+            verify(session).post('http://registry/v2/moz-content-abc/v0.2.0/blobs/uploads/',
+                                 params={'mount': digest, 'from': 'moz-content-abc/v0.1.0'}, timeout=any())
+
+    def test_retag_image_cancels_upload(self):
+        session = mock(requests.Session)
+        when(self.dockerutils).get_registry_session('registry').thenReturn(session)
+        body = json.dumps({'schemaVersion': 2, 'config': {'digest': 'sha256:c'}, 'layers': []})
+        when(self.dockerutils).get_manifest('registry', 'moz-content-abc/v0.1.0', 'latest').thenReturn(
+            (MANIFEST_V2, body))
+        upload = mock(requests.Response)
+        upload.status_code = 202
+        upload.headers = {'Location': '/v2/moz-content-abc/v0.2.0/blobs/uploads/1234?_state=abc'}
+        when(session).post('http://registry/v2/moz-content-abc/v0.2.0/blobs/uploads/', params=any(),
+                           timeout=any()).thenReturn(upload)
+        when(session).delete(any(), timeout=any()).thenReturn(mock(requests.Response))
+        assert not self.dockerutils.retag_image('registry', 'moz-content-abc/v0.1.0', 'moz-content-abc/v0.2.0')
+        verify(session).delete('http://registry/v2/moz-content-abc/v0.2.0/blobs/uploads/1234?_state=abc',
+                               timeout=any())
+        verify(session, times=0).put(any(), data=any(), headers=any(), timeout=any())
+
+    def tearDown(self):
+        pass
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,6 +6,8 @@ import os
 import json
 import sys
 import shutil
+import subprocess
+import tempfile
 sys.path.insert(0, os.path.abspath(os.path.join(
     os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
 from cli.settings import Settings
@@ -114,5 +116,90 @@ class TestInit(unittest.TestCase):
     def tearDown(self):
         pass
 
+
+class TestGitMirror(unittest.TestCase):
+
+    def setUp(self):
+        self.gitObj = GitUtils()
+        self.temp_dir = tempfile.mkdtemp()
+        self.set_mirror_dir = os.environ.get('ROGER_GIT_MIRROR_DIR')
+        os.environ['ROGER_GIT_MIRROR_DIR'] = os.path.join(self.temp_dir, 'mirrors')
+        self.repo_url = os.path.join(self.temp_dir, 'origin')
+        self.git('init', '-q', self.repo_url)
+        self.commit('first')
+
+    def git(self, *args, **kwargs):
+        env = dict(os.environ, GIT_AUTHOR_NAME='roger', GIT_AUTHOR_EMAIL='roger@example.com',
+                   GIT_COMMITTER_NAME='roger', GIT_COMMITTER_EMAIL='roger@example.com')
+        return subprocess.check_output(('git',) + args, env=env, **kwargs).strip()
+
+    def commit(self, message):
+        self.git('commit', '-q', '--allow-empty', '-m', message, cwd=self.repo_url)
+        return self.git('rev-parse', 'HEAD', cwd=self.repo_url)
+
+    def test_getMirrorPath(self):
+        os.environ['ROGER_GIT_MIRROR_DIR'] = '/cache/git'
+        assert self.gitObj.getMirrorPath('git@github.com:seomoz/roger.git') == \
+            '/cache/git/github.com_seomoz_roger.git'
+        assert self.gitObj.getMirrorPath('https://github.com/seomoz/roger') == \
+            '/cache/git/github.com_seomoz_roger.git'
+
+    def test_cloneFromMirror(self):
+        branch = self.git('rev-parse', '--abbrev-ref', 'HEAD', cwd=self.repo_url)
+        self.git('update-ref', 'refs/pull/1/head', 'HEAD', cwd=self.repo_url)
+        first_clone = os.path.join(self.temp_dir, 'first')
+        assert self.gitObj.cloneFromMirror(self.repo_url, branch, first_clone, False, depth=1) == 0
+        mirror = self.gitObj.getMirrorPath(self.repo_url)
+        assert os.path.isdir(mirror)
+        # Only the branches and tags are mirrored
+        assert self.git('for-each-ref', 'refs/pull', cwd=mirror) == ''
+
+        # The next clone fetches the new commit into the existing mirror
+        self.commit('second')
+        sha = self.commit('third')
+        second_clone = os.path.join(self.temp_dir, 'second')
+        assert self.gitObj.cloneFromMirror(self.repo_url, branch, second_clone, False, depth=1) == 0
+        assert self.git('rev-parse', 'HEAD', cwd=second_clone) == sha
+        assert self.git('rev-parse', 'origin/' + branch, cwd=second_clone) == sha
+        assert self.git('config', 'remote.origin.url', cwd=second_clone) == self.repo_url
+        assert self.git('rev-list', '--count', 'HEAD', cwd=second_clone) == '1'
+
+    def test_cloneFromMirror_full(self):
+        self.commit('second')
+        clone = os.path.join(self.temp_dir, 'clone')
+        assert self.gitObj.cloneFromMirror(self.repo_url, None, clone, False) == 0
+        # The objects of the mirror are borrowed, not copied
+        with open(os.path.join(clone, '.git', 'objects', 'info', 'alternates')) as alternates:
+            assert alternates.read().strip() == os.path.join(self.gitObj.getMirrorPath(self.repo_url), 'objects')
+        assert self.git('rev-list', '--count', 'HEAD', cwd=clone) == '2'
+        assert self.git('config', 'remote.origin.url', cwd=clone) == self.repo_url
+
+    def test_prefetchMirrors(self):
+        branch = self.git('rev-parse', '--abbrev-ref', 'HEAD', cwd=self.repo_url)
+        sha = self.commit('second')
+        missing = os.path.join(self.temp_dir, 'missing')
+        self.gitObj.prefetchMirrors([self.repo_url, missing], 2, False)
+        self.gitObj.waitForPrefetch()
+        assert self.gitObj.prefetch_errors.keys() == [missing]
+
+        # The clone uses the prefetched mirror without fetching it again
+        self.commit('third')
+        clone = os.path.join(self.temp_dir, 'clone')
+        assert self.gitObj.cloneFromMirror(self.repo_url, branch, clone, False, depth=1) == 0
+        assert self.git('rev-parse', 'HEAD', cwd=clone) == sha
+
+    def test_cloneFromMirror_unreachable(self):
+        missing = os.path.join(self.temp_dir, 'missing')
+        assert self.gitObj.cloneFromMirror(missing, 'master', os.path.join(self.temp_dir, 'clone'), False) != 0
+        # No half-cloned mirror is left behind
+        assert not os.path.exists(self.gitObj.getMirrorPath(missing))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+        if self.set_mirror_dir is None:
+            del os.environ['ROGER_GIT_MIRROR_DIR']
+        else:
+            os.environ['ROGER_GIT_MIRROR_DIR'] = self.set_mirror_dir
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,160 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+import requests
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
+import cli.haproxyparser
+from cli.haproxyparser import HAProxyParser, HAProxyRoutes
+from mockito import mock, when, verify, unstub
+from mockito.matchers import any
+
+# Test basic functionalities of HAProxyParser class
+
+HAPROXY_CONFIG = """frontend marathon_http_in
+  acl ::test::app-aclrule path_beg -i /test/app
+  use_backend ::test::app-cluster if ::test::app-aclrule
+  use_backend ::test::links-cluster if ::test::links-aclrule
+
+listen ::test::app-cluster-tcp-3000 :3000
+  mode tcp
+"""
+
+
+HAPROXY_URL = "http://testhost:8000/config"
+
+
+def fake_response(status_code, config="", headers={}):
+    resp = requests.Response()
+    resp.status_code = status_code
+    resp._content = config
+    resp._content_consumed = True
+    resp.headers.update(headers)
+    return resp
+
+
+class TestHAProxyParser(unittest.TestCase):
+
+    def setUp(self):
+        HAProxyParser.clearCache()
+        self.cache_dir = tempfile.mkdtemp()
+        self.set_cache_dir = os.environ.get('ROGER_CACHE_DIR')
+        os.environ['ROGER_CACHE_DIR'] = self.cache_dir
+        self.haproxyparser = HAProxyParser()
+        when(self.haproxyparser).get_haproxy_config_url(
+            "test").thenReturn(HAPROXY_URL)
+        when(self.haproxyparser).get_haproxy_config(
+            HAPROXY_URL, None, None).thenReturn(fake_response(200, HAPROXY_CONFIG))
+
+    def test_parseConfig(self):
+        self.haproxyparser.parseConfig("test")
+        assert self.haproxyparser.get_path_begin_values() == {
+            '/test/app': '/test/app', '/test/links': '/test/links'}
+        assert self.haproxyparser.get_backend_tcp_ports() == {
+            '3000': '/test/app'}
+
+    def test_parseConfig_fetches_once_per_environment(self):
+        for i in range(5):
+            self.haproxyparser.parseConfig("test")
+        verify(self.haproxyparser, times=1).get_haproxy_config(HAPROXY_URL, None, None)
+        self.haproxyparser.parseConfig("test", refresh=True)
+        verify(self.haproxyparser, times=2).get_haproxy_config(HAPROXY_URL, None, None)
+
+    def test_parseConfig_builds_routing_index(self):
+        self.haproxyparser.parseConfig("test")
+        routes = self.haproxyparser.get_routes()
+        assert routes.get_app_path_begin_values('/test/app') == ['/test/app']
+        assert routes.get_app_tcp_ports('/test/app') == ['3000']
+        assert routes.get_app_for_path_begin_value('/test/links') == '/test/links'
+        assert routes.get_app_for_tcp_port('3000') == '/test/app'
+        assert routes.get_app_tcp_ports('/test/links') == []
+        assert routes.get_app_for_tcp_port('9000') is None
+
+    def test_routes_reassigned_route_moves_to_last_app(self):
+        routes = HAProxyRoutes()
+        routes.add_path_begin_value('/api', '/app1')
+        routes.add_path_begin_value('/web', '/app1')
+        routes.add_path_begin_value('/api', '/app2')
+        assert routes.get_app_for_path_begin_value('/api') == '/app2'
+        assert routes.get_app_path_begin_values('/app1') == ['/web']
+        assert routes.get_app_path_begin_values('/app2') == ['/api']
+
+    def test_parseConfig_uses_disk_cache_on_not_modified(self):
+        etag = '"5f1e-2a"'
+        when(self.haproxyparser).get_haproxy_config(
+            HAPROXY_URL, None, None).thenReturn(fake_response(200, HAPROXY_CONFIG, {'ETag': etag}))
+        self.haproxyparser.parseConfig("test")
+        assert os.path.isfile(os.path.join(self.cache_dir, 'haproxy', 'test.cfg'))
+
+        HAProxyParser.clearCache()
+        haproxyparser = HAProxyParser()
+        when(haproxyparser).get_haproxy_config_url("test").thenReturn(HAPROXY_URL)
+        when(haproxyparser).get_haproxy_config(
+            HAPROXY_URL, etag, None).thenReturn(fake_response(304))
+        when(haproxyparser).parse_line(any(), any()).thenRaise(AssertionError("config parsed again"))
+        haproxyparser.parseConfig("test")
+        assert haproxyparser.get_backend_tcp_ports() == {'3000': '/test/app'}
+
+    def test_parseConfig_streams_config_into_cache(self):
+        self.haproxyparser.parseConfig("test")
+        cache_path = os.path.join(self.cache_dir, 'haproxy', 'test')
+        with open(cache_path + '.cfg') as f:
+            assert f.read() == HAPROXY_CONFIG
+        assert sorted(os.listdir(os.path.dirname(cache_path))) == ['test.cfg', 'test.json']
+
+        HAProxyParser.clearCache()
+        self.haproxyparser.parseConfig("test")
+        with open(cache_path + '.cfg') as f:
+            assert f.read() == HAPROXY_CONFIG
+        assert sorted(os.listdir(os.path.dirname(cache_path))) == ['test.cfg', 'test.json']
+
+    def test_parseConfig_concurrent_loads(self):
+        # Loaders in other processes write their own temporary files
+        cache_path = os.path.join(self.cache_dir, 'haproxy', 'test')
+        first = self.haproxyparser.open_cache_file(cache_path, '.cfg.tmp')
+        second = self.haproxyparser.open_cache_file(cache_path, '.cfg.tmp')
+        assert first.name != second.name
+        first.close()
+        second.close()
+
+        # Another loader already moved its file into place
+        when(os).rename(any(), any()).thenRaise(OSError(2, 'No such file or directory'))
+        self.haproxyparser.parseConfig("test")
+        assert self.haproxyparser.get_backend_tcp_ports() == {'3000': '/test/app'}
+
+    def test_parseConfig_error_response(self):
+        when(self.haproxyparser).get_haproxy_config(
+            HAPROXY_URL, None, None).thenReturn(fake_response(503, "<html>Service Unavailable</html>"))
+        with self.assertRaises(ValueError):
+            self.haproxyparser.parseConfig("test")
+        assert not os.path.exists(os.path.join(self.cache_dir, 'haproxy'))
+
+    def test_get_haproxy_config(self):
+        session = mock(requests.Session)
+        when(cli.haproxyparser).getHttpSession('http://testhost:8000').thenReturn(session)
+        resp = fake_response(304)
+        when(session).get(HAPROXY_URL, headers={'If-None-Match': '"abc"'}, stream=True).thenReturn(resp)
+        assert HAProxyParser().get_haproxy_config(HAPROXY_URL, '"abc"') is resp
+
+    def test_parse(self):
+        routes = self.haproxyparser.parse(HAPROXY_CONFIG.splitlines())
+        assert routes.path_begin_values == {
+            '/test/app': '/test/app', '/test/links': '/test/links'}
+        assert routes.backend_tcp_ports == {'3000': '/test/app'}
+
+    def tearDown(self):
+        unstub()
+        HAProxyParser.clearCache()
+        shutil.rmtree(self.cache_dir)
+        if self.set_cache_dir is None:
+            del os.environ['ROGER_CACHE_DIR']
+        else:
+            os.environ['ROGER_CACHE_DIR'] = self.set_cache_dir
+
+if __name__ == '__main__':
+    unittest.main()
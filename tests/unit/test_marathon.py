@@ -11,6 +11,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(
 from cli.marathon import Marathon
 from cli.appconfig import AppConfig
 from mockito import mock, when
+from mockito.matchers import any
 
 # Test basic functionalities of MarathonValidator class
 
@@ -59,6 +60,14 @@ class TestMarathon(unittest.TestCase):
         assert len(message_list) == 1
         for message in message_list:
             print(message)
+        message_list = []
+        group_details = {}
+        group_details['/test/app6'] = ('/api', [], False)
+        group_details['/test/app7'] = ('/api/v2', [], False)
+        valid = self.marathon.validateGroupDetails(group_details, message_list)
+        assert valid is True
+        assert len(message_list) == 1
+        assert message_list[0].startswith("WARNING")
 
     @property
     def config_dir(self):
@@ -81,11 +90,13 @@ class TestMarathon(unittest.TestCase):
         config_file = 'test.yml'
 
         app_config_object = mock(AppConfig)
+        session = mock(requests.Session)
+        m = Marathon()
         when(app_config_object).getRogerEnv(config_dir).thenReturn(data)
-        when(requests).get(url, auth=(username, password)).thenReturn(res)
+        when(m).getSession('https:/marathon-example.com').thenReturn(session)
+        when(session).get(url, auth=(username, password)).thenReturn(res)
         when(res).json().thenReturn(image_data)
 
-        m = Marathon()
         img = m.get_image_name(
             username,
             password,
@@ -97,6 +108,62 @@ class TestMarathon(unittest.TestCase):
         )
         assert img == image_data['app']['container']['docker']['image']
 
+    def test_getClusterSnapshot(self):
+        res = mock(requests.Response)
+        session = mock(requests.Session)
+        endpoint = 'https://marathon-example.com'
+        roger_env = {'environments': {'dev': {'marathon_endpoint': endpoint}}}
+        apps = {'apps': [
+            {'id': '/app1', 'env': {'HTTP_PORT': 'PORT0'}, 'instances': 2, 'tasks': [
+                {'id': 'app1.1', 'host': 'host1', 'ports': [3000], 'startedAt': '2016-03-18T20:48:13.732Z',
+                 'state': 'TASK_RUNNING'},
+                {'id': 'app1.2', 'host': 'host2', 'ports': [3001], 'startedAt': None,
+                 'state': 'TASK_STAGING'}]},
+            {'id': '/app2', 'tasks': []}]}
+        m = Marathon()
+        m.user = 'first.first'
+        m.passw = 'last.last'
+        when(m).getSession(endpoint).thenReturn(session)
+        when(session).get(endpoint + '/v2/apps', params=[('embed', 'apps.tasks')], headers=any(),
+                          auth=('first.first', 'last.last')).thenReturn(res)
+        when(res).json().thenReturn(apps)
+        res.status_code = 200
+        res.reason = 'OK'
+        instance_details, app_envs = m.getClusterSnapshot(roger_env, 'dev')
+        assert instance_details == {
+            'app1.1': ('/app1', 'host1', [3000], '2016-03-18T20:48:13.732Z')}
+        assert app_envs == {'/app1': {'HTTP_PORT': 'PORT0'}, '/app2': {}}
+
+    def test_getEvents(self):
+        session = mock(requests.Session)
+        endpoint = 'https://marathon-example.com'
+        roger_env = {'environments': {'dev': {'marathon_endpoint': endpoint}}}
+        res = requests.Response()
+        res.status_code = 200
+        res._content = ('event: event_stream_attached\n'
+                        'data: {"eventType": "event_stream_attached"}\n\n'
+                        'event: status_update_event\n'
+                        'data: {"eventType": "status_update_event",\n'
+                        'data: "taskId": "app1.1"}\n\n')
+        res._content_consumed = True
+        m = Marathon()
+        m.user = 'first.first'
+        m.passw = 'last.last'
+        when(m).getSession(endpoint).thenReturn(session)
+        when(session).get(endpoint + '/v2/events', params=[('event_type', 'status_update_event')],
+                          headers={'Accept': 'text/event-stream'}, auth=('first.first', 'last.last'),
+                          stream=True).thenReturn(res)
+        events = list(m.getEvents(roger_env, 'dev', ['status_update_event']))
+        assert events == [{'eventType': 'event_stream_attached'},
+                          {'eventType': 'status_update_event', 'taskId': 'app1.1'}]
+
+    def test_getSession_is_shared_per_endpoint(self):
+        other = Marathon()
+        session = self.marathon.getSession('http://marathon-a.example.com')
+        assert other.getSession('http://marathon-a.example.com') is session
+        assert other.getSession('http://marathon-b.example.com') is not session
+        assert session.headers['Accept-Encoding'] == 'gzip, deflate'
+
     def tearDown(self):
         pass
 
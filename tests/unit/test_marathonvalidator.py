@@ -7,7 +7,7 @@ import sys
 sys.path.insert(0, os.path.abspath(os.path.join(
     os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
 from cli.marathonvalidator import MarathonValidator
-from cli.haproxyparser import HAProxyParser
+from cli.haproxyparser import HAProxyParser, HAProxyRoutes
 from mockito import mock, when
 
 # Test basic functionalities of MarathonValidator class
@@ -28,7 +28,7 @@ class TestMarathonValidator(unittest.TestCase):
         path_beg_values['/service2'] = "/app3/service2"
         when(haproxyparser).parseConfig("test").thenReturn(
             "acl ::test::app-aclrule path_beg -i /test/app\nacl ::test::links-aclrule path_beg -i /test/links")
-        when(haproxyparser).get_path_begin_values().thenReturn(path_beg_values)
+        when(haproxyparser).get_routes().thenReturn(HAProxyRoutes(path_beg_values))
         message_list = []
         self.assertTrue(self.marathonvalidator.check_path_begin_value(
             haproxyparser, "/test", False, "/test/app", message_list))
@@ -57,6 +57,43 @@ class TestMarathonValidator(unittest.TestCase):
         self.assertTrue(self.marathonvalidator.check_path_begin_value(
             haproxyparser, "/service", False, "/test/app2/service", message_list))
 
+    def test_check_path_begin_overlaps(self):
+        haproxyparser = mock(HAProxyParser)
+        path_beg_values = {}
+        path_beg_values['/api'] = "/team/api"
+        path_beg_values['/web/v2'] = "/team/web"
+        when(haproxyparser).get_routes().thenReturn(HAProxyRoutes(path_beg_values))
+        message_list = []
+        # '/api' shadows '/api/v2'
+        self.assertTrue(self.marathonvalidator.check_path_begin_value(
+            haproxyparser, "/api/v2", False, "/team/api2", message_list))
+        assert len(message_list) == 1
+        assert "'/api'" in message_list[0] and "/team/api" in message_list[0]
+        # '/web' shadows '/web/v2'
+        message_list = []
+        self.assertTrue(self.marathonvalidator.check_path_begin_value(
+            haproxyparser, "/web", False, "/team/web1", message_list))
+        assert len(message_list) == 1
+        assert "'/web/v2'" in message_list[0]
+        # Overlaps with routes of the same app are fine
+        message_list = []
+        self.assertTrue(self.marathonvalidator.check_path_begin_value(
+            haproxyparser, "/api/v1", False, "/team/api", message_list))
+        assert len(message_list) == 0
+
+    def test_check_path_begin_overlaps_all_longer_prefixes(self):
+        haproxyparser = mock(HAProxyParser)
+        path_beg_values = {}
+        path_beg_values['/api/v2'] = "/team/a"
+        path_beg_values['/api/v3'] = "/team/b"
+        when(haproxyparser).get_routes().thenReturn(HAProxyRoutes(path_beg_values))
+        message_list = []
+        # '/api' shadows the prefix of '/team/b' even though '/team/a' claims it
+        self.assertTrue(self.marathonvalidator.check_path_begin_value(
+            haproxyparser, "/api", False, "/team/a", message_list))
+        assert len(message_list) == 1
+        assert "'/api/v3'" in message_list[0] and "/team/b" in message_list[0]
+
     def test_check_tcp_port(self):
         haproxyparser = mock(HAProxyParser)
         backend_services_tcp_ports = {}
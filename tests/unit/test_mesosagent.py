@@ -0,0 +1,70 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import unittest
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
+from cli.mesosagent import MesosAgent
+from mockito import mock, when
+
+# Test basic functionalities of MesosAgent class
+
+
+class TestMesosAgent(unittest.TestCase):
+
+    def setUp(self):
+        self.agent = MesosAgent('host1')
+        self.files = {'/sandbox/stdout': 'line1\nline2\nline3\n', '/sandbox/stderr': 'err1\nerr2'}
+        self.reads = []
+        self.agent.read_file = self.read_file
+        self.agent.get_file_size = lambda path: len(self.files[path])
+
+    def read_file(self, path, offset, length):
+        self.reads.append((path, offset, length))
+        return self.files[path][offset:offset + length]
+
+    def test_find_task(self):
+        state = {'frameworks': [{'executors': [
+            {'id': 'other.1', 'directory': '/other', 'tasks': [{'id': 'other.1'}]},
+            {'id': 'content.5684', 'directory': '/sandbox', 'tasks': [], 'completed_tasks': [
+                {'id': 'content.5684'}]}]}]}
+        when(self.agent).get_state().thenReturn(state)
+        assert self.agent.find_task('content') == ('content.5684', '/sandbox')
+        assert self.agent.find_task('missing') is None
+
+    def test_read_file_split_character(self):
+        agent = MesosAgent('host1')
+        session = mock()
+        data = 'caf\xc3\xa9\n'
+        for offset in range(0, len(data), 4):
+            resp = mock()
+            # Control characters are escaped, the other bytes are sent as they are
+            resp.content = '{{"data": "{}", "offset": {}}}'.format(
+                data[offset:offset + 4].replace('\n', '\\n'), offset)
+            when(resp).raise_for_status().thenReturn(None)
+            when(session).get('http://host1:5051/files/read', timeout=10,
+                              params={'path': '/sandbox/stdout', 'offset': offset, 'length': 4}).thenReturn(resp)
+        when(agent).getSession().thenReturn(session)
+        # The first chunk ends within the two bytes of the e acute
+        assert agent.read_file('/sandbox/stdout', 0, 4) == 'caf\xc3'
+        assert list(agent.iter_sandbox_lines('/sandbox', chunk_size=4, files=('stdout',))) == ['caf\xc3\xa9']
+
+    def test_iter_sandbox_lines(self):
+        lines = list(self.agent.iter_sandbox_lines('/sandbox', chunk_size=4))
+        assert lines == ['line1', 'line2', 'line3', 'err1', 'err2']
+        # Every offset is read once
+        offsets = [(path, offset) for path, offset, length in self.reads]
+        assert len(offsets) == len(set(offsets))
+
+    def test_iter_sandbox_lines_tail(self):
+        lines = list(self.agent.iter_sandbox_lines('/sandbox', tail=2, chunk_size=4))
+        assert lines == ['line2', 'line3', 'err1', 'err2']
+        assert list(self.agent.iter_sandbox_lines('/sandbox', tail=0)) == []
+
+    def tearDown(self):
+        pass
+
+if __name__ == '__main__':
+    unittest.main()
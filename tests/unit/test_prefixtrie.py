@@ -0,0 +1,50 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import unittest
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
+from cli.prefixtrie import PrefixTrie
+
+# Test basic functionalities of PrefixTrie class
+
+
+class TestPrefixTrie(unittest.TestCase):
+
+    def setUp(self):
+        self.trie = PrefixTrie({'/api': 'app1', '/api/v2/users': 'app2', '/web': 'app3'})
+
+    def test_get(self):
+        assert self.trie.get('/api') == 'app1'
+        assert self.trie.get('/api/v2') is None
+        assert '/web' in self.trie
+        assert '/we' not in self.trie
+        assert '' not in self.trie
+
+    def test_shorter_prefixes(self):
+        assert self.trie.shorter_prefixes('/api/v2/users/1') == [
+            ('/api', 'app1'), ('/api/v2/users', 'app2')]
+        assert self.trie.shorter_prefixes('/api') == []
+        assert self.trie.shorter_prefixes('/other') == []
+
+    def test_longer_prefixes(self):
+        assert self.trie.longer_prefixes('/api/v2') == [('/api/v2/users', 'app2')]
+        assert self.trie.longer_prefixes('/api') == [('/api/v2/users', 'app2')]
+        assert self.trie.longer_prefixes('/web') == []
+        assert self.trie.longer_prefixes('/other') == []
+        self.trie.insert('/api/v3', 'app4')
+        assert self.trie.longer_prefixes('/ap') == [
+            ('/api', 'app1'), ('/api/v2/users', 'app2'), ('/api/v3', 'app4')]
+
+    def test_insert_overwrites_value(self):
+        self.trie.insert('/api', 'app4')
+        assert self.trie.get('/api') == 'app4'
+        assert self.trie.shorter_prefixes('/api/v1') == [('/api', 'app4')]
+
+    def tearDown(self):
+        pass
+
+if __name__ == '__main__':
+    unittest.main()
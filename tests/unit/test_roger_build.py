@@ -7,6 +7,8 @@ import json
 import yaml
 import os
 import sys
+import shutil
+import tempfile
 sys.path.insert(0, os.path.abspath(os.path.join(
     os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
 from cli.roger_build import RogerBuild
@@ -18,6 +20,7 @@ from cli.hooks import Hooks
 from cli.dockerutils import DockerUtils
 from cli.docker_build import Docker
 from cli.utils import Utils
+from cli.versionindex import VersionIndex
 from statsd import StatsClient
 
 # Test basic functionalities of roger-build script
@@ -186,6 +189,129 @@ class TestBuild(unittest.TestCase):
             settings, appConfig, mockedHooks, dockerUtilsObj, dockerObj, args)
         verify(mockedHooks).run_hook("post_build", any(), any(), any())
 
+    def test_reuseBuild(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            roger_build = RogerBuild()
+            roger_build.versionIndex = VersionIndex(os.path.join(temp_dir, 'versions.db'))
+            dockerUtilsObj = mock(DockerUtils)
+            labels = {'roger.dockerfile_digest': 'sha256:1', 'roger.build_args_digest': 'sha256:2'}
+            when(dockerUtilsObj).docker_search('registry', 'moz', 'content').thenReturn(
+                'moz-content-abc/v0.1.0\nmoz-content-abc/v0.2.0\nmoz-content-def/v0.3.0\n')
+            when(dockerUtilsObj).get_image_labels('registry', 'moz-content-abc/v0.2.0').thenReturn(
+                {'roger.dockerfile_digest': 'sha256:other', 'roger.build_args_digest': 'sha256:2'})
+            when(dockerUtilsObj).get_image_labels('registry', 'moz-content-abc/v0.1.0').thenReturn(labels)
+            when(dockerUtilsObj).get_image_labels('registry', 'moz-content-def/v0.3.0').thenReturn({})
+            when(dockerUtilsObj).retag_image('registry', 'moz-content-abc/v0.1.0', 'moz-content-abc/v0.4.0') \
+                .thenReturn(True)
+
+            assert roger_build.reuseBuild(dockerUtilsObj, 'registry', 'moz', 'content', 'moz-content-abc/v0.4.0',
+                                          ['dev'], labels) == 'moz-content-abc/v0.1.0'
+            versions = roger_build.versionIndex.get_versions('registry', 'moz', 'content', '')
+            assert versions[-1]['image'] == 'moz-content-abc/v0.4.0'
+
+            # No image of sha ghi
+            when(dockerUtilsObj).get_image_labels('registry', 'moz-content-abc/v0.4.0').thenReturn(labels)
+            assert roger_build.reuseBuild(dockerUtilsObj, 'registry', 'moz', 'content', 'moz-content-ghi/v0.5.0',
+                                          ['dev'], labels) is None
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_reuseBuild_same_context(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            roger_build = RogerBuild()
+            roger_build.versionIndex = VersionIndex(os.path.join(temp_dir, 'versions.db'))
+            dockerUtilsObj = mock(DockerUtils)
+            labels = {'roger.dockerfile_digest': 'sha256:1', 'roger.build_args_digest': 'sha256:2',
+                      'roger.context_digest': 'sha256:3'}
+            when(dockerUtilsObj).docker_search('registry', 'moz', 'content').thenReturn(
+                'moz-content-abc/v0.1.0\nmoz-content-def/v0.2.0\n')
+            when(dockerUtilsObj).get_image_labels('registry', 'moz-content-def/v0.2.0').thenReturn(
+                {'roger.context_digest': 'sha256:other'})
+            when(dockerUtilsObj).get_image_labels('registry', 'moz-content-abc/v0.1.0').thenReturn(labels)
+            when(dockerUtilsObj).retag_image('registry', any(), any()).thenReturn(True)
+
+            # Another commit that did not change the build context of the app
+            assert roger_build.reuseBuild(dockerUtilsObj, 'registry', 'moz', 'content', 'moz-content-ghi/v0.3.0',
+                                          ['dev'], labels) == 'moz-content-abc/v0.1.0'
+            # The contexts read from the registry are kept in the index
+            assert roger_build.reuseBuild(dockerUtilsObj, 'registry', 'moz', 'content', 'moz-content-jkl/v0.4.0',
+                                          ['dev'], labels) == 'moz-content-ghi/v0.3.0'
+            verify(dockerUtilsObj, times=1).get_image_labels('registry', 'moz-content-def/v0.2.0')
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_roger_build_context_digest(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            os.makedirs(os.path.join(temp_dir, 'test'))
+            with open(os.path.join(temp_dir, 'test', 'Dockerfile'), 'w') as dockerfile:
+                dockerfile.write('FROM alpine\n')
+            file_path = '{}/test'.format(temp_dir)
+            settings = mock(Settings)
+            appConfig = mock(AppConfig)
+            dockerObj = mock(Docker)
+            mockedHooks = mock(Hooks)
+            roger_build = RogerBuild()
+            roger_build.utils = mock(Utils)
+            sc = mock(StatsClient)
+            when(sc).timing(any(), any()).thenReturn(any())
+            when(roger_build.utils).getStatsClient().thenReturn(sc)
+            when(roger_build.utils).get_identifier(any(), any(), any()).thenReturn(any())
+            when(roger_build.utils).extract_app_name(any()).thenReturn('any app')
+            when(settings, strict=False).getConfigDir().thenReturn(any())
+            when(settings, strict=False).getCliDir().thenReturn(any())
+            when(settings).getUser().thenReturn(any())
+            when(appConfig).getRogerEnv(any()).thenReturn({'registry': 'registry'})
+            when(appConfig).getConfig(any(), any()).thenReturn({'name': 'moz'})
+            when(appConfig).getRepoName(any()).thenReturn('test')
+            when(mockedHooks).run_hook(any(), any(), any(), any()).thenReturn(0)
+            when(roger_build).reuseBuild(any(), any(), any(), any(), any(), any(), any()).thenReturn(None)
+            when(dockerObj, strict=False).docker_build(any(), any(), any(), any(), any(), any(), any(), any(), any(),
+                                                       any(), any()).thenReturn(None)
+            args = self.args
+            args.app_name = 'any app'
+            args.env = 'test'
+            args.directory = temp_dir
+            args.config_file = 'any.json'
+            args.tag_name = 'moz-content-abc/v0.1.0'
+            args.verbose = False
+            args.push = False
+
+            # Without --reuse-build the context is not read
+            dockerUtilsObj = mock(DockerUtils)
+            when(dockerUtilsObj).get_build_labels(any(), any(), any()).thenReturn({})
+            when(appConfig).getAppData(any(), any(), any()).thenReturn({'repo': 'test'})
+            args.reuse_build = False
+            roger_build.main(settings, appConfig, mockedHooks, dockerUtilsObj, dockerObj, args)
+            verify(dockerUtilsObj).get_build_labels(file_path + '/Dockerfile', {}, None)
+
+            # Nor is an image reused by a build that is not pushed
+            dockerUtilsObj = mock(DockerUtils)
+            when(dockerUtilsObj).get_build_labels(any(), any(), any()).thenReturn({})
+            args.reuse_build = True
+            roger_build.main(settings, appConfig, mockedHooks, dockerUtilsObj, dockerObj, args)
+            verify(dockerUtilsObj).get_build_labels(file_path + '/Dockerfile', {}, None)
+            verify(roger_build, times=0).reuseBuild(any(), any(), any(), any(), any(), any(), any())
+
+            # roger deploy pushes the image after the build
+            dockerUtilsObj = mock(DockerUtils)
+            when(dockerUtilsObj).get_build_labels(any(), any(), any()).thenReturn({})
+            args.push_later = True
+            roger_build.main(settings, appConfig, mockedHooks, dockerUtilsObj, dockerObj, args)
+            verify(dockerUtilsObj).get_build_labels(file_path + '/Dockerfile', {}, file_path)
+            verify(roger_build).reuseBuild(any(), any(), any(), any(), any(), any(), any())
+
+            # The private projects are added to the context by the build
+            dockerUtilsObj = mock(DockerUtils)
+            when(dockerUtilsObj).get_build_labels(any(), any(), any()).thenReturn({})
+            when(appConfig).getAppData(any(), any(), any()).thenReturn({'repo': 'test', 'privateProjects': ['private']})
+            roger_build.main(settings, appConfig, mockedHooks, dockerUtilsObj, dockerObj, args)
+            verify(dockerUtilsObj).get_build_labels(file_path + '/Dockerfile', {}, None)
+        finally:
+            shutil.rmtree(temp_dir)
+
     def tearDown(self):
         pass
 
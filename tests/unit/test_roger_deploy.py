@@ -6,6 +6,8 @@ import argparse
 import os
 import sys
 import json
+import shutil
+import tempfile
 sys.path.insert(0, os.path.abspath(os.path.join(
     os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
 import roger_push
@@ -28,6 +30,7 @@ from cli.dockerutils import DockerUtils
 from cli.docker_build import Docker
 from statsd import StatsClient
 from cli.utils import Utils
+from cli.versionindex import VersionIndex
 
 # Test basic functionalities of roger-deploy script
 
@@ -74,11 +77,6 @@ class TestDeploy(unittest.TestCase):
         self.roger_env = roger_env
         self.data = data
 
-    def test_splitVersion(self):
-        roger_deploy = RogerDeploy()
-        assert roger_deploy.splitVersion("0.1.0") == (0, 1, 0)
-        assert roger_deploy.splitVersion("2.0013") == (2, 13, 0)
-
     def test_incrementVersion(self):
         git_sha = "dwqjdqgwd7y12edq21"
         image_version_list = ['0.001', '0.2.034', '1.1.2', '1.002.1']
@@ -96,6 +94,94 @@ class TestDeploy(unittest.TestCase):
         assert roger_deploy.incrementVersion(
             git_sha, image_version_list, args) == 'dwqjdqgwd7y12edq21/v2.0.0'
 
+    def test_getNextVersion_without_index(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            # The cache dir cannot be created below a file
+            open(os.path.join(temp_dir, 'cache'), 'w').close()
+            roger_deploy = RogerDeploy()
+            roger_deploy.versionIndex = VersionIndex(os.path.join(temp_dir, 'cache', 'versions.db'))
+            roger_deploy.dockerUtilsObject = mock(DockerUtils)
+            roger_deploy.git_shas[(os.path.abspath(temp_dir), 'repo', 'master')] = 'abc'
+            when(roger_deploy.dockerUtilsObject).docker_search('registry', 'moz', 'content').thenReturn(
+                'moz-content-abc/v0.9.0\nmoz-content-def/v0.10.0\nmoz-content-dev-abc/v0.11.0\n')
+            args = self.args
+            args.incr_major = False
+            args.incr_patch = False
+            roger_env = {'registry': 'registry', 'environments': {'dev': {}}}
+            assert roger_deploy.getNextVersion({'name': 'moz'}, roger_env, 'content', 'master', temp_dir, 'repo',
+                                               args, None) == 'abc/v0.11.0'
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_deployAppsInParallel(self):
+        roger_deploy = RogerDeploy()
+        deployed = []
+
+        def deploy(app, app_args):
+            app_args.app_name = app
+            print("deploying {}".format(app))
+            if app == 'app2':
+                raise ValueError('build failed')
+            roger_deploy.image_name = "{}/v0.1.0".format(app)
+            roger_deploy.statsd_message_list.append((app, 1))
+            deployed.append(app)
+
+        args = argparse.Namespace(app_name=None)
+        results = roger_deploy.deployAppsInParallel([['app1', 'app3'], ['app2']], args, deploy, 2)
+        assert [result['app'] for result in results] == ['app1', 'app3', 'app2']
+        assert [result['error'] for result in results] == [None, None, "ValueError('build failed',)"]
+        assert results[1]['image_name'] == 'app3/v0.1.0'
+        # The apps were deployed in child processes, with their own args
+        assert deployed == []
+        assert args.app_name is None
+        assert sorted(roger_deploy.statsd_message_list) == [('app1', 1), ('app3', 1)]
+
+    def test_deployAppsPipelined(self):
+        roger_deploy = RogerDeploy()
+
+        def build(app, state):
+            if app == 'app2':
+                raise ValueError('build failed')
+            state['image_name'] = "{}/v0.1.0".format(app)
+
+        def put(app, state):
+            roger_deploy.statsd_message_list.append((state['image_name'], 1))
+
+        stages = [('build', build), ('framework put', put)]
+        results = roger_deploy.deployAppsPipelined([['app1'], ['app2'], ['app3']], argparse.Namespace(), stages, 1)
+        assert [result['app'] for result in results] == ['app1', 'app2', 'app3']
+        assert [result['image_name'] for result in results] == ['app1/v0.1.0', '', 'app3/v0.1.0']
+        assert results[1]['error'] == "build failed: ValueError('build failed',)"
+        # app2 never reached the framework put stage
+        assert roger_deploy.statsd_message_list == [('app1/v0.1.0', 1), ('app3/v0.1.0', 1)]
+
+    def test_getGitSha_is_shared(self):
+        roger_deploy = RogerDeploy()
+        gitObj = mock(GitUtils)
+        when(gitObj).getGitSha('roger', 'master', '/tmp/work').thenReturn('abc123')
+        assert roger_deploy.getGitSha('/tmp/work', 'roger', 'master', gitObj) == 'abc123'
+        assert roger_deploy.getGitSha('/tmp/work', 'roger', 'master', gitObj) == 'abc123'
+        verify(gitObj, times=1).getGitSha('roger', 'master', '/tmp/work')
+
+    def test_prefetchRepos(self):
+        roger_deploy = RogerDeploy()
+        appConfig = mock(AppConfig)
+        gitObj = mock(GitUtils)
+        work_dir = tempfile.mkdtemp()
+        try:
+            os.makedirs(os.path.join(work_dir, 'checked_out'))
+            for repo in ['checked_out', 'repo1', 'repo2']:
+                when(appConfig).getRepoName(repo).thenReturn(repo)
+                when(appConfig).getRepoUrl(repo).thenReturn('git@github.com:seomoz/{}.git'.format(repo))
+            when(gitObj).prefetchMirrors(any(), any(), any()).thenReturn(None)
+            args = argparse.Namespace(fetch_jobs=2, verbose=False)
+            roger_deploy.prefetchRepos(appConfig, gitObj, set(['checked_out', 'repo1', 'repo2']), work_dir, args)
+            verify(gitObj).prefetchMirrors(['git@github.com:seomoz/repo1.git', 'git@github.com:seomoz/repo2.git'],
+                                           2, False)
+        finally:
+            shutil.rmtree(work_dir)
+
     def test_tempDirCheck(self):
         work_dir = "./test_dir"
         roger_deploy = RogerDeploy()
@@ -310,6 +396,8 @@ class TestDeploy(unittest.TestCase):
         when(gitObj).gitShallowClone(any(), any()).thenReturn(0)
         when(gitObj).gitClone(any(), any()).thenReturn(0)
         when(gitObj).getGitSha(any(), any(), any()).thenReturn(random)
+        when(gitObj).prefetchMirrors(any(), any(), any()).thenReturn(None)
+        when(gitObj).waitForPrefetch().thenReturn(None)
 
         when(roger_deploy.rogerGitPullObject).main(any(), any(), any(), any(), any()).thenReturn(0)
         when(roger_deploy.rogerPushObject).main(any(), any(), any(), any(), any()).thenReturn(0)
@@ -383,6 +471,8 @@ class TestDeploy(unittest.TestCase):
         when(gitObj).gitShallowClone(any(), any()).thenReturn(0)
         when(gitObj).gitClone(any(), any()).thenReturn(0)
         when(gitObj).getGitSha(any(), any(), any()).thenReturn(random)
+        when(gitObj).prefetchMirrors(any(), any(), any()).thenReturn(None)
+        when(gitObj).waitForPrefetch().thenReturn(None)
 
         when(roger_deploy.rogerGitPullObject).main(any(), any(), any(), any(), any()).thenReturn(0)
         when(roger_deploy.rogerPushObject).main(any(), any(), any(), any(), any()).thenReturn(0)
@@ -457,6 +547,8 @@ class TestDeploy(unittest.TestCase):
         when(gitObj).gitShallowClone(any(), any()).thenReturn(0)
         when(gitObj).gitClone(any(), any()).thenReturn(0)
         when(gitObj).getGitSha(any(), any(), any()).thenReturn(random)
+        when(gitObj).prefetchMirrors(any(), any(), any()).thenReturn(None)
+        when(gitObj).waitForPrefetch().thenReturn(None)
 
         when(roger_deploy.rogerGitPullObject).main(any(), any(), any(), any(), any()).thenReturn(0)
         when(roger_deploy.rogerPushObject).main(any(), any(), any(), any(), any()).thenReturn(0)
@@ -526,6 +618,8 @@ class TestDeploy(unittest.TestCase):
         when(gitObj).gitShallowClone(any(), any()).thenReturn(0)
         when(gitObj).gitClone(any(), any()).thenReturn(0)
         when(gitObj).getGitSha(any(), any(), any()).thenReturn(random)
+        when(gitObj).prefetchMirrors(any(), any(), any()).thenReturn(None)
+        when(gitObj).waitForPrefetch().thenReturn(None)
 
         when(roger_deploy.rogerGitPullObject).main(any(), any(), any(), any(), any()).thenReturn(0)
         when(roger_deploy.rogerPushObject).main(any(), any(), any(), any(), any()).thenReturn(0)
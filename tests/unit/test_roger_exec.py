@@ -0,0 +1,53 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import unittest
+import os
+import sys
+from StringIO import StringIO
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
+import cli.roger_exec
+from cli.roger_exec import RogerExec
+from cli.containerconfig import ContainerConfig
+from mockito import mock, when
+
+# Test basic functionalities of roger exec
+
+
+class TestRogerExec(unittest.TestCase):
+
+    def setUp(self):
+        self.roger_exec = RogerExec()
+        argv, self.command = self.roger_exec.split_command(['/content', '-p', '2', '--', 'ls', '-l', '--', 'x'])
+        self.args = self.roger_exec.parse_args().parse_args(argv)
+        containerconfig = mock(ContainerConfig)
+        for index in range(3):
+            when(containerconfig).get_task_location(
+                'dev', {}, 'content.{}'.format(index), '/content', 'host{}'.format(index)).thenReturn(
+                ('host{}'.format(index), 'c{}'.format(index) if index < 2 else '', 'content.{}'.format(index)))
+        when(containerconfig).exec_in_container('host0', 'c0', ['ls', '-l'], 60).thenReturn((0, 'file1\n'))
+        when(containerconfig).exec_in_container('host1', 'c1', ['ls', '-l'], 60).thenReturn((None, ''))
+        cli.roger_exec.containerconfig = containerconfig
+
+    def test_parse_args(self):
+        assert self.args.app == '/content'
+        assert self.args.parallel == 2
+        assert self.command == ['ls', '-l', '--', 'x']
+
+    def test_run_in_tasks(self):
+        tasks = [{'id': 'content.{}'.format(index), 'host': 'host{}'.format(index)} for index in range(3)]
+        out = StringIO()
+        results = self.roger_exec.run_in_tasks(tasks, ['ls', '-l'], 'dev', {}, self.args, out)
+        assert [result['task_id'] for result in results] == ['content.0', 'content.1', 'content.2']
+        assert [result['exit_code'] for result in results] == [0, None, None]
+        assert results[0]['output'] == 'file1\n'
+        assert results[1]['error'] == 'timed out after 60s'
+        assert results[2]['error'] == 'no container found'
+        assert 'file1' in out.getvalue()
+
+    def tearDown(self):
+        del cli.roger_exec.containerconfig
+
+if __name__ == '__main__':
+    unittest.main()
@@ -126,6 +126,41 @@ class TestGitPull(unittest.TestCase):
         if set_config_dir.strip() != '':
             os.environ["ROGER_CONFIG_DIR"] = "{}".format(set_config_dir)
 
+    def test_roger_gitpull_fetches_a_repo_once(self):
+        settings = mock(Settings)
+        appConfig = mock(AppConfig)
+        roger_gitpull = RogerGitPull()
+        roger_gitpull.utils = mock(Utils)
+        mockedHooks = mock(Hooks)
+        gitObj = mock(GitUtils)
+        sc = mock(StatsClient)
+        when(sc).timing(any(), any()).thenReturn(any())
+        when(roger_gitpull.utils).getStatsClient().thenReturn(sc)
+        when(roger_gitpull.utils).get_identifier(any(), any(), any()).thenReturn(any())
+        when(roger_gitpull.utils).extract_app_name(any()).thenReturn("test")
+        when(settings).getConfigDir().thenReturn(self.configs_dir)
+        when(settings).getUser().thenReturn('test_user')
+        when(appConfig).getConfig(self.configs_dir, "app.json").thenReturn(self.config)
+        when(appConfig).getAppData(self.configs_dir, "app.json", any()).thenReturn(self.data)
+        when(appConfig).getRepoName(any()).thenReturn('roger')
+        when(mockedHooks).run_hook(any(), any(), any(), any()).thenReturn(0)
+        when(gitObj).gitShallowClone(any(), any(), any()).thenReturn(0)
+
+        args = self.args
+        args.config_file = "app.json"
+        args.branch = "master"
+        args.environment = 'test'
+        args.directory = self.work_dir
+        args.verbose = False
+        try:
+            for app in ["grafana_test_app", "grafana_test_app1"]:
+                args.app_name = app
+                roger_gitpull.main(settings, appConfig, gitObj, mockedHooks, args)
+        finally:
+            shutil.rmtree(self.work_dir)
+        verify(gitObj, times=1).gitShallowClone(any(), any(), any())
+        verify(mockedHooks, times=2).run_hook("post_gitpull", any(), any(), any())
+
     def test_roger_gitpull_calls_pregitpull_hook_when_present(self):
         settings = mock(Settings)
         appConfig = mock(AppConfig)
@@ -0,0 +1,80 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import unittest
+import os
+import sys
+import argparse
+from StringIO import StringIO
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
+import cli.roger_logs
+from cli.roger_logs import RogerLogs, LogStream
+from cli.marathon import Marathon
+from mockito import mock, when
+
+# Test basic functionalities of roger logs
+
+
+class TestRogerLogs(unittest.TestCase):
+
+    def setUp(self):
+        self.roger_logs = RogerLogs()
+        self.args = self.roger_logs.parse_args().parse_args(['-a', '/content', '-f', '-T', '10'])
+
+    def get_stream(self, task_id, lines):
+        stream = LogStream(task_id, 'host1', task_id)
+        for line in lines + [None]:
+            stream.put(line)
+        return stream
+
+    def test_get_logs_command(self):
+        assert self.args.appTaskId is None
+        assert self.roger_logs.get_logs_command('host1', 'c1', self.args, True) == \
+            'docker -H tcp://host1:4243 logs  -f=true -t --tail="10" c1'
+
+    def test_parse_args_tail(self):
+        assert self.args.tail == 10
+        with self.assertRaises(SystemExit):
+            self.roger_logs.parse_args().parse_args(['-a', '/content', '-T', 'all'])
+
+    def test_print_interleaved(self):
+        out = StringIO()
+        streams = [self.get_stream('task1', ['a', 'b']), self.get_stream('task2', ['c'])]
+        self.roger_logs.print_interleaved(streams, out)
+        assert out.getvalue().splitlines() == ['task1 | a', 'task1 | b', 'task2 | c']
+
+    def test_print_merged(self):
+        out = StringIO()
+        streams = [
+            self.get_stream('task1', ['2016-05-18T20:48:13.5Z a', '2016-05-18T20:48:15Z c', 'error']),
+            self.get_stream('task2', ['2016-05-18T20:48:13.732Z b', '2016-05-18T20:48:16.1Z d'])]
+        self.roger_logs.print_merged(streams, out, 1.0, False)
+        assert out.getvalue().splitlines() == [
+            'task1 | a', 'task2 | b', 'task1 | c', 'task1 | error', 'task2 | d']
+
+    def test_stream_backpressure(self):
+        stream = LogStream('task1', 'host1', 'task1')
+        for i in range(stream.queue.maxsize):
+            stream.put(str(i))
+        assert stream.queue.full()
+        # A stopped stream drops the line instead of blocking forever
+        stream.stop()
+        stream.put('dropped')
+        assert stream.queue.qsize() == stream.queue.maxsize
+
+    def test_stream_app_logs_no_task_on_host(self):
+        framework = mock(Marathon)
+        when(framework).getAppTasks({}, 'dev', '/content').thenReturn([{'id': 'task1', 'host': 'host1'}])
+        cli.roger_logs.framework = framework
+        args = self.roger_logs.parse_args().parse_args(['-a', '/content', '-H', 'host2'])
+        out = StringIO()
+        self.roger_logs.stream_app_logs('dev', {}, args, out)
+        assert out.getvalue() == ''
+
+    def tearDown(self):
+        if hasattr(cli.roger_logs, 'framework'):
+            del cli.roger_logs.framework
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,11 +5,14 @@ import unittest
 import os
 import sys
 import argparse
+import json
+from StringIO import StringIO
 sys.path.insert(0, os.path.abspath(os.path.join(
     os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
 from cli.roger_ps import RogerPS
-from cli.haproxyparser import HAProxyParser
+from cli.haproxyparser import HAProxyParser, HAProxyRoutes
 from cli.marathon import Marathon
+from cli.appselector import AppSelector
 from mockito import mock, when
 
 
@@ -40,21 +43,18 @@ class TestRogerPS(unittest.TestCase):
             'app1-123'] = ("app1", "host1", ['3000', '3001'], "2016-03-18T20:48:13.732Z")
         instance_details[
             'app2-efg'] = ("app2", "host2", ['9000'], "2016-04-18T20:48:13.732Z")
-        when(framework).getAppEnvDetails(
-            self.roger_env, "test").thenReturn(app_envs)
-        when(framework).getInstanceDetails(
-            self.roger_env, "test").thenReturn(instance_details)
+        when(framework).fetchUserPass("test").thenReturn(None)
+        when(framework).getClusterSnapshot(
+            self.roger_env, "test", None).thenReturn((instance_details, app_envs))
         self.framework = framework
         haproxyparser = mock(HAProxyParser)
         path_beg_values = {}
         path_beg_values['/test/app1'] = "app1"
         backend_services_tcp_ports = {}
         backend_services_tcp_ports['9001'] = "app2"
-        when(haproxyparser).get_backend_tcp_ports(
-        ).thenReturn(backend_services_tcp_ports)
-        when(haproxyparser).parseConfig("test").thenReturn(
-            "acl ::test::app-aclrule path_beg -i /test/app\nacl ::test::links-aclrule path_beg -i /test/links")
-        when(haproxyparser).get_path_begin_values().thenReturn(path_beg_values)
+        when(haproxyparser).parseConfig("test").thenReturn(None)
+        when(haproxyparser).get_routes().thenReturn(
+            HAProxyRoutes(path_beg_values, backend_services_tcp_ports))
         self.haproxyparser = haproxyparser
 
     def test_get_marathon_details_correctly_parses_tasks_and_haproxy_details_with_no_verbose(self):
@@ -80,17 +80,108 @@ class TestRogerPS(unittest.TestCase):
         assert app_details['apps']['app1']['tasks'][
             'app1-123']['hostname'] == "host1"
 
-    def test_get_instance_details(self):
-        instance_details = self.rogerps.get_instance_details(
-            self.framework, self.roger_env, "test")
-        assert instance_details.keys() == ['app1-123', 'app2-efg']
-        app1_data = instance_details['app1-123']
-        app2_data = instance_details['app2-efg']
-        assert app1_data[1] == "host1"
-        assert app1_data[2] == ['3000', '3001']
-        assert app2_data[0] == "app2"
-        assert app2_data[2] == ['9000']
-        assert app2_data[3] == "2016-04-18T20:48:13.732Z"
+    def test_print_app_records_ndjson(self):
+        args = self.args
+        args.verbose = True
+        out = StringIO()
+        instance_details, app_envs = self.rogerps.fetch_cluster_state(
+            self.framework, self.haproxyparser, "test", self.roger_env)
+        app_details_iter = self.rogerps.iter_app_details(
+            instance_details, app_envs, self.haproxyparser.get_routes(), "test", args, self.roger_env)
+        self.rogerps.print_app_records_ndjson(app_details_iter, args, out)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert len(records) == 4
+        apps = dict((record['app_id'], record) for record in records if record['type'] == 'app')
+        assert apps['app1']['http_url'] == "http://testhost/test/app1"
+        assert apps['app1']['tcp_ports'] == []
+        assert apps['app2']['http_url'] is None
+        assert apps['app2']['tcp_ports'] == ['9001']
+        tasks = [record for record in records if record['type'] == 'task']
+        assert set(task['task_id'] for task in tasks) == set(['app1-123', 'app2-efg'])
+
+    def test_print_app_records_json(self):
+        args = self.args
+        args.verbose = False
+        out = StringIO()
+        instance_details, app_envs = self.rogerps.fetch_cluster_state(
+            self.framework, self.haproxyparser, "test", self.roger_env)
+        app_details_iter = self.rogerps.iter_app_details(
+            instance_details, app_envs, self.haproxyparser.get_routes(), "test", args, self.roger_env)
+        self.rogerps.print_app_records_json(app_details_iter, args, out)
+        apps = json.loads(out.getvalue())['apps']
+        assert sorted(app['app_id'] for app in apps) == ['app1', 'app2']
+        assert 'tasks' not in apps[0]
+
+    def test_apply_event_status_updates(self):
+        instance_details = {'app1-123': ("app1", "host1", [3000], "2016-03-18T20:48:13.732Z")}
+        app_envs = {}
+        event = {'eventType': 'status_update_event', 'taskId': 'app1-456', 'appId': 'app1',
+                 'host': 'host3', 'ports': [3002], 'taskStatus': 'TASK_RUNNING',
+                 'timestamp': '2016-05-18T20:48:13.732Z'}
+        assert self.rogerps.apply_event(event, instance_details, app_envs) == (True, False)
+        assert instance_details['app1-456'] == ("app1", "host3", [3002], "2016-05-18T20:48:13.732Z")
+        event = {'eventType': 'status_update_event', 'taskId': 'app1-123', 'appId': 'app1',
+                 'host': 'host1', 'taskStatus': 'TASK_KILLED'}
+        assert self.rogerps.apply_event(event, instance_details, app_envs) == (True, False)
+        assert 'app1-123' not in instance_details
+        event = {'eventType': 'status_update_event', 'taskId': 'app1-789', 'appId': 'app1',
+                 'host': 'host1', 'taskStatus': 'TASK_STAGING'}
+        assert self.rogerps.apply_event(event, instance_details, app_envs) == (False, False)
+
+    def test_apply_event_deployments(self):
+        instance_details = {'app1-123': ("/app1", "host1", [3000], "2016-03-18T20:48:13.732Z"),
+                            'app2-efg': ("/group/app2", "host2", [9000], "2016-04-18T20:48:13.732Z")}
+        app_envs = {'/app1': {}}
+        event = {'eventType': 'api_post_event', 'appDefinition': {'id': '/app1', 'env': {'HTTP_PORT': 'PORT0'}}}
+        assert self.rogerps.apply_event(event, instance_details, app_envs) == (True, False)
+        assert app_envs['/app1'] == {'HTTP_PORT': 'PORT0'}
+        event = {'eventType': 'deployment_success', 'plan': {'target': {
+            'id': '/', 'apps': [], 'groups': [{'id': '/group', 'apps': [{'id': '/group/app2', 'env': {}}]}]}}}
+        assert self.rogerps.apply_event(event, instance_details, app_envs) == (True, True)
+        assert instance_details.keys() == ['app2-efg']
+        assert app_envs == {'/group/app2': {}}
+
+    def test_apply_event_deployment_states(self):
+        instance_details = {}
+        app_envs = {}
+        deployments = {}
+        plan = {'id': 'd1', 'steps': [{'actions': [{'action': 'RestartApplication', 'app': '/app1'}]},
+                                      {'actions': [{'action': 'ScaleApplication', 'app': '/app2'}]}]}
+        event = {'eventType': 'deployment_info', 'plan': plan, 'currentStep': plan['steps'][0]}
+        assert self.rogerps.apply_event(event, instance_details, app_envs, None, deployments) == (True, False)
+        assert deployments == {'/app1': 'in progress: RestartApplication'}
+        event = {'eventType': 'deployment_step_failure', 'plan': plan, 'currentStep': plan['steps'][0]}
+        assert self.rogerps.apply_event(event, instance_details, app_envs, None, deployments) == (True, False)
+        assert deployments == {'/app1': 'step failed: RestartApplication'}
+        event = {'eventType': 'deployment_failed', 'id': 'd1', 'plan': plan}
+        assert self.rogerps.apply_event(event, instance_details, app_envs, None, deployments) == (True, False)
+        assert deployments == {'/app1': 'failed', '/app2': 'failed'}
+        # Not tracked without deployments
+        assert self.rogerps.apply_event(event, instance_details, app_envs) == (False, False)
+        # A later successful deployment of the apps clears their state
+        event = {'eventType': 'deployment_success', 'plan': dict(plan, id='d2')}
+        assert self.rogerps.apply_event(event, instance_details, app_envs, None, deployments) == (True, False)
+        assert deployments == {}
+
+    def test_apply_event_with_selector(self):
+        selector = AppSelector('/team')
+        instance_details = {'team1-123': ("/team/app1", "host1", [3000], "2016-03-18T20:48:13.732Z")}
+        app_envs = {'/team/app1': {}}
+        event = {'eventType': 'status_update_event', 'taskId': 'other-456', 'appId': '/other',
+                 'host': 'host3', 'ports': [3002], 'taskStatus': 'TASK_RUNNING',
+                 'timestamp': '2016-05-18T20:48:13.732Z'}
+        assert self.rogerps.apply_event(event, instance_details, app_envs, selector) == (False, False)
+        assert 'other-456' not in instance_details
+        event = {'eventType': 'api_post_event', 'appDefinition': {'id': '/other', 'env': {'A': 'B'}}}
+        assert self.rogerps.apply_event(event, instance_details, app_envs, selector) == (False, False)
+        event = {'eventType': 'api_post_event', 'appDefinition': {'id': '/team/app2'}}
+        assert self.rogerps.apply_event(event, instance_details, app_envs, selector) == (True, False)
+        assert app_envs == {'/team/app1': {}, '/team/app2': {}}
+        event = {'eventType': 'deployment_success', 'plan': {'target': {
+            'id': '/', 'apps': [{'id': '/other'}], 'groups': [{'id': '/team', 'apps': [{'id': '/team/app1'}]}]}}}
+        assert self.rogerps.apply_event(event, instance_details, app_envs, selector) == (True, True)
+        assert app_envs == {'/team/app1': {}}
+        assert instance_details.keys() == ['team1-123']
 
     def tearDown(self):
         pass
@@ -87,6 +87,30 @@ class TestSettings(unittest.TestCase):
         cli_dir = self.settingObj.getCliDir()
         assert cli_dir is not None
 
+    def test_getCacheDir(self):
+        set_cache_dir = os.environ.pop('ROGER_CACHE_DIR', '')
+        cache_dir = self.settingObj.getCacheDir()
+        assert cache_dir == os.path.join(
+            os.path.expanduser('~'), '.roger_cli.conf.d', 'cache')
+        os.environ["ROGER_CACHE_DIR"] = self.base_dir + "/testcachedir"
+        cache_dir = self.settingObj.getCacheDir()
+        assert cache_dir == self.base_dir + "/testcachedir"
+        del os.environ['ROGER_CACHE_DIR']
+        if set_cache_dir.strip() != '':
+            os.environ["ROGER_CACHE_DIR"] = "{}".format(set_cache_dir)
+
+    def test_getHttpPoolSize(self):
+        set_pool_size = os.environ.pop('ROGER_HTTP_POOL_SIZE', '')
+        assert self.settingObj.getHttpPoolSize() == 10
+        os.environ["ROGER_HTTP_POOL_SIZE"] = "32"
+        assert self.settingObj.getHttpPoolSize() == 32
+        os.environ["ROGER_HTTP_POOL_SIZE"] = "0"
+        with self.assertRaises(ValueError):
+            self.settingObj.getHttpPoolSize()
+        del os.environ['ROGER_HTTP_POOL_SIZE']
+        if set_pool_size.strip() != '':
+            os.environ["ROGER_HTTP_POOL_SIZE"] = "{}".format(set_pool_size)
+
     def tearDown(self):
         pass
 
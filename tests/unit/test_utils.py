@@ -9,7 +9,7 @@ import sys
 import argparse
 sys.path.insert(0, os.path.abspath(os.path.join(
     os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
-from cli.utils import Utils
+from cli.utils import Utils, getHttpSession
 from cli.appconfig import AppConfig
 from mockito import mock, Mock, when
 
@@ -41,6 +41,12 @@ class TestUtils(unittest.TestCase):
         assert self.utils.extractShaFromImage("") == ""
         assert self.utils.extractShaFromImage("bdsbddadhhd") == ""
 
+    def test_getHttpSession(self):
+        session = getHttpSession('http://host-a.example.com:5051')
+        assert getHttpSession('http://host-a.example.com:5051') is session
+        assert getHttpSession('http://host-b.example.com:5051') is not session
+        assert session.headers['Connection'] == 'keep-alive'
+
 
 if __name__ == '__main__':
     unittest.main()
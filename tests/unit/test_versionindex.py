@@ -0,0 +1,63 @@
+#!/usr/bin/python
+
+from __future__ import print_function
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "cli")))
+from cli.versionindex import VersionIndex, splitVersion
+from cli.dockerutils import DockerUtils
+from mockito import mock, when, verify
+
+# Test basic functionalities of VersionIndex class
+
+
+class TestVersionIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.index = VersionIndex(os.path.join(self.temp_dir, 'cache', 'versions.db'))
+        self.envs = ['dev', 'stage']
+
+    def test_splitVersion(self):
+        assert splitVersion("0.1.0") == (0, 1, 0)
+        assert splitVersion("2.0013") == (2, 13, 0)
+
+    def test_parse_image(self):
+        index = self.index
+        assert index.parse_image('moz', 'content', 'moz-content-abc123/v1.2.0', self.envs) == \
+            ('abc123', '1.2.0', '')
+        assert index.parse_image('moz', 'content', 'moz-content-stage-abc123/v1.2.0', self.envs) == \
+            ('', '1.2.0', 'stage')
+        assert index.parse_image('moz', 'content', 'moz-content-abc123/vlatest', self.envs) is None
+        assert index.parse_image('moz', 'kwe', 'moz-content-abc123/v1.2.0', self.envs) is None
+
+    def test_refresh_and_record_push(self):
+        dockerUtils = mock(DockerUtils)
+        when(dockerUtils).docker_search('registry', 'moz', 'content').thenReturn(
+            'moz-content-abc/v0.10.0\nmoz-content-def/v0.9.0\nmoz-content-dev-abc/v0.10.0\n')
+        assert self.index.get_refreshed_at('registry', 'moz', 'content') is None
+        self.index.refresh('registry', 'moz', 'content', self.envs, dockerUtils)
+        assert self.index.get_refreshed_at('registry', 'moz', 'content') is not None
+        assert [row['version'] for row in self.index.get_versions('registry', 'moz', 'content', '')] == \
+            ['0.9.0', '0.10.0']
+        assert len(self.index.get_versions('registry', 'moz', 'content')) == 3
+
+        self.index.record_push('registry', 'moz', 'content', 'moz-content-fed/v0.11.0', self.envs)
+        latest = self.index.get_versions('registry', 'moz', 'content', '')[-1]
+        assert (latest['sha'], latest['version']) == ('fed', '0.11.0')
+        assert latest['pushed_at'] is not None
+
+        # A refresh keeps what the index already knows
+        self.index.refresh('registry', 'moz', 'content', self.envs, dockerUtils)
+        assert self.index.get_versions('registry', 'moz', 'content', '')[-1] == latest
+        verify(dockerUtils, times=2).docker_search('registry', 'moz', 'content')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+if __name__ == '__main__':
+    unittest.main()